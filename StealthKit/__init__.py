@@ -1,2 +1,16 @@
 # stealth_kit/__init__.py
-from .browser import StealthBrowser
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .browser import StealthBrowser
+
+__all__ = ["StealthBrowser"]
+
+
+def __getattr__(name):
+    # Resolve StealthBrowser on first use so `import StealthKit` does not load the browser stack.
+    if name == "StealthBrowser":
+        from .browser import StealthBrowser
+
+        return StealthBrowser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,79 @@
+# stealth_kit/admission.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class Admission:
+    def __init__(self, limit: int = 0, timeout_s: float = 30.0):
+        """
+        Cap on browser sessions running at once, shared by every client of the server.
+        Sessions over the cap wait in line (first come, first served) for a slot to free up.
+        :param limit: Maximum sessions admitted at once; 0 admits everyone.
+        :param timeout_s: How long a session waits in line before giving up.
+        """
+        self.limit = limit
+        self.timeout_s = timeout_s
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting up to `timeout_s` for one. Raises RuntimeError on timeout."""
+        if self.limit <= 0 or (self.active < self.limit and not self.waiting):
+            self.active += 1
+            self.admitted += 1
+            return
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout_s)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise RuntimeError(
+                f"All {self.limit} browser sessions are busy; waited {self.timeout_s:g}s for one to close."
+            ) from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the caller went away.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self.wait_seconds_total += time.perf_counter() - started
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Give a slot back, straight to the longest waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "timed_out": self.timed_out,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+        }
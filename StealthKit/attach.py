@@ -0,0 +1,129 @@
+# stealth_kit/attach.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_KNOWN_EXECUTABLES = {
+    "msedge": {
+        "win32": [
+            r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+            r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+        ],
+        "darwin": ["/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge"],
+        "linux": ["/opt/microsoft/msedge/msedge", "microsoft-edge", "microsoft-edge-stable"],
+    },
+    "chrome": {
+        "win32": [
+            r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+            r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        ],
+        "darwin": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"],
+        "linux": ["/opt/google/chrome/chrome", "google-chrome", "google-chrome-stable"],
+    },
+}
+
+
+def find_browser_executable(channel: str, bundled: Optional[str] = None) -> str:
+    """
+    Locate the browser binary for `channel`.
+    :param bundled: Playwright's bundled Chromium path, used for the "chromium" channel.
+    """
+    if channel in ("", "chromium") and bundled:
+        return bundled
+    platform = "linux" if sys.platform.startswith("linux") else sys.platform
+    candidates = _KNOWN_EXECUTABLES.get(channel, {}).get(platform, [])
+    if platform == "win32":
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            suffix = r"Microsoft\Edge\Application\msedge.exe" if channel == "msedge" else r"Google\Chrome\Application\chrome.exe"
+            candidates = candidates + [os.path.join(local, suffix)]
+    for candidate in candidates:
+        found = candidate if os.path.isabs(candidate) else shutil.which(candidate)
+        if found and os.path.exists(found):
+            return found
+    raise FileNotFoundError(
+        f"Could not find a browser executable for channel {channel!r}; set browser.attach.executable_path."
+    )
+
+
+def spawn_detached_browser(
+    executable: str,
+    user_data_dir: str,
+    args: List[str],
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 20.0,
+) -> Tuple[str, int]:
+    """
+    Start a browser that outlives this process, with CDP on an OS-chosen port.
+    Returns (http endpoint, pid) once the browser reports its DevTools port.
+    """
+    profile = Path(user_data_dir).resolve()
+    profile.mkdir(parents=True, exist_ok=True)
+    port_file = profile / "DevToolsActivePort"
+    try:
+        port_file.unlink()
+    except FileNotFoundError:
+        pass
+
+    cmd = [executable, "--remote-debugging-port=0", f"--user-data-dir={profile}", *args, "about:blank"]
+    kwargs: Dict[str, Any] = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+        "env": env,
+    }
+    if sys.platform == "win32":
+        kwargs["creationflags"] = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(
+            subprocess, "CREATE_NEW_PROCESS_GROUP", 0
+        )
+    else:
+        # Own session: not killed with the server's process group or terminal.
+        kwargs["start_new_session"] = True
+    proc = subprocess.Popen(cmd, **kwargs)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Detached browser exited with code {proc.returncode} before opening CDP.")
+        try:
+            port = port_file.read_text(encoding="utf-8").splitlines()[0].strip()
+        except (FileNotFoundError, IndexError):
+            port = ""
+        if port.isdigit() and port != "0":
+            return f"http://127.0.0.1:{port}", proc.pid
+        time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"Detached browser did not open a CDP port within {timeout:.0f}s.")
+
+
+def read_state(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) and state.get("endpoint") else None
+
+
+def write_state(path: str, state: Dict[str, Any]) -> None:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".state-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, target)
+
+
+def clear_state(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -1,7 +1,13 @@
 ﻿# stealth_kit/browser.py
 import asyncio
-from playwright.async_api import async_playwright
+import glob
+import os
+import time
+import weakref
+from . import attach
 from .js import STEALTH_JS
+from .capture import JsonCapture
+from .routing import RequestBlocker
 
 
 class StealthBrowser:
@@ -16,12 +22,28 @@ class StealthBrowser:
         timezone_id="America/New_York",
         launch_args=None,
         ignore_default_args=None,
+        block_policy=None,
+        disk_cache=None,
+        cdp_endpoint=None,
+        detached=False,
+        state_file=None,
+        user_data_dir=None,
+        executable_path=None,
+        profile=None,
     ):
         """
         Initialize stealth browser wrapper.
         :param headless: Whether to use off-screen mode (recommended False).
         :param proxy: Proxy server, e.g. "http://127.0.0.1:10809".
         :param channel: Browser channel ("msedge" or "chrome").
+        :param block_policy: Optional BlockPolicy routed onto every new context.
+        :param disk_cache: Optional DiskCache serving static subresources to every new context.
+        :param cdp_endpoint: Connect over CDP to this running browser instead of launching one.
+        :param detached: Reuse the browser recorded in `state_file`, or start one that outlives this process.
+        :param state_file: Where a detached browser's endpoint is recorded.
+        :param user_data_dir: Profile directory of a detached browser.
+        :param executable_path: Binary for a detached browser; defaults to the installed `channel`.
+        :param profile: Optional Profile; launches one persistent context on it instead of a bare browser.
         """
         self.headless = headless
         self.proxy_cfg = {"server": proxy} if proxy else None
@@ -32,13 +54,68 @@ class StealthBrowser:
         self.timezone_id = timezone_id
         self.launch_args = launch_args
         self.ignore_default_args = ignore_default_args
+        self.block_policy = block_policy
+        self.disk_cache = disk_cache
+        self.cdp_endpoint = cdp_endpoint
+        self.detached = detached
+        self.state_file = state_file
+        self.user_data_dir = user_data_dir
+        self.executable_path = executable_path
+        self.profile = profile
+        # True when connected over CDP: closing disconnects and leaves the browser running.
+        self.attached = False
+        # Main browser process, when known (detached mode); launched browsers are found under the driver.
+        self.pid = None
+        self.blockers = weakref.WeakKeyDictionary()
+        self._prepared = weakref.WeakSet()
         self.playwright = None
         self.browser = None
         self.context = None
 
-    async def __aenter__(self):
+    async def launch(self):
+        """Start Playwright and launch the browser without creating a context."""
+        # Imported here so that importing StealthKit stays cheap until a browser is needed.
+        from playwright.async_api import async_playwright
+
         self.playwright = await async_playwright().start()
 
+        if self.cdp_endpoint:
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+            self.attached = True
+            return self.browser
+        if self.detached:
+            self.browser = await self._attach_detached()
+            self.attached = True
+            return self.browser
+
+        launch_options = dict(
+            channel=self.channel,
+            headless=False,  # Keep headed mode for more realistic browser fingerprints.
+            ignore_default_args=list(self.ignore_default_args or ["--enable-automation"]),
+            args=self._launch_args(),
+            proxy=self.proxy_cfg,
+        )
+        if self.profile is not None:
+            user_data_dir = await asyncio.to_thread(self.profile.open)
+            try:
+                self.context = await self.playwright.chromium.launch_persistent_context(
+                    user_data_dir, **launch_options, **self._context_options()
+                )
+            except Exception:
+                await asyncio.to_thread(self.profile.close)
+                raise
+            self.browser = self.context.browser
+            return self.browser
+
+        self.browser = await self.playwright.chromium.launch(**launch_options)
+        return self.browser
+
+    @property
+    def persistent(self):
+        """True when running on a persistent profile, whose single context is the only one."""
+        return self.profile is not None
+
+    def _launch_args(self):
         # 1) Launch arguments (core anti-detection settings)
         args = list(
             self.launch_args
@@ -52,17 +129,71 @@ class StealthBrowser:
         if self.headless:
             # Pseudo-headless: move the window off-screen instead of true headless mode.
             args.append("--window-position=-10000,-10000")
+        return args
 
-        self.browser = await self.playwright.chromium.launch(
-            channel=self.channel,
-            headless=False,  # Keep headed mode for more realistic browser fingerprints.
-            ignore_default_args=list(self.ignore_default_args or ["--enable-automation"]),
-            args=args,
-            proxy=self.proxy_cfg,
+    async def _attach_detached(self):
+        """Connect to the browser recorded in the state file, or start a detached one and record it."""
+        state = attach.read_state(self.state_file)
+        if state is not None:
+            try:
+                browser = await self.playwright.chromium.connect_over_cdp(state["endpoint"], timeout=5000)
+                self.pid = state.get("pid")
+                return browser
+            except Exception:
+                attach.clear_state(self.state_file)
+
+        executable = self.executable_path or attach.find_browser_executable(
+            self.channel, bundled=self.playwright.chromium.executable_path
+        )
+        viewport = self.viewport or {"width": 960, "height": 1000}
+        args = self._launch_args() + [
+            "--no-first-run",
+            "--no-default-browser-check",
+            f"--lang={self.locale}",
+            f"--window-size={viewport['width']},{viewport['height']}",
+        ]
+        if self.user_agent:
+            args.append(f"--user-agent={self.user_agent}")
+        if self.proxy_cfg:
+            args.append(f"--proxy-server={self.proxy_cfg['server']}")
+        env = dict(os.environ, TZ=self.timezone_id) if self.timezone_id else None
+        endpoint, pid = await asyncio.to_thread(
+            attach.spawn_detached_browser, executable, self.user_data_dir, args, env
         )
+        attach.write_state(
+            self.state_file,
+            {
+                "endpoint": endpoint,
+                "pid": pid,
+                "executable": executable,
+                "user_data_dir": os.path.abspath(self.user_data_dir),
+                "started": time.time(),
+            },
+        )
+        self.pid = pid
+        return await self.playwright.chromium.connect_over_cdp(endpoint)
+
+    async def new_context(self, storage_state=None, proxy=None, block_policy=None):
+        """
+        Create a new stealth context on the launched browser.
+        :param storage_state: Path or dict accepted by Playwright's storage_state.
+        :param proxy: Proxy server for this context only, e.g. "http://127.0.0.1:10809".
+        :param block_policy: BlockPolicy overriding the browser default; an empty policy disables blocking.
+        """
+        if self.persistent:
+            raise RuntimeError("A persistent profile has a single context; new contexts cannot be created.")
+        context = await self.browser.new_context(
+            **self._context_options(),
+            proxy={"server": proxy} if proxy else None,
+            storage_state=storage_state,
+        )
+
+        await self.prepare_context(context, block_policy)
+        return context
 
+    def _context_options(self):
         # 2) Browser context settings
-        self.context = await self.browser.new_context(
+        return dict(
             user_agent=self.user_agent
             or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
             viewport=self.viewport or {"width": 960, "height": 1000},
@@ -70,37 +201,87 @@ class StealthBrowser:
             timezone_id=self.timezone_id,
         )
 
+    async def prepare_context(self, context, block_policy=None):
+        """Add the stealth script, disk cache and request blocking to `context` (once per context)."""
+        if context in self._prepared:
+            return
+        self._prepared.add(context)
+
         # 3) Inject stealth script
-        await self.context.add_init_script(STEALTH_JS)
+        await context.add_init_script(STEALTH_JS)
+
+        # 4) Shared disk cache. Routes run last-registered first, so it sees only
+        #    requests the blocker below lets through.
+        if self.disk_cache is not None:
+            from .cache import CacheRouter
 
+            await CacheRouter(self.disk_cache).attach(context)
+
+        # 5) Request blocking
+        policy = self.block_policy if block_policy is None else block_policy
+        if policy:
+            blocker = RequestBlocker(policy)
+            await blocker.attach(context)
+            self.blockers[context] = blocker
+
+    async def adopt_default_context(self, block_policy=None):
+        """
+        Take over the persistent profile's context, or the attached browser's default context,
+        which survives reconnects along with its tabs (contexts created over a CDP connection
+        are disposed when it drops).
+        """
+        if self.persistent:
+            context = self.context
+        elif self.attached and self.browser.contexts:
+            context = self.browser.contexts[0]
+        else:
+            return None
+        await self.prepare_context(context, block_policy)
+        return context
+
+    def blocker_for(self, context):
+        """Return the RequestBlocker routed onto `context`, if any."""
+        return self.blockers.get(context)
+
+    async def __aenter__(self):
+        await self.launch()
+        if self.persistent:
+            await self.prepare_context(self.context)
+        else:
+            self.context = await self.new_context()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.browser:
+        if self.persistent and self.context is not None:
+            await self.context.close()
+        elif self.browser:
+            # Over CDP this only disconnects; an attached browser keeps running.
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        if self.profile is not None:
+            await asyncio.to_thread(self.profile.close)
+        if self.disk_cache is not None:
+            self.disk_cache.close()
 
     async def get_page(self):
         """Create and return a new stealth page."""
         return await self.context.new_page()
 
-    def listen_json(self, page, url_fragment, callback):
+    def listen_json(self, page, url_fragment, callback, max_body_bytes=1_000_000):
         """
         Helper utility: listen for JSON responses matching a URL fragment.
         :param page: Playwright page object.
         :param url_fragment: URL fragment, e.g. "api/qt/clist/get".
         :param callback: Callback receiving parsed JSON.
+        :param max_body_bytes: Larger responses are skipped.
+        :return: The underlying JsonCapture; `await capture.close()` stops listening.
         """
-        async def _async_handle(response):
-            if url_fragment in response.url and response.status == 200:
-                try:
-                    data = await response.json()
-                    callback(data)
-                except Exception:
-                    pass
-
-        def _handler(response):
-            asyncio.create_task(_async_handle(response))
-
-        page.on("response", _handler)
+        capture = JsonCapture(
+            url_patterns=[f"*{glob.escape(url_fragment)}*"],
+            content_types=(),
+            max_body_bytes=max_body_bytes,
+            callback=callback,
+        )
+        capture.attach(page)
+        return capture
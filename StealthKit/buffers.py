@@ -0,0 +1,159 @@
+# stealth_kit/buffers.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO that overwrites its oldest entry once full."""
+
+    __slots__ = ("capacity", "dropped", "_items", "_start", "_size")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = capacity
+        self.dropped = 0
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, item: Any) -> None:
+        if self._size < self.capacity:
+            self._items[(self._start + self._size) % self.capacity] = item
+            self._size += 1
+        else:
+            self._items[self._start] = item
+            self._start = (self._start + 1) % self.capacity
+            self.dropped += 1
+
+    def clear(self) -> None:
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        """Oldest to newest."""
+        for i in range(self._size):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def __reversed__(self) -> Iterator[Any]:
+        """Newest to oldest."""
+        for i in range(self._size - 1, -1, -1):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def tail(self, n: int) -> Iterator[Any]:
+        """The last `n` entries, oldest first, without copying the buffer."""
+        n = max(0, min(n, self._size))
+        for i in range(self._size - n, self._size):
+            yield self._items[(self._start + i) % self.capacity]
+
+
+class ConsoleRecord:
+    __slots__ = ("type", "text", "location")
+
+    def __init__(self, type: str, text: str, location: Optional[Dict[str, Any]]) -> None:
+        self.type = type
+        self.text = text
+        self.location = location
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "text": self.text, "location": self.location}
+
+
+def timing_phases(timing: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """
+    Turn Playwright's `request.timing` (offsets from startTime, -1 when unknown) into
+    HAR-style phase durations in milliseconds, -1 for phases that did not happen.
+    """
+    if not timing:
+        return {}
+
+    def span(start: str, end: str) -> float:
+        a, b = timing.get(start, -1), timing.get(end, -1)
+        return round(b - a, 3) if a >= 0 and b >= 0 else -1
+
+    first = next(
+        (timing[k] for k in ("domainLookupStart", "connectStart", "requestStart") if timing.get(k, -1) >= 0),
+        -1,
+    )
+    response_end = timing.get("responseEnd", -1)
+    return {
+        "blocked": round(first, 3) if first >= 0 else -1,
+        "dns": span("domainLookupStart", "domainLookupEnd"),
+        "connect": span("connectStart", "connectEnd"),
+        "ssl": span("secureConnectionStart", "connectEnd"),
+        "send": 0,
+        "wait": span("requestStart", "responseStart"),
+        "receive": span("responseStart", "responseEnd"),
+        "total": round(response_end, 3) if response_end >= 0 else -1,
+    }
+
+
+class NetworkRecord:
+    """One request of a tab, completed in place as its response/finished/failed events arrive."""
+
+    __slots__ = (
+        "method",
+        "url",
+        "resource_type",
+        "started",
+        "request_headers",
+        "status",
+        "status_text",
+        "response_headers",
+        "timing",
+        "failure",
+        "sizes",
+        "request",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        resource_type: str,
+        started: Optional[float] = None,
+        request_headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.method = method
+        self.url = url
+        self.resource_type = resource_type
+        self.started = started
+        self.request_headers = request_headers
+        self.status: Optional[int] = None
+        self.status_text: Optional[str] = None
+        self.response_headers: Optional[Dict[str, str]] = None
+        self.timing: Optional[Dict[str, float]] = None
+        self.failure: Optional[str] = None
+        self.sizes: Optional[Dict[str, int]] = None
+        # The finished request, kept until its sizes are asked for when the log is read.
+        self.request: Any = None
+
+    @property
+    def transfer_size(self) -> Optional[int]:
+        """Bytes received on the wire (headers + encoded body), when known."""
+        if self.sizes is not None:
+            return self.sizes.get("responseHeadersSize", 0) + self.sizes.get("responseBodySize", 0)
+        if self.response_headers is not None:
+            length = self.response_headers.get("content-length")
+            if length and length.isdigit():
+                return int(length)
+        return None
+
+    def to_dict(self, include_timing: bool = False) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "method": self.method,
+            "url": self.url,
+            "resource_type": self.resource_type,
+            "status": self.status,
+            "size": self.transfer_size,
+            "duration_ms": timing_phases(self.timing).get("total"),
+            "failure": self.failure,
+        }
+        if include_timing:
+            data["timing"] = timing_phases(self.timing)
+        return data
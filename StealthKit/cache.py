@@ -0,0 +1,396 @@
+# stealth_kit/cache.py
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# Dropped before replaying a stored response: the stored body is already decoded,
+# its length is set by Playwright, and cookies must never leak between contexts.
+_STRIP_HEADERS = frozenset(
+    {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+)
+# Dirty last_access/expires updates held in memory before they are written out together.
+_FLUSH_EVERY = 64
+# Without explicit freshness, a Last-Modified response stays fresh for 10% of its age, capped here.
+_HEURISTIC_MAX_SECONDS = 24 * 3600
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> Optional[float]:
+    """
+    Seconds a shared cache may serve a response, or None if it must not be stored.
+    :param headers: Response headers with lower-case names.
+    :param now: Current unix time.
+    """
+    cc = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cc or "private" in cc or "no-cache" in cc:
+        return None
+    if "set-cookie" in headers:
+        return None
+    # Entries are keyed by URL alone, so a response that differs per requesting origin (a CORS
+    # grant to one site) would be replayed to others and fail their CORS check.
+    vary = {v.strip() for v in headers.get("vary", "").lower().split(",") if v.strip()}
+    if not vary <= {"accept-encoding"}:
+        return None
+    if headers.get("access-control-allow-origin", "*").strip() != "*":
+        return None
+
+    age = 0.0
+    try:
+        age = float(headers.get("age", 0))
+    except ValueError:
+        pass
+    for directive in ("s-maxage", "max-age"):
+        if cc.get(directive) is not None:
+            try:
+                return max(0.0, float(cc[directive]) - age)
+            except ValueError:
+                return None
+    date = _http_date(headers.get("date")) or now
+    expires = _http_date(headers.get("expires"))
+    if "expires" in headers:
+        return max(0.0, expires - date) if expires is not None else None
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None and last_modified < date:
+        return min((date - last_modified) * 0.1, _HEURISTIC_MAX_SECONDS)
+    return None
+
+
+class _Entry:
+    __slots__ = ("status", "headers", "digest", "size", "expires", "last_access")
+
+    def __init__(
+        self, status: int, headers: Dict[str, str], digest: str, size: int, expires: float, last_access: float
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.digest = digest
+        self.size = size
+        self.expires = expires
+        self.last_access = last_access
+
+
+class DiskCache:
+    def __init__(self, directory, max_bytes, resource_types=("script", "stylesheet", "font", "image")):
+        """
+        Content-addressed HTTP cache shared by every context and persisted across restarts.
+        Lookups are served from an in-memory index; SQLite and blob I/O run on worker threads.
+        :param directory: Cache root; bodies live in blobs/ named by SHA-256, metadata in index.sqlite3.
+        :param max_bytes: Total body size kept before least-recently-used entries are evicted.
+        :param resource_types: Playwright resource types eligible for caching.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.resource_types = frozenset(resource_types)
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.directory / "index.sqlite3", isolation_level=None, check_same_thread=False)
+        # Serializes the worker threads on the connection.
+        self._db_lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, status INTEGER, headers TEXT, digest TEXT,"
+            " size INTEGER, expires REAL, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+        # url -> entry, least recently used first
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # digest -> number of entries sharing the blob
+        self._refs: Dict[str, int] = {}
+        self.total_bytes = 0
+        for url, status, headers, digest, size, expires, last_access in self._db.execute(
+            "SELECT url, status, headers, digest, size, expires, last_access FROM entries ORDER BY last_access"
+        ):
+            self._entries[url] = _Entry(status, json.loads(headers), digest, size, expires, last_access)
+            self._refs[digest] = self._refs.get(digest, 0) + 1
+            self.total_bytes += size
+        # urls whose last_access/expires changed since the last write
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def lookup(self, url: str) -> Optional[Tuple[int, Dict[str, str], str, float]]:
+        """Return (status, headers, digest, expires) for a stored URL, fresh or not."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        return entry.status, entry.headers, entry.digest, entry.expires
+
+    def is_fresh(self, url: str) -> bool:
+        entry = self._entries.get(url)
+        return entry is not None and entry.expires > time.time()
+
+    async def read(self, digest: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(self._blob_path(digest).read_bytes)
+        except OSError:
+            return None
+
+    def touch(self, url: str, expires: Optional[float] = None) -> None:
+        """Mark an entry used (and extend it after revalidation); written out in batches."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return
+        entry.last_access = time.time()
+        if expires is not None:
+            entry.expires = expires
+        self._entries.move_to_end(url)
+        self._dirty.add(url)
+        if len(self._dirty) >= _FLUSH_EVERY and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.ensure_future(self._write([], []))
+
+    def _take_dirty(self) -> List[Tuple[str, tuple]]:
+        ops = []
+        for url in self._dirty:
+            entry = self._entries.get(url)
+            if entry is not None:
+                ops.append(
+                    (
+                        "UPDATE entries SET last_access = ?, expires = ? WHERE url = ?",
+                        (entry.last_access, entry.expires, url),
+                    )
+                )
+        self._dirty = set()
+        return ops
+
+    async def _write(self, ops: List[Tuple[str, tuple]], released: List[str]) -> None:
+        """Run `ops` plus pending touches in one transaction on a worker thread, then drop `released` blobs."""
+        ops = ops + self._take_dirty()
+        try:
+            await asyncio.to_thread(self._commit, ops, released)
+        except Exception:
+            # The index in memory stays authoritative for this run.
+            pass
+
+    def _commit(self, ops: List[Tuple[str, tuple]], released: List[str]) -> None:
+        if ops:
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                try:
+                    for sql, params in ops:
+                        self._db.execute(sql, params)
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        for digest in released:
+            # Blobs are shared by identical bodies; a store may have taken it back meanwhile.
+            if not self._refs.get(digest):
+                try:
+                    self._blob_path(digest).unlink()
+                except OSError:
+                    pass
+
+    def _unref(self, digest: str, released: List[str]) -> None:
+        count = self._refs.get(digest, 0) - 1
+        if count > 0:
+            self._refs[digest] = count
+        else:
+            self._refs.pop(digest, None)
+            released.append(digest)
+
+    async def store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if status != 200 or lifetime is None or len(body) > self.max_bytes:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        await asyncio.to_thread(self._write_blob, self._blob_path(digest), body)
+        kept = {k: v for k, v in headers.items() if k not in _STRIP_HEADERS}
+        released: List[str] = []
+        old = self._entries.pop(url, None)
+        if old is not None:
+            self.total_bytes -= old.size
+            self._unref(old.digest, released)
+        self._entries[url] = _Entry(status, kept, digest, len(body), now + lifetime, now)
+        self._refs[digest] = self._refs.get(digest, 0) + 1
+        self._dirty.discard(url)
+        self.total_bytes += len(body)
+        self.stores += 1
+        ops = [
+            (
+                "INSERT OR REPLACE INTO entries (url, status, headers, digest, size, expires, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(kept), digest, len(body), now + lifetime, now),
+            )
+        ]
+        self._evict(ops, released)
+        await self._write(ops, released)
+        return True
+
+    @staticmethod
+    def _write_blob(path: Path, body: bytes) -> None:
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def _evict(self, ops: List[Tuple[str, tuple]], released: List[str]) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            url, entry = self._entries.popitem(last=False)
+            self._dirty.discard(url)
+            ops.append(("DELETE FROM entries WHERE url = ?", (url,)))
+            self._unref(entry.digest, released)
+            self.total_bytes -= entry.size
+            self.evictions += 1
+
+    async def clear(self) -> None:
+        released = list(self._refs)
+        self._entries = OrderedDict()
+        self._refs = {}
+        self._dirty = set()
+        self.total_bytes = 0
+        await asyncio.to_thread(self._commit, [("DELETE FROM entries", ())], released)
+
+    def close(self) -> None:
+        self._commit(self._take_dirty(), [])
+        self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "directory": str(self.directory),
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "revalidated": self.revalidated,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "bytes_served": self.bytes_served,
+        }
+
+
+class CacheRouter:
+    def __init__(self, cache: DiskCache):
+        """
+        Serve cacheable GET subresources of one context from a DiskCache. Only hits and
+        revalidations of stored entries are answered here; misses go out through the browser's
+        own network stack and are stored from the context's response events.
+        """
+        self.cache = cache
+        self._pending: Set["asyncio.Task[None]"] = set()
+
+    async def attach(self, context: Any) -> None:
+        await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    def _eligible(self, request: Any) -> bool:
+        return request.method == "GET" and request.resource_type in self.cache.resource_types
+
+    async def _handle(self, route: Any) -> None:
+        request = route.request
+        cache = self.cache
+        entry = cache.lookup(request.url) if self._eligible(request) else None
+        if entry is None:
+            if self._eligible(request):
+                cache.misses += 1
+            await route.fallback()
+            return
+        url = request.url
+        status, stored_headers, digest, expires = entry
+        if expires > time.time():
+            body = await cache.read(digest)
+            if body is not None:
+                cache.touch(url)
+                cache.hits += 1
+                cache.bytes_served += len(body)
+                await route.fulfill(status=status, headers=stored_headers, body=body)
+                return
+        elif "etag" in stored_headers or "last-modified" in stored_headers:
+            # Stale with validators: a conditional request keeps the stored body when it still matches.
+            headers = dict(request.headers)
+            if "etag" in stored_headers:
+                headers["if-none-match"] = stored_headers["etag"]
+            if "last-modified" in stored_headers:
+                headers["if-modified-since"] = stored_headers["last-modified"]
+            if await self._revalidate(route, entry, headers):
+                return
+        cache.misses += 1
+        await route.fallback()
+
+    async def _revalidate(
+        self, route: Any, entry: Tuple[int, Dict[str, str], str, float], headers: Dict[str, str]
+    ) -> bool:
+        cache = self.cache
+        url = route.request.url
+        try:
+            response = await route.fetch(headers=headers, max_redirects=0)
+        except Exception:
+            return False
+        if response.status == 304:
+            body = await cache.read(entry[2])
+            lifetime = freshness_lifetime({**entry[1], **response.headers}, time.time())
+            if body is None or lifetime is None:
+                return False
+            cache.touch(url, expires=time.time() + lifetime)
+            cache.revalidated += 1
+            await route.fulfill(status=entry[0], headers=entry[1], body=body)
+            return True
+        # Changed on the server: the response is already here, so store and serve it.
+        body = await response.body()
+        await cache.store(url, response.status, await response.all_headers(), body)
+        await route.fulfill(response=response, body=body)
+        return True
+
+    def _on_response(self, response: Any) -> None:
+        request = response.request
+        if response.status != 200 or not self._eligible(request) or self.cache.is_fresh(request.url):
+            return
+        task = asyncio.ensure_future(self._store(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _store(self, response: Any) -> None:
+        try:
+            headers = await response.all_headers()
+            if freshness_lifetime(headers, time.time()) is None:
+                return
+            body = await response.body()
+        except Exception:
+            # Redirected, aborted or evicted from the browser's memory before it could be read.
+            return
+        await self.cache.store(response.request.url, response.status, headers, body)
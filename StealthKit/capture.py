@@ -0,0 +1,212 @@
+# stealth_kit/capture.py
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+from collections import deque
+import json
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# Bodies above this are parsed off the event loop.
+_THREAD_PARSE_BYTES = 256 * 1024
+
+
+class CapturedResponse:
+    __slots__ = ("url", "method", "status", "resource_type", "size", "data", "captured_at")
+
+    def __init__(self, url: str, method: str, status: int, resource_type: str, size: int, data: Any) -> None:
+        self.url = url
+        self.method = method
+        self.status = status
+        self.resource_type = resource_type
+        self.size = size
+        self.data = data
+        self.captured_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "method": self.method,
+            "status": self.status,
+            "resource_type": self.resource_type,
+            "size": self.size,
+            "captured_at": round(self.captured_at, 3),
+            "data": self.data,
+        }
+
+
+class JsonCapture:
+    def __init__(
+        self,
+        url_patterns: Iterable[str] = (),
+        methods: Iterable[str] = (),
+        content_types: Iterable[str] = ("json",),
+        max_body_bytes: int = 1_000_000,
+        max_queue: int = 500,
+        max_inflight: int = 8,
+        callback: Optional[Callable[[Any], None]] = None,
+    ):
+        """
+        Capture parsed JSON responses of the pages it is attached to.
+        Responses are filtered on URL, method, status and headers before any body is read.
+        :param url_patterns: fnmatch-style globs over the full URL; empty matches everything.
+        :param methods: HTTP methods to keep, e.g. "GET", "POST"; empty keeps all.
+        :param content_types: Substrings of the Content-Type header, e.g. "json"; empty keeps all.
+        :param max_body_bytes: Larger bodies are skipped (by Content-Length when present).
+        :param max_queue: Responses held for `drain`, counting those still being read; newer
+            ones are dropped once full.
+        :param max_inflight: Concurrent body reads; further matches wait their turn.
+        :param callback: Called with each parsed payload instead of queueing it.
+        """
+        self.url_patterns = tuple(p for p in url_patterns if p)
+        self.methods = frozenset(m.upper() for m in methods if m)
+        self.content_types = tuple(c.lower() for c in content_types if c)
+        self.max_body_bytes = max_body_bytes
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+        self.callback = callback
+        self.queue: "asyncio.Queue[CapturedResponse]" = asyncio.Queue(maxsize=max_queue)
+        self._url_re = (
+            re.compile("|".join(fnmatch.translate(p) for p in self.url_patterns)) if self.url_patterns else None
+        )
+        self._pages: Set[Any] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._pending: "deque[Any]" = deque()
+        self._ready = asyncio.Event()
+
+        self.matched = 0
+        self.captured = 0
+        self.dropped_overflow = 0
+        self.skipped_oversize = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def attach(self, page: Any) -> None:
+        if page not in self._pages:
+            self._pages.add(page)
+            page.on("response", self._on_response)
+
+    def follows(self, page: Any) -> bool:
+        return page in self._pages
+
+    def detach(self, page: Any) -> None:
+        if page in self._pages:
+            self._pages.discard(page)
+            try:
+                page.remove_listener("response", self._on_response)
+            except Exception:
+                pass
+
+    def _wanted(self, response: Any) -> bool:
+        if not 200 <= response.status < 300:
+            return False
+        if self._url_re is not None and not self._url_re.match(response.url):
+            return False
+        if self.methods and response.request.method not in self.methods:
+            return False
+        if self.content_types:
+            content_type = response.headers.get("content-type", "").lower()
+            if not any(c in content_type for c in self.content_types):
+                return False
+        return True
+
+    def _on_response(self, response: Any) -> None:
+        if not self._wanted(response):
+            return
+        self.matched += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and int(length) > self.max_body_bytes:
+            self.skipped_oversize += 1
+            return
+        if self.queue.qsize() + len(self._pending) + len(self._tasks) >= self.max_queue:
+            self.dropped_overflow += 1
+            return
+        self._pending.append(response)
+        self._pump()
+
+    def _pump(self) -> None:
+        while self._pending and len(self._tasks) < self.max_inflight:
+            task = asyncio.ensure_future(self._read(self._pending.popleft()))
+            self._tasks.add(task)
+            task.add_done_callback(self._on_read_done)
+
+    def _on_read_done(self, task: "asyncio.Task[None]") -> None:
+        self._tasks.discard(task)
+        self._pump()
+
+    async def _read(self, response: Any) -> None:
+        try:
+            body = await response.body()
+            if len(body) > self.max_body_bytes:
+                self.skipped_oversize += 1
+                return
+            if len(body) > _THREAD_PARSE_BYTES:
+                data = await asyncio.to_thread(json.loads, body)
+            else:
+                data = json.loads(body)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{response.url}: {e}"
+            return
+
+        if self.callback is not None:
+            try:
+                self.callback(data)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"callback: {e}"
+            self.captured += 1
+            return
+        item = CapturedResponse(
+            response.url, response.request.method, response.status, response.request.resource_type, len(body), data
+        )
+        try:
+            self.queue.put_nowait(item)
+            self.captured += 1
+            self._ready.set()
+        except asyncio.QueueFull:
+            self.dropped_overflow += 1
+
+    def drain(self, max_items: int) -> List[CapturedResponse]:
+        """Take up to `max_items` queued responses, oldest first, without waiting."""
+        items: List[CapturedResponse] = []
+        while len(items) < max_items:
+            try:
+                items.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return items
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for something to be queued; True if the queue is non-empty."""
+        if self.queue.empty():
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return not self.queue.empty()
+
+    async def close(self) -> None:
+        for page in list(self._pages):
+            self.detach(page)
+        self._pending.clear()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tabs": len(self._pages),
+            "matched": self.matched,
+            "captured": self.captured,
+            "queued": self.queue.qsize(),
+            "in_flight": len(self._tasks) + len(self._pending),
+            "dropped_overflow": self.dropped_overflow,
+            "skipped_oversize": self.skipped_oversize,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import os
-import tomllib
 
 
 @dataclass(frozen=True)
@@ -23,6 +23,63 @@ class BrowserLaunchConfig:
     ignore_default_args: tuple[str, ...] = ("--enable-automation",)
 
 
+@dataclass(frozen=True)
+class BlockConfig:
+    resource_types: tuple[str, ...] = ()
+    url_patterns: tuple[str, ...] = ()
+    domains: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = False
+    directory: str = ".stealthkit/cache"
+    max_mb: int = 512
+    resource_types: tuple[str, ...] = ("script", "stylesheet", "font", "image")
+
+
+@dataclass(frozen=True)
+class AttachConfig:
+    mode: str = "launch"
+    cdp_endpoint: str = ""
+    state_file: str = ".stealthkit/browser.json"
+    user_data_dir: str = ".stealthkit/detached-profile"
+    executable_path: str = ""
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    enabled: bool = False
+    user_data_dir: str = ".stealthkit/profile"
+    template_dir: str = ""
+    max_mb: int = 0
+
+
+@dataclass(frozen=True)
+class SnapshotConfig:
+    directory: str = ""
+    warm_contexts: int = 0
+    warm_snapshots: int = 2
+
+
+@dataclass(frozen=True)
+class GovernorConfig:
+    enabled: bool = False
+    interval_s: float = 30.0
+    soft_limit_mb: int = 0
+    hard_limit_mb: int = 0
+    tab_idle_s: float = 120.0
+    tab_heap_mb: int = 0
+    hibernate_after_s: float = 0.0
+    max_hibernate: int = 4
+    js_heap: bool = True
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    size: int = 0
+
+
 @dataclass(frozen=True)
 class BrowserConfig:
     headless: bool = False
@@ -36,6 +93,13 @@ class BrowserConfig:
     timezone_id: str = "America/New_York"
     viewport: ViewportConfig = ViewportConfig()
     launch: BrowserLaunchConfig = BrowserLaunchConfig()
+    pool: PoolConfig = PoolConfig()
+    block: BlockConfig = BlockConfig()
+    cache: CacheConfig = CacheConfig()
+    attach: AttachConfig = AttachConfig()
+    profile: ProfileConfig = ProfileConfig()
+    snapshots: SnapshotConfig = SnapshotConfig()
+    governor: GovernorConfig = GovernorConfig()
 
 
 @dataclass(frozen=True)
@@ -43,12 +107,32 @@ class MCPConfig:
     host: str = "127.0.0.1"
     port: int = 8765
     log_level: str = "INFO"
+    metrics: bool = False
+    transport: str = "stdio"
+    max_sessions: int = 0
+    admission_timeout_s: float = 30.0
+    max_clients: int = 0
+    client_idle_s: float = 1800.0
+
+
+@dataclass(frozen=True)
+class LogConfig:
+    console_capacity: int = 1000
+    network_capacity: int = 2000
+    transfer_sizes: bool = True
+
+
+@dataclass(frozen=True)
+class ContentConfig:
+    cache_max_mb: int = 64
 
 
 @dataclass(frozen=True)
 class AppConfig:
     mcp: MCPConfig = MCPConfig()
     browser: BrowserConfig = BrowserConfig()
+    logs: LogConfig = LogConfig()
+    content: ContentConfig = ContentConfig()
 
 
 def _to_bool(v: str) -> bool:
@@ -56,6 +140,8 @@ def _to_bool(v: str) -> bool:
 
 
 def load_config(path: str | os.PathLike | None = None) -> AppConfig:
+    import tomllib
+
     if path is not None:
         cfg_path = Path(path)
     else:
@@ -72,12 +158,27 @@ def load_config(path: str | os.PathLike | None = None) -> AppConfig:
 
     mcp_d = data.get("mcp", {})
     browser_d = data.get("browser", {})
+    logs_d = data.get("logs", {})
+    content_d = data.get("content", {})
     viewport_d = browser_d.get("viewport") or {}
     launch_d = browser_d.get("launch") or {}
+    pool_d = browser_d.get("pool") or {}
+    block_d = browser_d.get("block") or {}
+    cache_d = browser_d.get("cache") or {}
+    attach_d = browser_d.get("attach") or {}
+    profile_d = browser_d.get("profile") or {}
+    snapshots_d = browser_d.get("snapshots") or {}
+    governor_d = browser_d.get("governor") or {}
 
     mcp_host = os.getenv("MCP_HOST", mcp_d.get("host", "127.0.0.1"))
     mcp_port = int(os.getenv("MCP_PORT", mcp_d.get("port", 8765)))
     mcp_log_level = os.getenv("MCP_LOG_LEVEL", mcp_d.get("log_level", "INFO"))
+    mcp_metrics = mcp_d.get("metrics", False)
+    if "MCP_METRICS" in os.environ:
+        mcp_metrics = _to_bool(os.environ["MCP_METRICS"])
+    mcp_transport = os.getenv("MCP_TRANSPORT", mcp_d.get("transport", "stdio"))
+    if mcp_transport not in ("stdio", "streamable-http", "sse"):
+        raise ValueError(f"mcp.transport must be 'stdio', 'streamable-http' or 'sse', got {mcp_transport!r}")
 
     b_headless = browser_d.get("headless", False)
     if "BROWSER_HEADLESS" in os.environ:
@@ -104,8 +205,95 @@ def load_config(path: str | os.PathLike | None = None) -> AppConfig:
         ),
     )
 
+    pool = PoolConfig(
+        size=int(os.getenv("BROWSER_POOL_SIZE", pool_d.get("size", 0))),
+    )
+
+    logs = LogConfig(
+        console_capacity=int(logs_d.get("console_capacity", 1000)),
+        network_capacity=int(logs_d.get("network_capacity", 2000)),
+        transfer_sizes=bool(logs_d.get("transfer_sizes", True)),
+    )
+
+    block = BlockConfig(
+        resource_types=tuple(block_d.get("resource_types", ())),
+        url_patterns=tuple(block_d.get("url_patterns", ())),
+        domains=tuple(block_d.get("domains", ())),
+    )
+
+    c_enabled = cache_d.get("enabled", False)
+    if "BROWSER_CACHE" in os.environ:
+        c_enabled = _to_bool(os.environ["BROWSER_CACHE"])
+    cache = CacheConfig(
+        enabled=bool(c_enabled),
+        directory=os.getenv("BROWSER_CACHE_DIR", cache_d.get("directory", CacheConfig().directory)),
+        max_mb=int(cache_d.get("max_mb", 512)),
+        resource_types=tuple(cache_d.get("resource_types", CacheConfig().resource_types)),
+    )
+
+    a_endpoint = os.getenv("BROWSER_CDP_ENDPOINT", attach_d.get("cdp_endpoint", ""))
+    a_mode = os.getenv("BROWSER_ATTACH_MODE", attach_d.get("mode") or ("connect" if a_endpoint else "launch"))
+    if a_mode not in ("launch", "connect", "detached"):
+        raise ValueError(f"browser.attach.mode must be 'launch', 'connect' or 'detached', got {a_mode!r}")
+    attach = AttachConfig(
+        mode=a_mode,
+        cdp_endpoint=a_endpoint,
+        state_file=attach_d.get("state_file", AttachConfig().state_file),
+        user_data_dir=attach_d.get("user_data_dir", AttachConfig().user_data_dir),
+        executable_path=os.getenv("BROWSER_EXECUTABLE_PATH", attach_d.get("executable_path", "")),
+    )
+
+    p_enabled = profile_d.get("enabled", False)
+    if "BROWSER_PROFILE" in os.environ:
+        p_enabled = _to_bool(os.environ["BROWSER_PROFILE"])
+    profile = ProfileConfig(
+        enabled=bool(p_enabled),
+        user_data_dir=os.getenv("BROWSER_PROFILE_DIR", profile_d.get("user_data_dir", ProfileConfig().user_data_dir)),
+        template_dir=os.getenv("BROWSER_PROFILE_TEMPLATE", profile_d.get("template_dir", "")),
+        max_mb=int(profile_d.get("max_mb", 0)),
+    )
+    if profile.enabled and attach.mode != "launch":
+        raise ValueError("browser.profile requires browser.attach.mode = 'launch'")
+
+    snapshots = SnapshotConfig(
+        directory=os.getenv("BROWSER_SNAPSHOT_DIR", snapshots_d.get("directory", "")),
+        warm_contexts=int(os.getenv("BROWSER_SNAPSHOT_WARM", snapshots_d.get("warm_contexts", 0))),
+        warm_snapshots=int(snapshots_d.get("warm_snapshots", SnapshotConfig().warm_snapshots)),
+    )
+
+    g_enabled = governor_d.get("enabled", False)
+    if "BROWSER_GOVERNOR" in os.environ:
+        g_enabled = _to_bool(os.environ["BROWSER_GOVERNOR"])
+    governor = GovernorConfig(
+        enabled=bool(g_enabled),
+        interval_s=float(governor_d.get("interval_s", GovernorConfig().interval_s)),
+        soft_limit_mb=int(os.getenv("BROWSER_MEMORY_SOFT_MB", governor_d.get("soft_limit_mb", 0))),
+        hard_limit_mb=int(os.getenv("BROWSER_MEMORY_HARD_MB", governor_d.get("hard_limit_mb", 0))),
+        tab_idle_s=float(governor_d.get("tab_idle_s", GovernorConfig().tab_idle_s)),
+        tab_heap_mb=int(governor_d.get("tab_heap_mb", 0)),
+        hibernate_after_s=float(governor_d.get("hibernate_after_s", 0)),
+        max_hibernate=int(governor_d.get("max_hibernate", GovernorConfig().max_hibernate)),
+        js_heap=bool(governor_d.get("js_heap", True)),
+    )
+    if governor.interval_s <= 0:
+        raise ValueError("browser.governor.interval_s must be positive")
+
+    content = ContentConfig(
+        cache_max_mb=int(content_d.get("cache_max_mb", 64)),
+    )
+
     return AppConfig(
-        mcp=MCPConfig(host=mcp_host, port=mcp_port, log_level=mcp_log_level),
+        mcp=MCPConfig(
+            host=mcp_host,
+            port=mcp_port,
+            log_level=mcp_log_level,
+            metrics=bool(mcp_metrics),
+            transport=mcp_transport,
+            max_sessions=int(os.getenv("MCP_MAX_SESSIONS", mcp_d.get("max_sessions", 0))),
+            admission_timeout_s=float(mcp_d.get("admission_timeout_s", MCPConfig().admission_timeout_s)),
+            max_clients=int(mcp_d.get("max_clients", 0)),
+            client_idle_s=float(mcp_d.get("client_idle_s", MCPConfig().client_idle_s)),
+        ),
         browser=BrowserConfig(
             headless=bool(b_headless),
             proxy=b_proxy,
@@ -115,5 +303,20 @@ def load_config(path: str | os.PathLike | None = None) -> AppConfig:
             timezone_id=b_tz,
             viewport=viewport,
             launch=launch,
+            pool=pool,
+            block=block,
+            cache=cache,
+            attach=attach,
+            profile=profile,
+            snapshots=snapshots,
+            governor=governor,
         ),
+        logs=logs,
+        content=content,
     )
+
+
+@lru_cache(maxsize=None)
+def get_config() -> AppConfig:
+    """The default config (see `load_config`), parsed on first use and reused afterwards."""
+    return load_config()
@@ -0,0 +1,80 @@
+# stealth_kit/diff.py
+from __future__ import annotations
+
+import hashlib
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+_BLOCK_SPLIT = re.compile(r"\n\s*\n")
+
+
+def split_blocks(text: str) -> List[str]:
+    """Split extracted text into paragraph-like blocks on blank lines."""
+    return [b.strip() for b in _BLOCK_SPLIT.split(text) if b.strip()]
+
+
+def _block_hash(block: str) -> bytes:
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=8).digest()
+
+
+class ContentTracker:
+    """Last-seen content blocks of one tab and extraction target, for one navigation."""
+
+    __slots__ = ("navigation", "version", "_blocks", "_hashes")
+
+    def __init__(self, navigation: int) -> None:
+        self.navigation = navigation
+        self.version = 0
+        self._blocks: List[str] = []
+        self._hashes: List[bytes] = []
+
+    @property
+    def token(self) -> str:
+        return f"{self.navigation}.{self.version}"
+
+    def update(self, text: str, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Record `text` as the latest content and describe it relative to `since`.
+        Returns {"full": True, ...} when `since` is not the current version, else a block diff.
+        """
+        blocks = split_blocks(text)
+        hashes = [_block_hash(b) for b in blocks]
+        base = self.token
+        baseline = since is not None and since == base and self.version > 0
+
+        if hashes == self._hashes and self.version > 0:
+            if baseline:
+                return {"version": base, "base": base, "full": False, "unchanged": True,
+                        "added": [], "removed": [], "changed": []}
+            return {"version": base, "full": True, "blocks": len(blocks)}
+
+        old_blocks, old_hashes = self._blocks, self._hashes
+        self._blocks, self._hashes = blocks, hashes
+        self.version += 1
+        if not baseline:
+            return {"version": self.token, "full": True, "blocks": len(blocks)}
+
+        added: List[Dict[str, Any]] = []
+        removed: List[Dict[str, Any]] = []
+        changed: List[Dict[str, Any]] = []
+        matcher = SequenceMatcher(None, old_hashes, hashes, autojunk=False)
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                continue
+            paired = min(i2 - i1, j2 - j1) if op == "replace" else 0
+            for k in range(paired):
+                changed.append({"index": j1 + k, "old_index": i1 + k, "text": blocks[j1 + k]})
+            for j in range(j1 + paired, j2):
+                added.append({"index": j, "text": blocks[j]})
+            for i in range(i1 + paired, i2):
+                removed.append({"old_index": i, "text": old_blocks[i][:80]})
+        return {
+            "version": self.token,
+            "base": base,
+            "full": False,
+            "unchanged": False,
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+        }
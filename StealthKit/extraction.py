@@ -0,0 +1,73 @@
+# stealth_kit/extraction.py
+from __future__ import annotations
+
+import secrets
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+
+class CachedExtraction:
+    __slots__ = ("owner", "content", "size", "meta")
+
+    def __init__(self, owner: Hashable, content: str, meta: Dict[str, Any]) -> None:
+        self.owner = owner
+        self.content = content
+        self.size = len(content.encode("utf-8"))
+        self.meta = meta
+
+
+class ExtractionCache:
+    """LRU of full extracted documents, bounded by their total UTF-8 size."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CachedExtraction]" = OrderedDict()
+        self._by_owner: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, owner: Hashable, content: str, meta: Dict[str, Any]) -> Optional[str]:
+        """Store a document for `owner` (e.g. a tab) and return its id, or None if it can never fit."""
+        entry = CachedExtraction(owner, content, meta)
+        if entry.size > self.max_bytes:
+            return None
+        entry_id = secrets.token_hex(6)
+        self._entries[entry_id] = entry
+        self._by_owner.setdefault(owner, set()).add(entry_id)
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            old_id = next(iter(self._entries))
+            self._remove(old_id)
+            self.evictions += 1
+        return entry_id
+
+    def get(self, entry_id: str) -> Optional[CachedExtraction]:
+        entry = self._entries.get(entry_id)
+        if entry is not None:
+            self._entries.move_to_end(entry_id)
+        return entry
+
+    def invalidate(self, owner: Hashable) -> None:
+        """Drop every document of `owner`, e.g. after its tab navigated or closed."""
+        for entry_id in list(self._by_owner.get(owner, ())):
+            self._remove(entry_id)
+
+    def _remove(self, entry_id: str) -> None:
+        entry = self._entries.pop(entry_id)
+        self.total_bytes -= entry.size
+        ids = self._by_owner.get(entry.owner)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_owner[entry.owner]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
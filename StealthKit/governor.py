@@ -0,0 +1,207 @@
+# stealth_kit/governor.py
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .buffers import RingBuffer
+
+_MB = 1024 * 1024
+
+
+def _read_stat(pid: int) -> Optional[Tuple[int, int, int]]:
+    """(ppid, rss bytes, user + system CPU ticks) of a process from /proc, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    # Fields after "(comm)": state, ppid, ..., utime (14th field overall), stime (15th).
+    fields = stat[stat.rindex(b")") + 2 :].split()
+    return int(fields[1]), resident_pages * os.sysconf("SC_PAGE_SIZE"), int(fields[11]) + int(fields[12])
+
+
+def _process_role(pid: int) -> str:
+    """Chromium process type from its command line ("browser", "renderer", "gpu-process", ...)."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read()
+    except OSError:
+        return "other"
+    if b"run-driver" in cmdline:
+        return "driver"
+    for arg in cmdline.split(b"\0"):
+        if arg.startswith(b"--type="):
+            return arg[7:].decode("utf-8", "replace")
+    return "browser"
+
+
+class ProcessSampler:
+    def __init__(self) -> None:
+        """RSS and CPU of a browser process tree, read from /proc (Linux only)."""
+        self._roles: Dict[int, str] = {}
+        self._ticks: Dict[int, int] = {}
+        self._sampled = 0.0
+        self._hz = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def sample(self, root: int, include_root: bool) -> Optional[Dict[str, Any]]:
+        """
+        Walk `root` and its descendants. Blocking.
+        :param include_root: False when `root` is this server, whose browser is a descendant of
+            the Playwright driver; the server and driver are then reported apart from the browser.
+        """
+        if not os.path.isdir("/proc"):
+            return None
+        stats: Dict[int, Tuple[int, int, int]] = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                data = _read_stat(int(entry))
+                if data is not None:
+                    stats[int(entry)] = data
+        if root not in stats:
+            return None
+        children: Dict[int, List[int]] = {}
+        for pid, (ppid, _, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+        tree: List[int] = []
+        stack = [root] if include_root else list(children.get(root, ()))
+        while stack:
+            pid = stack.pop()
+            tree.append(pid)
+            stack.extend(children.get(pid, ()))
+
+        now = time.monotonic()
+        elapsed = now - self._sampled if self._sampled else 0.0
+        roles: Dict[int, str] = {}
+        ticks: Dict[int, int] = {}
+        by_role: Dict[str, Dict[str, Any]] = {}
+        rss = cpu_ticks = driver_rss = 0
+        for pid in tree:
+            role = roles[pid] = self._roles.get(pid) or _process_role(pid)
+            _, pid_rss, pid_ticks = stats[pid]
+            ticks[pid] = pid_ticks
+            if role == "driver":
+                driver_rss += pid_rss
+                continue
+            rss += pid_rss
+            cpu_ticks += pid_ticks - self._ticks.get(pid, pid_ticks)
+            entry = by_role.setdefault(role, {"count": 0, "rss_mb": 0.0})
+            entry["count"] += 1
+            entry["rss_mb"] += pid_rss / _MB
+        self._roles, self._ticks, self._sampled = roles, ticks, now
+
+        result: Dict[str, Any] = {
+            "processes": sum(e["count"] for e in by_role.values()),
+            "rss_bytes": rss,
+            "rss_mb": round(rss / _MB, 1),
+            # Over the interval since the previous sample; None on the first one.
+            "cpu_percent": round(cpu_ticks / self._hz / elapsed * 100, 1) if elapsed > 0 else None,
+            "by_role": {role: dict(e, rss_mb=round(e["rss_mb"], 1)) for role, e in sorted(by_role.items())},
+        }
+        if not include_root:
+            result["server_rss_mb"] = round(stats[root][1] / _MB, 1)
+            result["driver_rss_mb"] = round(driver_rss / _MB, 1)
+        return result
+
+
+class Governor:
+    def __init__(
+        self,
+        interval_s: float = 30.0,
+        soft_limit_mb: int = 0,
+        hard_limit_mb: int = 0,
+        tab_idle_s: float = 120.0,
+        tab_heap_mb: int = 0,
+        hibernate_after_s: float = 0.0,
+        max_hibernate: int = 4,
+        js_heap: bool = True,
+    ):
+        """
+        Memory budgets for the shared browser and the bookkeeping of what was done about them.
+        :param soft_limit_mb: Above this browser RSS, idle tabs are hibernated, largest JS heap first.
+        :param hard_limit_mb: Above this browser RSS, the whole browser is restarted.
+        :param tab_idle_s: Tabs untouched for this long may be hibernated under memory pressure.
+        :param tab_heap_mb: An idle tab whose JS heap exceeds this is hibernated regardless of RSS.
+        :param hibernate_after_s: Hibernate any tab idle this long, memory or not; 0 disables.
+        :param max_hibernate: Tabs hibernated per check, so a spike does not empty the browser at once.
+        :param js_heap: Read each tab's JS heap size over CDP on every check.
+        """
+        self.interval_s = interval_s
+        self.soft_bytes = soft_limit_mb * _MB
+        self.hard_bytes = hard_limit_mb * _MB
+        self.tab_idle_s = tab_idle_s
+        self.tab_heap_bytes = tab_heap_mb * _MB
+        self.hibernate_after_s = hibernate_after_s
+        self.max_hibernate = max_hibernate
+        self.js_heap = js_heap
+        self.processes = ProcessSampler()
+        self.events = RingBuffer(200)
+        self.counts = {"checks": 0, "hibernated": 0, "restored": 0, "recycled": 0, "errors": 0}
+        self.last: Optional[Dict[str, Any]] = None
+        self.last_recycle = 0.0
+        # page id -> CDP session used for heap reads
+        self._cdp: Dict[int, Any] = {}
+
+    def record(self, action: str, **detail: Any) -> None:
+        self.events.append({"at": round(time.time(), 3), "action": action, **detail})
+        key = {"hibernate": "hibernated", "restore": "restored", "recycle": "recycled", "error": "errors"}.get(action)
+        if key is not None:
+            self.counts[key] += 1
+
+    async def heap_bytes(self, page: Any) -> Optional[int]:
+        """Used JS heap of `page` via CDP Runtime.getHeapUsage, or None when unavailable."""
+        try:
+            cdp = self._cdp.get(id(page))
+            if cdp is None:
+                cdp = self._cdp[id(page)] = await page.context.new_cdp_session(page)
+            usage = await cdp.send("Runtime.getHeapUsage")
+            return int(usage["usedSize"])
+        except Exception:
+            self._cdp.pop(id(page), None)
+            return None
+
+    def forget(self, page: Any) -> None:
+        """Drop the CDP session of a page that is going away; it detaches with the page."""
+        self._cdp.pop(id(page), None)
+
+    def plan(self, rss: Optional[int], tabs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """Tabs to hibernate now, with the reason, from sampled `tabs` rows marked `eligible`."""
+        chosen: Dict[Tuple[str, str], str] = {}
+        idle = [t for t in tabs if t["eligible"] and t["idle_s"] >= self.tab_idle_s]
+        # Largest heap first, then longest idle.
+        idle.sort(key=lambda t: (t["js_heap_bytes"] or 0, t["idle_s"]), reverse=True)
+        if self.tab_heap_bytes > 0:
+            for t in idle:
+                if (t["js_heap_bytes"] or 0) > self.tab_heap_bytes:
+                    chosen.setdefault((t["session"], t["tab"]), "tab_heap")
+        if self.hibernate_after_s > 0:
+            for t in tabs:
+                if t["eligible"] and t["idle_s"] >= self.hibernate_after_s:
+                    chosen.setdefault((t["session"], t["tab"]), "idle")
+        if self.soft_bytes > 0 and rss is not None and rss > self.soft_bytes:
+            for t in idle:
+                chosen.setdefault((t["session"], t["tab"]), "soft_limit")
+        by_key = {(t["session"], t["tab"]): t for t in tabs}
+        return [(by_key[key], reason) for key, reason in list(chosen.items())[: self.max_hibernate]]
+
+    def should_recycle(self, rss: Optional[int]) -> bool:
+        if self.hard_bytes <= 0 or rss is None or rss <= self.hard_bytes:
+            return False
+        # Give a restarted browser a few checks to settle before judging it again.
+        return time.monotonic() - self.last_recycle >= self.interval_s * 4
+
+    def stats(self, limit: int = 50) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval_s,
+            "soft_limit_mb": self.soft_bytes // _MB,
+            "hard_limit_mb": self.hard_bytes // _MB,
+            "tab_idle_s": self.tab_idle_s,
+            "tab_heap_mb": self.tab_heap_bytes // _MB,
+            "hibernate_after_s": self.hibernate_after_s,
+            **self.counts,
+            "last": self.last,
+            "events": list(self.events.tail(limit)),
+        }
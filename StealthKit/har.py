@@ -0,0 +1,104 @@
+# stealth_kit/har.py
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .buffers import NetworkRecord, timing_phases
+
+HAR_CREATOR = {"name": "browser-stealthkit-mcp", "version": "1.0"}
+
+
+def _iso(epoch_s: Optional[float]) -> str:
+    if epoch_s is None:
+        epoch_s = 0.0
+    return datetime.fromtimestamp(epoch_s, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _headers(headers: Optional[Dict[str, str]]) -> List[Dict[str, str]]:
+    return [{"name": k, "value": v} for k, v in (headers or {}).items()]
+
+
+def har_entry(rec: NetworkRecord, pageref: Optional[str] = None) -> Dict[str, Any]:
+    """One HAR 1.2 entry for a network record; unknown sizes and timings are -1."""
+    timing = rec.timing or {}
+    start_ms = timing.get("startTime", -1)
+    started = start_ms / 1000 if start_ms and start_ms > 0 else rec.started
+    phases = timing_phases(rec.timing) or {
+        "blocked": -1, "dns": -1, "connect": -1, "ssl": -1, "send": 0, "wait": -1, "receive": -1, "total": -1,
+    }
+    total = phases.pop("total")
+    sizes = rec.sizes or {}
+    response_headers = rec.response_headers or {}
+
+    entry: Dict[str, Any] = {
+        "startedDateTime": _iso(started),
+        "time": max(total, 0),
+        "request": {
+            "method": rec.method,
+            "url": rec.url,
+            "httpVersion": "",
+            "cookies": [],
+            "headers": _headers(rec.request_headers),
+            "queryString": [{"name": k, "value": v} for k, v in parse_qsl(urlsplit(rec.url).query, keep_blank_values=True)],
+            "headersSize": sizes.get("requestHeadersSize", -1),
+            "bodySize": sizes.get("requestBodySize", -1),
+        },
+        "response": {
+            "status": rec.status or 0,
+            "statusText": rec.status_text or "",
+            "httpVersion": "",
+            "cookies": [],
+            "headers": _headers(response_headers),
+            "content": {
+                "size": sizes.get("responseBodySize", -1),
+                "mimeType": response_headers.get("content-type", ""),
+            },
+            "redirectURL": response_headers.get("location", ""),
+            "headersSize": sizes.get("responseHeadersSize", -1),
+            "bodySize": sizes.get("responseBodySize", -1),
+            "_transferSize": rec.transfer_size if rec.transfer_size is not None else -1,
+        },
+        "cache": {},
+        "timings": phases,
+        "_resourceType": rec.resource_type,
+    }
+    if pageref is not None:
+        entry["pageref"] = pageref
+    if rec.failure:
+        entry["response"]["_error"] = rec.failure
+    return entry
+
+
+def write_har(
+    path: str,
+    pages: Iterable[Tuple[str, str, Optional[float]]],
+    records: Iterable[Tuple[Optional[str], NetworkRecord]],
+) -> Dict[str, int]:
+    """
+    Stream a HAR file to `path`, serializing one entry at a time.
+    :param pages: (id, title, started epoch seconds) of each page.
+    :param records: (pageref, record) pairs in the order they should appear.
+    """
+    har_pages = [
+        {"startedDateTime": _iso(started), "id": page_id, "title": title, "pageTimings": {}}
+        for page_id, title, started in pages
+    ]
+    entries = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"log": {"version": "1.2", "creator": ')
+        f.write(json.dumps(HAR_CREATOR))
+        f.write(', "pages": ')
+        f.write(json.dumps(har_pages, ensure_ascii=False))
+        f.write(', "entries": [')
+        for pageref, rec in records:
+            if entries:
+                f.write(",")
+            f.write("\n")
+            f.write(json.dumps(har_entry(rec, pageref), ensure_ascii=False))
+            entries += 1
+        f.write("\n]}}\n")
+        size = f.tell()
+    return {"entries": entries, "bytes": size}
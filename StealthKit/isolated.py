@@ -0,0 +1,88 @@
+# stealth_kit/isolated.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+
+
+class IsolatedWorld:
+    def __init__(self, page: Any, name: str = "stealthkit"):
+        """
+        Run scripts in an isolated world of a page's main frame over CDP: the same DOM, but
+        separate JS globals, so trackers kept there (observers, WeakMaps) are invisible to page
+        scripts. One world per document; it dies with the document on cross-document navigation
+        and survives same-document ones (pushState, hash changes).
+        Runtime is never enabled on the CDP session, since that alone is detectable.
+        :param name: World name; not visible to the page.
+        """
+        self.page = page
+        self.name = name
+        self._cdp: Any = None
+        self._context_id: Optional[int] = None
+        # Loader of the document the world was made in; re-checked after main-frame navigations.
+        self._loader_id: Optional[str] = None
+        self._verify = False
+        self._lock = asyncio.Lock()
+
+    async def session(self) -> Any:
+        """The page's CDP session, shared with other CDP users of the tab (e.g. screenshots)."""
+        if self._cdp is None:
+            self._cdp = await self.page.context.new_cdp_session(self.page)
+        return self._cdp
+
+    def navigated(self) -> None:
+        """Call on main-frame navigation: the next use checks whether the document changed."""
+        self._verify = True
+
+    async def _context(self) -> int:
+        async with self._lock:
+            tree = None
+            if self._context_id is not None and self._verify:
+                cdp = await self.session()
+                tree = await cdp.send("Page.getFrameTree")
+                if tree["frameTree"]["frame"].get("loaderId") != self._loader_id:
+                    self._context_id = None
+            self._verify = False
+            if self._context_id is None:
+                cdp = await self.session()
+                frame = (tree or await cdp.send("Page.getFrameTree"))["frameTree"]["frame"]
+                world = await cdp.send("Page.createIsolatedWorld", {"frameId": frame["id"], "worldName": self.name})
+                self._context_id = world["executionContextId"]
+                self._loader_id = frame.get("loaderId")
+            return self._context_id
+
+    async def evaluate(self, function: str, arg: Any = None) -> Any:
+        """Call `function` (JS source) with `arg` in the world and return its JSON value, awaiting promises."""
+        params = {
+            "functionDeclaration": function,
+            "arguments": [{"value": arg}] if arg is not None else [],
+            "returnByValue": True,
+            "awaitPromise": True,
+        }
+        for attempt in range(2):
+            context_id = await self._context()
+            cdp = await self.session()
+            try:
+                result = await cdp.send("Runtime.callFunctionOn", {**params, "executionContextId": context_id})
+            except Exception as exc:
+                # The document went away under a cached context: make a world in the new one, once.
+                if attempt or "context" not in str(exc).lower():
+                    raise
+                if self._context_id == context_id:
+                    self._context_id = None
+                continue
+            details = result.get("exceptionDetails")
+            if details is not None:
+                exception = details.get("exception") or {}
+                raise RuntimeError(exception.get("description") or details.get("text") or "Script failed")
+            return result["result"].get("value")
+        raise RuntimeError("Isolated world is unavailable")
+
+    async def close(self) -> None:
+        cdp, self._cdp = self._cdp, None
+        self._context_id = None
+        if cdp is not None:
+            try:
+                await cdp.detach()
+            except Exception:
+                pass
@@ -39,3 +39,141 @@ WebGLRenderingContext.prototype.getParameter = function(parameter) {
     return getParameter(parameter);
 };
 """
+
+# Single-pass content extractor: `(root, opts) => {content, title, url, links}`.
+# opts = {mode: "text" | "markdown" | "html", includeLinks: bool, fullDocument: bool}.
+# Whitespace is normalized in the page so only the final string crosses CDP.
+EXTRACT_JS = r"""
+(root, opts) => {
+    const mode = opts.mode || 'text';
+    const norm = (s) => s
+        .replace(/\u00a0/g, ' ')
+        .replace(/[ \t]+\n/g, '\n')
+        .replace(/\n{3,}/g, '\n\n')
+        .trim();
+
+    const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'CANVAS', 'IFRAME',
+        'OBJECT', 'HEAD', 'META', 'LINK', 'INPUT', 'SELECT', 'TEXTAREA', 'BUTTON']);
+    const BLOCK = new Set(['P', 'DIV', 'SECTION', 'ARTICLE', 'MAIN', 'HEADER', 'FOOTER', 'NAV',
+        'ASIDE', 'FORM', 'FIGURE', 'FIGCAPTION', 'DL', 'DT', 'DD', 'ADDRESS', 'FIELDSET',
+        'DETAILS', 'SUMMARY', 'CAPTION', 'LI', 'BODY']);
+    const visible = (el) => !el.hidden
+        && el.getAttribute('aria-hidden') !== 'true'
+        && (!el.checkVisibility || el.checkVisibility());
+
+    // <pre> blocks are swapped out so whitespace normalization cannot touch them.
+    const verbatim = [];
+    const keep = (s) => '\u0000' + (verbatim.push(s) - 1) + '\u0000';
+
+    const children = (el, inList) => {
+        let out = '';
+        for (const c of el.childNodes) out += md(c, inList);
+        return out;
+    };
+    const oneLine = (s) => s.replace(/\s+/g, ' ').trim();
+
+    function md(node, inList) {
+        if (node.nodeType === 3) return node.nodeValue.replace(/\s+/g, ' ');
+        if (node.nodeType !== 1) return '';
+        const el = node;
+        const tag = el.tagName;
+        if (SKIP.has(tag) || !visible(el)) return '';
+        switch (tag) {
+            case 'H1': case 'H2': case 'H3': case 'H4': case 'H5': case 'H6': {
+                const t = oneLine(children(el, false));
+                return t ? '\n\n' + '#'.repeat(+tag[1]) + ' ' + t + '\n\n' : '';
+            }
+            case 'BR':
+                return '\n';
+            case 'HR':
+                return '\n\n---\n\n';
+            case 'STRONG': case 'B': {
+                const t = children(el, inList).trim();
+                return t ? '**' + t + '**' : '';
+            }
+            case 'EM': case 'I': {
+                const t = children(el, inList).trim();
+                return t ? '*' + t + '*' : '';
+            }
+            case 'CODE':
+                return '`' + el.textContent + '`';
+            case 'PRE': {
+                const code = el.querySelector('code');
+                const m = code && /language-([\w+-]+)/.exec(code.className);
+                const body = el.innerText.replace(/\n+$/, '');
+                return '\n\n' + keep('```' + (m ? m[1] : '') + '\n' + body + '\n```') + '\n\n';
+            }
+            case 'A': {
+                const t = oneLine(children(el, inList));
+                if (!t) return '';
+                const href = el.href;
+                return href && !href.startsWith('javascript:') ? '[' + t + '](' + href + ')' : t;
+            }
+            case 'IMG':
+                return el.alt ? '![' + oneLine(el.alt) + '](' + el.src + ')' : '';
+            case 'UL': case 'OL': {
+                const lines = [];
+                // The DOM already defaults start (1, or the item count when reversed); 0 is valid.
+                let n = tag === 'OL' ? el.start : 0;
+                const step = tag === 'OL' && el.reversed ? -1 : 1;
+                for (const li of el.children) {
+                    if (li.tagName !== 'LI' || !visible(li)) continue;
+                    const marker = tag === 'OL' ? n + '. ' : '- ';
+                    n += step;
+                    const body = norm(children(li, true)).replace(/\n+/g, '\n');
+                    lines.push(marker + body.replace(/\n/g, '\n' + ' '.repeat(marker.length)));
+                }
+                if (!lines.length) return '';
+                return inList ? '\n' + lines.join('\n') + '\n' : '\n\n' + lines.join('\n') + '\n\n';
+            }
+            case 'TABLE': {
+                const rows = [];
+                for (const tr of el.rows) {
+                    if (!visible(tr)) continue;
+                    rows.push(Array.from(tr.cells, (c) => oneLine(children(c, false)).replace(/\|/g, '\\|')));
+                }
+                if (!rows.length) return '';
+                const width = Math.max(...rows.map((r) => r.length));
+                const line = (r) => '| ' + r.concat(Array(width - r.length).fill('')).join(' | ') + ' |';
+                const out = [line(rows[0]), '|' + ' --- |'.repeat(width)];
+                for (const r of rows.slice(1)) out.push(line(r));
+                return '\n\n' + out.join('\n') + '\n\n';
+            }
+            case 'BLOCKQUOTE': {
+                const t = norm(children(el, false));
+                return t ? '\n\n' + t.split('\n').map((l) => '> ' + l).join('\n') + '\n\n' : '';
+            }
+            default:
+                if (BLOCK.has(tag)) return '\n\n' + children(el, inList) + '\n\n';
+                return children(el, inList);
+        }
+    }
+
+    let content = '';
+    if (!root) {
+        content = '';
+    } else if (mode === 'html') {
+        if (opts.fullDocument) {
+            const dt = document.doctype;
+            content = (dt ? new XMLSerializer().serializeToString(dt) : '') + document.documentElement.outerHTML;
+        } else {
+            content = root.innerHTML;
+        }
+    } else if (mode === 'markdown') {
+        content = norm(md(root, false).replace(/\n[ \t]+(?![ \t]|(?:[-*]|\d+\.) )/g, '\n'))
+            .replace(/\u0000(\d+)\u0000/g, (_, i) => verbatim[+i]);
+    } else {
+        content = norm(root.innerText || '');
+    }
+
+    let links = null;
+    if (opts.includeLinks && root) {
+        const scope = opts.fullDocument ? document : root;
+        links = Array.from(scope.querySelectorAll('a[href]'), (a) => ({
+            text: (a.textContent || '').trim().slice(0, 200),
+            href: a.href,
+        })).filter((x) => x.href);
+    }
+    return {content, title: document.title, url: location.href, links};
+}
+"""
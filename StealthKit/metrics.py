@@ -0,0 +1,266 @@
+# stealth_kit/metrics.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import functools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .buffers import RingBuffer
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with Prometheus semantics (le = upper bound, inclusive).
+    Quantiles come from the most recent samples rather than from the coarse buckets.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "recent")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 256) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = RingBuffer(window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def summary(self, scale: float = 1.0, digits: int = 2) -> Dict[str, Any]:
+        if self.count == 0:
+            return {"count": 0}
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count * scale, digits),
+            "p50": round(recent[(len(recent) - 1) // 2] * scale, digits),
+            "p95": round(recent[int((len(recent) - 1) * 0.95)] * scale, digits),
+            "max_recent": round(recent[-1] * scale, digits),
+        }
+
+
+class CallStats:
+    """Time and round trips accumulated by one tool call, including nested calls."""
+
+    __slots__ = ("playwright_s", "round_trips", "serialize_s", "queue_s")
+
+    def __init__(self) -> None:
+        self.playwright_s = 0.0
+        self.round_trips = 0
+        self.serialize_s = 0.0
+        self.queue_s = 0.0
+
+    def absorb(self, other: "CallStats") -> None:
+        self.playwright_s += other.playwright_s
+        self.round_trips += other.round_trips
+        self.serialize_s += other.serialize_s
+        self.queue_s += other.queue_s
+
+
+_current_call: ContextVar[Optional[CallStats]] = ContextVar("stealthkit_call", default=None)
+
+
+class ToolMetrics:
+    __slots__ = ("calls", "errors", "duration", "queue", "playwright", "serialize", "round_trips")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.duration = Histogram()
+        self.queue = Histogram()
+        self.playwright = Histogram()
+        self.serialize = Histogram()
+        self.round_trips = Histogram(COUNT_BUCKETS)
+
+    def record(self, elapsed: float, stats: CallStats) -> None:
+        self.calls += 1
+        self.duration.observe(elapsed)
+        self.queue.observe(stats.queue_s)
+        self.playwright.observe(stats.playwright_s)
+        self.serialize.observe(stats.serialize_s)
+        self.round_trips.observe(stats.round_trips)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ms": self.duration.summary(1000),
+            "queue_ms": self.queue.summary(1000),
+            "playwright_ms": self.playwright.summary(1000),
+            "serialize_ms": self.serialize.summary(1000),
+            "round_trips": self.round_trips.summary(),
+        }
+
+
+class Metrics:
+    def __init__(self, prefix: str = "stealthkit") -> None:
+        """Per-tool latency histograms and counters, exposed as a dict or Prometheus text."""
+        self.prefix = prefix
+        self.started = time.time()
+        self.tools: Dict[str, ToolMetrics] = {}
+
+    def instrument(self, name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Wrap an async tool so each call records its latency, errors and Playwright usage."""
+        tool = self.tools.setdefault(name, ToolMetrics())
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            parent = _current_call.get()
+            stats = CallStats()
+            token = _current_call.set(stats)
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                tool.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                _current_call.reset(token)
+                tool.record(elapsed, stats)
+                if parent is not None:
+                    parent.absorb(stats)
+
+        return wrapper
+
+    @staticmethod
+    def add_serialization(seconds: float) -> None:
+        stats = _current_call.get()
+        if stats is not None:
+            stats.serialize_s += seconds
+
+    @staticmethod
+    @asynccontextmanager
+    async def locked(lock: asyncio.Lock) -> AsyncIterator[None]:
+        """`async with lock`, counting the wait as queue time of the current tool call."""
+        started = time.perf_counter()
+        async with lock:
+            stats = _current_call.get()
+            if stats is not None:
+                stats.queue_s += time.perf_counter() - started
+            yield
+
+    def snapshot(self, gauges: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "playwright_instrumented": _playwright_instrumented,
+            "gauges": gauges or {},
+            "tools": {name: t.summary() for name, t in sorted(self.tools.items()) if t.calls},
+        }
+
+    def render_prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        p = self.prefix
+        lines: List[str] = []
+        active = sorted((name, t) for name, t in self.tools.items() if t.calls)
+
+        for metric, attr, help_text in (
+            ("tool_calls_total", "calls", "Tool calls."),
+            ("tool_errors_total", "errors", "Tool calls that raised."),
+        ):
+            lines.append(f"# HELP {p}_{metric} {help_text}")
+            lines.append(f"# TYPE {p}_{metric} counter")
+            for name, t in active:
+                lines.append(f'{p}_{metric}{{tool="{name}"}} {getattr(t, attr)}')
+
+        for metric, attr, help_text in (
+            ("tool_duration_seconds", "duration", "Tool call latency."),
+            ("tool_queue_seconds", "queue", "Time a tool call waited on server-side locks."),
+            ("tool_playwright_seconds", "playwright", "Time a tool call spent in Playwright calls."),
+            ("tool_serialize_seconds", "serialize", "Time a tool call spent serializing its result."),
+            ("tool_round_trips", "round_trips", "Playwright round trips per tool call."),
+        ):
+            lines.append(f"# HELP {p}_{metric} {help_text}")
+            lines.append(f"# TYPE {p}_{metric} histogram")
+            for name, t in active:
+                h: Histogram = getattr(t, attr)
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{p}_{metric}_bucket{{tool="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{p}_{metric}_bucket{{tool="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'{p}_{metric}_sum{{tool="{name}"}} {h.sum:.6f}')
+                lines.append(f'{p}_{metric}_count{{tool="{name}"}} {h.count}')
+
+        gauges = dict(gauges or {})
+        gauges["uptime_seconds"] = time.time() - self.started
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+_playwright_instrumented = False
+
+
+def instrument_playwright() -> bool:
+    """
+    Time Playwright protocol calls made inside tool calls by wrapping the driver channel.
+    This relies on Playwright internals; if they change, metrics simply lack Playwright time.
+    """
+    global _playwright_instrumented
+    if _playwright_instrumented:
+        return True
+    try:
+        from playwright._impl._connection import Channel
+    except Exception:
+        return False
+
+    def _wrap(original: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(original)
+        async def timed(self: Any, *args: Any, **kwargs: Any) -> Any:
+            stats = _current_call.get()
+            if stats is None:
+                return await original(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await original(self, *args, **kwargs)
+            finally:
+                stats.playwright_s += time.perf_counter() - started
+                stats.round_trips += 1
+
+        return timed
+
+    patched = False
+    for attr in ("send", "send_return_as_dict"):
+        original = getattr(Channel, attr, None)
+        if original is not None and asyncio.iscoroutinefunction(original):
+            setattr(Channel, attr, _wrap(original))
+            patched = True
+    _playwright_instrumented = patched
+    return patched
+
+
+async def serve_prometheus(host: str, port: int, render: Callable[[], str]) -> asyncio.AbstractServer:
+    """Minimal HTTP server answering GET /metrics with `render()`."""
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+                body = render().encode("utf-8")
+                head = "HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            else:
+                body = b"Not Found\n"
+                head = "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+            writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(_handle, host, port)
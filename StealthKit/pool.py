@@ -0,0 +1,122 @@
+# stealth_kit/pool.py
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class ContextPool:
+    def __init__(self, sb, size, proxy=None, storage_state=None):
+        """
+        Keep `size` ready-to-use stealth contexts on a launched StealthBrowser.
+        :param sb: StealthBrowser whose browser is already launched.
+        :param size: Number of warm contexts to keep ready.
+        :param proxy: Proxy server the pooled contexts are created with.
+        :param storage_state: Optional storage_state dict every pooled context starts from.
+        """
+        self.sb = sb
+        self.size = size
+        self.proxy = proxy
+        self.storage_state = storage_state
+        self._ready: Deque[Any] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.refills = 0
+        self.refill_errors = 0
+        self.refill_seconds_total = 0.0
+        self.last_refill_seconds = 0.0
+
+    def start(self) -> None:
+        """Begin filling the pool in the background."""
+        self._schedule_refill()
+
+    async def acquire(self, storage_state=None):
+        """
+        Take a warm context, or create one if the pool is empty.
+        :param storage_state: Optional path or dict. Cookies are applied to the pooled
+            context; states carrying localStorage bypass the pool and get a fresh context.
+        """
+        cookies = None
+        if storage_state is not None:
+            state = storage_state
+            if not isinstance(state, dict):
+                state = await asyncio.to_thread(_read_json, state)
+            if any(o.get("localStorage") for o in state.get("origins") or []):
+                # localStorage can only be seeded at context creation time.
+                self.bypassed += 1
+                return await self.sb.new_context(storage_state=state, proxy=self.proxy)
+            cookies = state.get("cookies") or []
+
+        if self._ready:
+            self.hits += 1
+            context = self._ready.popleft()
+        else:
+            self.misses += 1
+            context = await self.sb.new_context(proxy=self.proxy, storage_state=self.storage_state)
+        self._schedule_refill()
+
+        if cookies:
+            await context.add_cookies(cookies)
+        return context
+
+    def _schedule_refill(self) -> None:
+        if self._closed or len(self._ready) >= self.size:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while not self._closed and len(self._ready) < self.size:
+            started = time.perf_counter()
+            try:
+                context = await self.sb.new_context(proxy=self.proxy, storage_state=self.storage_state)
+            except Exception:
+                self.refill_errors += 1
+                return
+            if self._closed:
+                await context.close()
+                return
+            self._ready.append(context)
+            self.last_refill_seconds = time.perf_counter() - started
+            self.refill_seconds_total += self.last_refill_seconds
+            self.refills += 1
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        while self._ready:
+            try:
+                await self._ready.popleft().close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+            "refills": self.refills,
+            "refill_errors": self.refill_errors,
+            "refill_ms_avg": round(self.refill_seconds_total * 1000 / self.refills, 2) if self.refills else None,
+            "refill_ms_last": round(self.last_refill_seconds * 1000, 2),
+        }
+
+
+def _read_json(path: Any) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
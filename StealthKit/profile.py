@@ -0,0 +1,220 @@
+# stealth_kit/profile.py
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+LOCK_NAME = ".stealthkit.lock"
+
+# Profile-relative directories that only hold caches; pruning them keeps cookies,
+# localStorage, IndexedDB and logins intact.
+CACHE_DIRS = (
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/DawnCache",
+    "Default/DawnGraphiteCache",
+    "Default/Service Worker/CacheStorage",
+    "Default/Service Worker/ScriptCache",
+    "GrShaderCache",
+    "GraphiteDawnCache",
+    "ShaderCache",
+    "component_crx_cache",
+)
+
+# Chromium's own per-run files, which must not travel with a template copy.
+_COPY_IGNORE = shutil.ignore_patterns("Singleton*", "lockfile", "DevToolsActivePort", LOCK_NAME)
+
+# A run directory without a lock file is being created by another process for this long.
+_COPY_GRACE_SECONDS = 60.0
+
+_held: Set[str] = set()
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock_owner(directory: Path) -> Optional[int]:
+    """Pid holding the lock on `directory`, or None if unlocked or the lock is stale."""
+    lock = directory / LOCK_NAME
+    try:
+        pid = int(lock.read_text(encoding="utf-8").strip() or 0)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        pid = 0
+    if pid == os.getpid():
+        return pid if str(lock) in _held else None
+    return pid if _pid_alive(pid) else None
+
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfileLock:
+    def __init__(self, directory: Path):
+        """
+        Exclusive use of a profile directory by this process, held through a pid file.
+        Locks left by processes that are no longer running are taken over.
+        """
+        self.directory = directory
+        self.path = directory / LOCK_NAME
+
+    def acquire(self) -> None:
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                owner = _lock_owner(self.directory)
+                if owner is not None:
+                    raise RuntimeError(f"Profile {self.directory} is in use by process {owner}.")
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+            _held.add(str(self.path))
+            return
+        raise RuntimeError(f"Could not lock profile {self.directory}.")
+
+    def release(self) -> None:
+        if str(self.path) in _held:
+            _held.discard(str(self.path))
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class Profile:
+    def __init__(self, directory: str, template: Optional[str] = None, max_bytes: int = 0):
+        """
+        A Chromium user data directory reserved for this process.
+        :param directory: The profile directory, or the parent of per-run copies when `template` is set.
+        :param template: Golden profile copied into a fresh directory on open and deleted on close.
+        :param max_bytes: Prune cache directories once the profile grows past this size; 0 disables.
+        """
+        self.directory = Path(directory).resolve()
+        self.template = Path(template).resolve() if template else None
+        self.max_bytes = max_bytes
+        self.path: Optional[Path] = None
+        self.pruned_bytes = 0
+        self._lock: Optional[ProfileLock] = None
+
+    def open(self) -> str:
+        """Lock (and, in template mode, create) the directory to launch with. Blocking."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.template is None:
+            path = self.directory
+        else:
+            if not self.template.is_dir():
+                raise FileNotFoundError(f"Profile template {self.template} does not exist.")
+            owner = _lock_owner(self.template)
+            if owner is not None:
+                raise RuntimeError(f"Profile template {self.template} is in use by process {owner}; close it first.")
+            self.sweep()
+            path = self.directory / f"run-{os.getpid()}-{int(time.time() * 1000)}"
+            path.mkdir()
+
+        lock = ProfileLock(path)
+        lock.acquire()
+        try:
+            if self.template is not None:
+                shutil.copytree(self.template, path, ignore=_COPY_IGNORE, dirs_exist_ok=True)
+            self.prune(path)
+        except BaseException:
+            lock.release()
+            if self.template is not None:
+                shutil.rmtree(path, ignore_errors=True)
+            raise
+        self.path, self._lock = path, lock
+        return str(path)
+
+    def close(self) -> None:
+        """Release the profile once the browser has exited: drop a template copy, else prune it. Blocking."""
+        path, self.path = self.path, None
+        lock, self._lock = self._lock, None
+        if path is None:
+            return
+        try:
+            if self.template is not None:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                self.prune(path)
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def prune(self, path: Path) -> List[str]:
+        """Delete cache directories, largest first, until the profile fits in `max_bytes`."""
+        if self.max_bytes <= 0:
+            return []
+        total = directory_size(path)
+        if total <= self.max_bytes:
+            return []
+        caches = [(directory_size(path / rel), rel) for rel in CACHE_DIRS if (path / rel).is_dir()]
+        pruned = []
+        for size, rel in sorted(caches, reverse=True):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path / rel, ignore_errors=True)
+            total -= size
+            self.pruned_bytes += size
+            pruned.append(rel)
+        return pruned
+
+    def sweep(self) -> None:
+        """Remove per-run copies left behind by template-mode processes that died."""
+        now = time.time()
+        for run in self.directory.glob("run-*"):
+            if not run.is_dir() or _lock_owner(run) is not None:
+                continue
+            if not (run / LOCK_NAME).exists() and now - run.stat().st_mtime < _COPY_GRACE_SECONDS:
+                continue
+            shutil.rmtree(run, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        path = self.path or self.directory
+        return {
+            "path": str(path),
+            "template": str(self.template) if self.template else None,
+            "size_mb": round(directory_size(path) / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "pruned_mb": round(self.pruned_bytes / (1024 * 1024), 1),
+        }
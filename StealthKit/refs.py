@@ -0,0 +1,219 @@
+# stealth_kit/refs.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Set
+
+from .isolated import IsolatedWorld
+
+INTERACTIVE_QUERY = (
+    'a[href], button, input:not([type="hidden"]), select, textarea, summary, '
+    '[contenteditable=""], [contenteditable="true"], [onclick], [tabindex]:not([tabindex="-1"]), '
+    '[role="button"], [role="link"], [role="checkbox"], [role="radio"], [role="switch"], [role="tab"], '
+    '[role="menuitem"], [role="menuitemcheckbox"], [role="menuitemradio"], [role="option"], '
+    '[role="combobox"], [role="textbox"], [role="searchbox"], [role="slider"], [role="spinbutton"]'
+)
+
+# Collects visible interactive elements as compact "ref role "name" extras" lines. Runs in
+# an isolated world: refs are remembered per element in a WeakMap on that world's global,
+# invisible to page scripts, so the same element keeps its ref across snapshots of one
+# document; numbering continues from `base` (owned by the server) so a ref is never reused
+# within a tab. Each element is reported by its position in the query's results, for PICK_JS.
+# Returns {refs, lines, indexes, tags, count, next, total}.
+ELEMENTS_JS = r"""
+({query, base, maxElements, viewportOnly, nameChars}) => {
+    let st = globalThis.skRefs;
+    if (!st) st = globalThis.skRefs = {map: new WeakMap(), next: base};
+    const INPUT_ROLES = {button: 'button', submit: 'button', reset: 'button', image: 'button',
+        checkbox: 'checkbox', radio: 'radio', range: 'slider', number: 'spinbutton', search: 'searchbox'};
+    const clean = (s, n) => {
+        s = (s || '').replace(/\s+/g, ' ').trim();
+        return s.length > n ? s.slice(0, n - 1) + '…' : s;
+    };
+    const quote = (s) => JSON.stringify(s);
+    const role = (el) => {
+        const explicit = el.getAttribute('role');
+        if (explicit) return explicit.split(' ')[0];
+        const tag = el.tagName.toLowerCase();
+        if (tag === 'a') return 'link';
+        if (tag === 'button' || tag === 'summary') return 'button';
+        if (tag === 'select') return el.multiple || el.size > 1 ? 'listbox' : 'combobox';
+        if (tag === 'textarea' || el.isContentEditable) return 'textbox';
+        if (tag === 'input') return INPUT_ROLES[(el.type || 'text').toLowerCase()] || 'textbox';
+        return 'clickable';
+    };
+    const name = (el) => {
+        let s = el.getAttribute('aria-label');
+        if (!s && el.hasAttribute('aria-labelledby')) {
+            s = el.getAttribute('aria-labelledby').split(/\s+/)
+                .map((id) => { const l = document.getElementById(id); return l ? l.textContent : ''; }).join(' ');
+        }
+        if (!s && el.labels && el.labels.length) s = Array.from(el.labels).map((l) => l.innerText).join(' ');
+        if (!s && el.tagName === 'INPUT' && ['button', 'submit', 'reset'].includes(el.type)) s = el.value;
+        if (!s && el.tagName === 'INPUT' && el.type === 'image') s = el.alt;
+        if (!s && !['INPUT', 'TEXTAREA', 'SELECT'].includes(el.tagName)) s = el.innerText;
+        if (!s) {
+            const img = el.querySelector && el.querySelector('img[alt]');
+            s = (img && img.alt) || el.getAttribute('placeholder') || el.getAttribute('title') || '';
+        }
+        return clean(s, nameChars);
+    };
+    const vw = window.innerWidth, vh = window.innerHeight;
+    const refs = [], lines = [], indexes = [], tags = [];
+    const all = document.querySelectorAll(query);
+    let total = 0;
+    for (let i = 0; i < all.length; i++) {
+        const el = all[i];
+        if (el.closest('[aria-hidden="true"], [inert]')) continue;
+        const rect = el.getBoundingClientRect();
+        if (rect.width <= 0 || rect.height <= 0) continue;
+        if (getComputedStyle(el).visibility === 'hidden') continue;
+        if (viewportOnly && (rect.bottom < 0 || rect.right < 0 || rect.top > vh || rect.left > vw)) continue;
+        total += 1;
+        if (refs.length >= maxElements) continue;
+        let ref = st.map.get(el);
+        if (!ref) {
+            ref = 'e' + st.next++;
+            st.map.set(el, ref);
+        }
+        const r = role(el);
+        let line = ref + ' ' + r + ' ' + quote(name(el));
+        if (r === 'link') {
+            const href = el.getAttribute('href') || '';
+            if (href && !href.startsWith('javascript:')) line += ' href=' + clean(href, 100);
+        }
+        if (el.tagName === 'SELECT') {
+            const opt = el.selectedOptions && el.selectedOptions[0];
+            if (opt) line += ' value=' + quote(clean(opt.text, nameChars));
+        } else if (r === 'textbox' || r === 'searchbox' || r === 'spinbutton' || r === 'slider') {
+            const v = el.isContentEditable ? el.innerText : el.value;
+            if (v) line += ' value=' + quote(el.type === 'password' ? '•••' : clean(v, nameChars));
+        }
+        if (el.checked || el.getAttribute('aria-checked') === 'true') line += ' checked';
+        if (el.disabled || el.getAttribute('aria-disabled') === 'true') line += ' disabled';
+        const expanded = el.getAttribute('aria-expanded');
+        if (expanded) line += ' expanded=' + expanded;
+        refs.push(ref);
+        lines.push(line);
+        indexes.push(i);
+        tags.push(el.tagName);
+    }
+    return {refs, lines, indexes, tags, count: all.length, next: st.next, total};
+}
+"""
+
+# Main-world counterpart: the elements at `indexes` of the same query, for Playwright handles.
+# Stateless; returns null if the DOM changed since ELEMENTS_JS ran.
+PICK_JS = r"""
+({query, indexes, tags, count}) => {
+    const all = document.querySelectorAll(query);
+    if (all.length !== count) return null;
+    const els = indexes.map((i) => all[i]);
+    return els.every((el, k) => el.tagName === tags[k]) ? els : null;
+}
+"""
+
+
+class ElementRefs:
+    def __init__(self, max_handles: int = 5000, next_id: int = 1):
+        """
+        Ref -> ElementHandle map of one tab, filled by `snapshot` and cleared when a new document loads.
+        :param max_handles: Oldest handles beyond this are released.
+        :param next_id: First ref number to hand out; a reopened tab carries on from its old page.
+        """
+        self.max_handles = max_handles
+        self.handles: Dict[str, Any] = {}
+        # Never reset, so a ref from an old document cannot hit an element of a new one.
+        self.next_id = next_id
+
+    def invalidate(self) -> None:
+        """Forget every handle; they died with the document."""
+        self.handles = {}
+
+    async def snapshot(
+        self,
+        page: Any,
+        world: IsolatedWorld,
+        max_elements: int = 200,
+        viewport_only: bool = False,
+        name_chars: int = 80,
+    ) -> Dict[str, Any]:
+        """
+        Collect interactive elements, keep a handle per ref and return {lines, count, total}.
+        :param world: The page's isolated world, which numbers the elements.
+        """
+        for _ in range(3):
+            info = await world.evaluate(
+                ELEMENTS_JS,
+                {
+                    "query": INTERACTIVE_QUERY,
+                    "base": self.next_id,
+                    "maxElements": max_elements,
+                    "viewportOnly": viewport_only,
+                    "nameChars": name_chars,
+                },
+            )
+            self.next_id = max(self.next_id, info["next"])
+            if not info["refs"]:
+                props: Dict[str, Any] = {}
+                break
+            array = await page.evaluate_handle(
+                PICK_JS,
+                {"query": INTERACTIVE_QUERY, "indexes": info["indexes"], "tags": info["tags"], "count": info["count"]},
+            )
+            try:
+                props = await array.get_properties()
+            finally:
+                _release(array)
+            if len(props) == len(info["refs"]):
+                break
+            for prop in props.values():
+                _release(prop)
+        else:
+            raise RuntimeError("The page kept changing during the snapshot; try again.")
+
+        handles = self.handles
+        for i, ref in enumerate(info["refs"]):
+            prop = props.get(str(i))
+            element = prop.as_element() if prop is not None else None
+            if element is None:
+                continue
+            old = handles.pop(ref, None)
+            if old is not None:
+                _release(old)
+            handles[ref] = element
+        while len(handles) > self.max_handles:
+            _release(handles.pop(next(iter(handles))))
+        return {"lines": info["lines"], "count": len(info["lines"]), "total": info["total"]}
+
+    def get(self, ref: str) -> Any:
+        handle = self.handles.get(ref)
+        if handle is None:
+            raise ValueError(f"Unknown ref: {ref}. Refs expire on navigation; take a new browser_element_snapshot.")
+        return handle
+
+    async def is_stale(self, ref: str) -> bool:
+        handle = self.handles.get(ref)
+        if handle is None:
+            return True
+        try:
+            return not await handle.evaluate("(el) => el.isConnected")
+        except Exception:
+            return True
+
+
+_releasing: Set["asyncio.Task[Any]"] = set()
+
+
+def _release(handle: Any) -> None:
+    """Dispose a JS handle in the background; it may already be gone with its document."""
+
+    async def _dispose() -> None:
+        try:
+            await handle.dispose()
+        except Exception:
+            pass
+
+    task = asyncio.ensure_future(_dispose())
+    _releasing.add(task)
+    task.add_done_callback(_releasing.discard)
@@ -0,0 +1,93 @@
+# stealth_kit/routing.py
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+
+class BlockPolicy:
+    def __init__(
+        self,
+        resource_types: Iterable[str] = (),
+        url_patterns: Iterable[str] = (),
+        domains: Iterable[str] = (),
+    ):
+        """
+        Precompiled request-blocking rules.
+        :param resource_types: Playwright resource types, e.g. "image", "font", "media".
+        :param url_patterns: fnmatch-style globs over the full URL, e.g. "*/analytics.js*".
+        :param domains: Hosts blocked together with all of their subdomains, e.g. "doubleclick.net".
+        """
+        self.resource_types = frozenset(t.strip().lower() for t in resource_types if t.strip())
+        self.url_patterns = tuple(p for p in url_patterns if p)
+        self.domains = frozenset(d.strip().lower().strip(".") for d in domains if d.strip())
+        # One alternation instead of a regex scan per pattern.
+        self._url_re = (
+            re.compile("|".join(fnmatch.translate(p) for p in self.url_patterns)) if self.url_patterns else None
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.resource_types or self.url_patterns or self.domains)
+
+    def match(self, url: str, resource_type: str) -> Optional[str]:
+        """Return the reason a request is blocked, or None if it is allowed."""
+        if resource_type in self.resource_types:
+            return "resource_type"
+        if self.domains and self._host_blocked(urlsplit(url).hostname or ""):
+            return "domain"
+        if self._url_re is not None and self._url_re.match(url):
+            return "url_pattern"
+        return None
+
+    def _host_blocked(self, host: str) -> bool:
+        # Check "a.b.example.com", "b.example.com", "example.com", "com" against the suffix set.
+        while host:
+            if host in self.domains:
+                return True
+            dot = host.find(".")
+            if dot < 0:
+                return False
+            host = host[dot + 1 :]
+        return False
+
+
+class RequestBlocker:
+    def __init__(self, policy: BlockPolicy):
+        """Route handler applying a BlockPolicy to one context and counting what it blocks."""
+        self.policy = policy
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_reason: Dict[str, int] = {}
+        self.blocked_by_type: Dict[str, int] = {}
+
+    async def attach(self, context: Any) -> None:
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Any) -> None:
+        request = route.request
+        resource_type = request.resource_type
+        reason = self.policy.match(request.url, resource_type)
+        if reason is None:
+            self.allowed += 1
+            # Let later-registered handlers (or the network) take the request.
+            await route.fallback()
+            return
+        self.blocked += 1
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        await route.abort("blockedbyclient")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "blocked_by_type": dict(self.blocked_by_type),
+            "policy": {
+                "resource_types": sorted(self.policy.resource_types),
+                "url_patterns": list(self.policy.url_patterns),
+                "domains": sorted(self.policy.domains),
+            },
+        }
@@ -0,0 +1,130 @@
+# stealth_kit/screenshot.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from .isolated import IsolatedWorld
+from .stability import NetworkActivity
+
+# Returns a fingerprint of everything that can change a rendered frame short of
+# animations/canvas/video: a per-document epoch, a DOM mutation counter, scroll
+# position, viewport and document size. Runs in an isolated world, so the observer
+# and its state are invisible to page scripts and go away with the document.
+FRAME_STATE_JS = """
+() => {
+    let st = globalThis.skFrame;
+    if (!st) {
+        st = globalThis.skFrame = {epoch: Math.random().toString(36).slice(2), mutations: 0};
+        new MutationObserver((records) => { st.mutations += records.length; }).observe(
+            document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    const el = document.scrollingElement || document.documentElement;
+    return [st.epoch, st.mutations, window.scrollX, window.scrollY, window.innerWidth,
+            window.innerHeight, el ? el.scrollWidth : 0, el ? el.scrollHeight : 0,
+            window.devicePixelRatio || 1];
+}
+"""
+
+IMAGE_TYPES = {"png", "jpeg", "webp"}
+
+# Requests open longer than this (long polls, streams) do not hold off frame reuse.
+LONG_REQUEST_S = 5.0
+
+
+class PageCapturer:
+    def __init__(self, page: Any, world: IsolatedWorld, network: Optional[NetworkActivity] = None):
+        """
+        Screenshot one page over CDP, remembering the last frame and its fingerprint.
+        :param world: The page's isolated world; its CDP session is used for capturing too.
+        :param network: The page's request tracker. Image and font loads change frames without
+            touching the DOM, so a frame is not reused while requests are in flight, nor after
+            any request started or finished since it was taken.
+        """
+        self.page = page
+        self.world = world
+        self.network = network
+        self._last_key: Optional[Tuple[Any, ...]] = None
+        self._last: Optional[Dict[str, Any]] = None
+        self.captures = 0
+        self.reused = 0
+
+    async def capture(
+        self,
+        image_type: str = "png",
+        quality: Optional[int] = None,
+        full_page: bool = True,
+        selector: Optional[str] = None,
+        clip: Optional[Dict[str, float]] = None,
+        scale: float = 1.0,
+        max_dimension: Optional[int] = None,
+        reuse: bool = False,
+        timeout_ms: int = 10000,
+    ) -> Dict[str, Any]:
+        """
+        Capture a frame and return {"data": base64, "width", "height", "mime_type", "unchanged"}.
+        :param selector: Capture only this element's bounding box.
+        :param clip: {"x", "y", "width", "height"} in CSS pixels; document coordinates when
+            `full_page` is true, viewport coordinates otherwise.
+        :param scale: Output pixels per CSS pixel, e.g. 0.5 to halve the resolution.
+        :param max_dimension: Cap on the output's longer side, in pixels.
+        :param reuse: Return the previous frame, flagged `unchanged`, if nothing changed since.
+            Best effort: hover/focus styles, CSS animations, canvas and video are not tracked.
+        """
+        if image_type not in IMAGE_TYPES:
+            raise ValueError(f"image_type must be one of {sorted(IMAGE_TYPES)}.")
+        if quality is not None and image_type == "png":
+            raise ValueError("quality applies to 'jpeg' and 'webp' only.")
+
+        state = await self.world.evaluate(FRAME_STATE_JS)
+        scroll_x, scroll_y, inner_w, inner_h, doc_w, doc_h, dpr = state[2:]
+
+        if selector:
+            box = await self.page.locator(selector).first.bounding_box(timeout=timeout_ms)
+            if box is None:
+                raise ValueError(f"Element is not visible: {selector}")
+            region = (box["x"] + scroll_x, box["y"] + scroll_y, box["width"], box["height"])
+        elif clip:
+            offset_x, offset_y = (0, 0) if full_page else (scroll_x, scroll_y)
+            region = (clip["x"] + offset_x, clip["y"] + offset_y, clip["width"], clip["height"])
+        elif full_page:
+            region = (0, 0, doc_w, doc_h)
+        else:
+            region = (scroll_x, scroll_y, inner_w, inner_h)
+
+        x, y, width, height = region
+        if width <= 0 or height <= 0:
+            raise ValueError("Capture region is empty.")
+        out_scale = scale
+        if max_dimension:
+            out_scale = min(out_scale, max_dimension / max(width, height))
+
+        network = self.network
+        # Moves whenever a request starts or finishes.
+        requests = network.last_change if network is not None else None
+        key = (self.page.url, tuple(state), requests, region, image_type, quality, out_scale)
+        if network is not None and network.pending(LONG_REQUEST_S):
+            reuse = False
+        if reuse and self._last is not None and key == self._last_key:
+            self.reused += 1
+            return {**self._last, "unchanged": True}
+
+        params: Dict[str, Any] = {
+            "format": image_type,
+            "captureBeyondViewport": True,
+            # CDP scales device pixels; divide out the DPR so `scale` means output px per CSS px.
+            "clip": {"x": x, "y": y, "width": width, "height": height, "scale": out_scale / dpr},
+        }
+        if quality is not None:
+            params["quality"] = quality
+        cdp = await self.world.session()
+        shot = await cdp.send("Page.captureScreenshot", params)
+        self.captures += 1
+
+        frame = {
+            "mime_type": f"image/{image_type}",
+            "data": shot["data"],
+            "width": round(width * out_scale),
+            "height": round(height * out_scale),
+        }
+        self._last_key, self._last = key, frame
+        return {**frame, "unchanged": False}
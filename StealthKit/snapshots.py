@@ -0,0 +1,109 @@
+# stealth_kit/snapshots.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,63}")
+
+
+class StorageSnapshot:
+    __slots__ = ("name", "state", "saved", "path")
+
+    def __init__(self, name: str, state: Dict[str, Any], path: Optional[str] = None) -> None:
+        self.name = name
+        self.state = state
+        self.saved = time.time()
+        self.path = path
+
+    def summary(self) -> Dict[str, Any]:
+        origins = self.state.get("origins") or []
+        return {
+            "name": self.name,
+            "saved": round(self.saved, 3),
+            "cookies": len(self.state.get("cookies") or []),
+            "origins": len(origins),
+            "local_storage_items": sum(len(o.get("localStorage") or []) for o in origins),
+            "path": self.path,
+        }
+
+
+class SnapshotStore:
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """
+        Named storage_state snapshots held in memory.
+        :param directory: Optional write-through directory; snapshots saved with `persist` are
+            written there as <name>.json, and names missing from memory are looked up there.
+        """
+        self.directory = Path(directory) if directory else None
+        self._snapshots: Dict[str, StorageSnapshot] = {}
+
+    def _file(self, name: str) -> Path:
+        if self.directory is None:
+            raise ValueError("Snapshot write-through is off; set browser.snapshots.directory.")
+        return self.directory / f"{name}.json"
+
+    @staticmethod
+    def check_name(name: str) -> str:
+        if not _NAME_RE.fullmatch(name):
+            raise ValueError(f"Invalid snapshot name {name!r}: use up to 64 letters, digits, '.', '_' or '-'.")
+        return name
+
+    async def save(self, name: str, state: Dict[str, Any], persist: bool = False) -> StorageSnapshot:
+        self.check_name(name)
+        path = None
+        if persist:
+            target = self._file(name)
+            await asyncio.to_thread(_write_json, target, state)
+            path = str(target)
+        snapshot = self._snapshots[name] = StorageSnapshot(name, state, path)
+        return snapshot
+
+    async def get(self, name: str) -> StorageSnapshot:
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None:
+            return snapshot
+        if self.directory is not None and _NAME_RE.fullmatch(name):
+            target = self._file(name)
+            try:
+                state = await asyncio.to_thread(lambda: json.loads(target.read_text(encoding="utf-8")))
+            except FileNotFoundError:
+                pass
+            else:
+                snapshot = self._snapshots[name] = StorageSnapshot(name, state, str(target))
+                return snapshot
+        raise ValueError(f"Unknown snapshot: {name}")
+
+    async def delete(self, name: str, delete_file: bool = False) -> bool:
+        """Forget `name`; with `delete_file`, also remove its write-through file. True if anything was removed."""
+        removed = self._snapshots.pop(name, None) is not None
+        if delete_file and self.directory is not None and _NAME_RE.fullmatch(name):
+            try:
+                await asyncio.to_thread(os.unlink, self._file(name))
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Snapshots in memory, plus write-through files not loaded yet (marked `in_memory: False`)."""
+        items = [dict(s.summary(), in_memory=True) for _, s in sorted(self._snapshots.items())]
+        if self.directory is not None and self.directory.is_dir():
+            for file in sorted(self.directory.glob("*.json")):
+                if file.stem not in self._snapshots and _NAME_RE.fullmatch(file.stem):
+                    items.append({"name": file.stem, "path": str(file), "in_memory": False})
+        return items
+
+
+def _write_json(target: Path, state: Dict[str, Any]) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".snapshot-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, target)
@@ -0,0 +1,198 @@
+# stealth_kit/stability.py
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from .isolated import IsolatedWorld
+
+# Resolves once the page has been quiet for `quietMs`, or after `timeoutMs`. Activity is
+# recorded by a MutationObserver (structural and attribute changes kept apart) and a
+# layout-shift PerformanceObserver, installed once per document. Runs in an isolated
+# world, so page scripts cannot see the observers or their state.
+STABLE_JS = """
+async ({quietMs, timeoutMs, attributes, layout}) => {
+    let st = globalThis.skStable;
+    if (!st) {
+        const now = performance.now();
+        st = globalThis.skStable = {dom: now, attr: now, shift: -Infinity, mutations: 0, shifts: 0, score: 0};
+        new MutationObserver((records) => {
+            const t = performance.now();
+            for (const r of records) {
+                if (r.type === 'attributes') st.attr = t; else st.dom = t;
+            }
+            st.mutations += records.length;
+        }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+        try {
+            new PerformanceObserver((list) => {
+                for (const e of list.getEntries()) {
+                    if (e.hadRecentInput) continue;
+                    st.shift = performance.now();
+                    st.shifts += 1;
+                    st.score += e.value;
+                }
+            }).observe({type: 'layout-shift', buffered: false});
+        } catch (e) {}
+    }
+    const started = performance.now();
+    const m0 = st.mutations, s0 = st.shifts, c0 = st.score;
+    while (true) {
+        const last = {dom: st.dom};
+        if (attributes) last.attr = st.attr;
+        if (layout) last.layout = st.shift;
+        const latest = Math.max(...Object.values(last));
+        const now = performance.now();
+        const idle = now - latest;
+        const elapsed = now - started;
+        if (idle >= quietMs || elapsed >= timeoutMs) {
+            return {
+                quiet: idle >= quietMs,
+                busy: Object.keys(last).filter((k) => now - last[k] < quietMs),
+                mutations: st.mutations - m0,
+                shifts: st.shifts - s0,
+                shift_score: Math.round((st.score - c0) * 10000) / 10000,
+            };
+        }
+        await new Promise((r) => setTimeout(r, Math.max(16, Math.min(quietMs - idle, timeoutMs - elapsed))));
+    }
+}
+"""
+
+
+class NetworkActivity:
+    """In-flight requests of one page, fed from its request events."""
+
+    __slots__ = ("inflight", "last_change", "started", "_changed")
+
+    def __init__(self) -> None:
+        self.inflight: Dict[Any, float] = {}
+        self.last_change = time.monotonic()
+        self.started = 0
+        self._changed = asyncio.Event()
+
+    def request_started(self, req: Any) -> None:
+        self.inflight[req] = time.monotonic()
+        self.started += 1
+        self._touch()
+
+    def request_done(self, req: Any) -> None:
+        if self.inflight.pop(req, None) is not None:
+            self._touch()
+
+    def _touch(self) -> None:
+        self.last_change = time.monotonic()
+        self._changed.set()
+
+    def pending(self, long_request_s: float) -> List[Any]:
+        """Requests in flight, minus those open longer than `long_request_s` (long polls, streams)."""
+        now = time.monotonic()
+        return [req for req, t in self.inflight.items() if now - t < long_request_s]
+
+    async def wait_changed(self, timeout: float) -> None:
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def wait_for_stable(
+    page: Any,
+    world: IsolatedWorld,
+    network: Optional[NetworkActivity],
+    quiet_ms: int = 500,
+    timeout_ms: int = 10000,
+    attributes: bool = True,
+    layout_shifts: bool = True,
+    long_request_ms: int = 5000,
+) -> Dict[str, Any]:
+    """
+    Wait until DOM mutations, layout shifts and (with `network`) in-flight requests have all
+    been quiet for `quiet_ms`. Never raises on timeout; the report says what was still busy.
+    :param world: The page's isolated world, where the DOM and layout observers run.
+    """
+    started = time.monotonic()
+    deadline = started + timeout_ms / 1000
+    quiet = quiet_ms / 1000
+    long_request_s = long_request_ms / 1000
+    spent = {"network_ms": 0.0, "dom_ms": 0.0}
+    totals = {"mutations": 0, "shifts": 0, "shift_score": 0.0}
+    busy: List[str] = []
+    stable = False
+    requests_before = network.started if network is not None else 0
+
+    def network_quiet() -> bool:
+        return network is None or (
+            not network.pending(long_request_s) and time.monotonic() - network.last_change >= quiet
+        )
+
+    while True:
+        # Network: event-driven, no round trips to the page.
+        phase = time.monotonic()
+        while not network_quiet():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if network.pending(long_request_s):
+                # Wake on the next request event; re-check periodically for the long-request cutoff.
+                timeout = min(remaining, 0.25)
+            else:
+                timeout = min(remaining, quiet - (time.monotonic() - network.last_change))
+            await network.wait_changed(max(timeout, 0.001))
+        spent["network_ms"] += (time.monotonic() - phase) * 1000
+        if not network_quiet():
+            busy = ["network"]
+            break
+
+        # DOM and layout: one evaluate that resolves in the page once it has been quiet.
+        phase = time.monotonic()
+        remaining_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+        try:
+            dom = await world.evaluate(
+                STABLE_JS,
+                {"quietMs": quiet_ms, "timeoutMs": remaining_ms, "attributes": attributes, "layout": layout_shifts},
+            )
+        except Exception:
+            # Navigated mid-wait: the tracker is gone with the old document; start over on the new one.
+            if page.is_closed():
+                raise
+            if time.monotonic() >= deadline:
+                busy = ["navigation"]
+                break
+            await asyncio.sleep(0.05)
+            continue
+        finally:
+            spent["dom_ms"] += (time.monotonic() - phase) * 1000
+        totals["mutations"] += dom["mutations"]
+        totals["shifts"] += dom["shifts"]
+        totals["shift_score"] += dom["shift_score"]
+        if not dom["quiet"]:
+            busy = dom["busy"]
+            break
+        # Requests may have started while the page was being watched.
+        if network_quiet():
+            stable = True
+            break
+        if time.monotonic() >= deadline:
+            busy = ["network"]
+            break
+
+    report: Dict[str, Any] = {
+        "stable": stable,
+        "waited_ms": round((time.monotonic() - started) * 1000, 1),
+        "quiet_ms": quiet_ms,
+        "waited_for": {k: round(v, 1) for k, v in spent.items()},
+        "dom_mutations": totals["mutations"],
+        "layout_shifts": totals["shifts"],
+        "layout_shift_score": round(totals["shift_score"], 4),
+    }
+    if network is not None:
+        pending = network.pending(long_request_s)
+        report["requests_started"] = network.started - requests_before
+        report["requests_pending"] = len(pending)
+        report["pending_urls"] = [req.url for req in pending[:5]]
+        report["long_requests_ignored"] = len(network.inflight) - len(pending)
+    if not stable:
+        report["busy"] = busy
+    return report
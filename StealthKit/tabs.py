@@ -0,0 +1,133 @@
+# stealth_kit/tabs.py
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# browser_list_tabs sort keys -> row field, ascending. "idle" orders by last activity,
+# so the least recently used tabs come first.
+SORT_FIELDS = {
+    "index": "index",
+    "idle": "last_activity",
+    "opened": "opened",
+    "url": "url",
+    "title": "title",
+}
+
+
+class TabInfo:
+    """Listing metadata of one tab, kept current from page events so listing needs no round trips."""
+
+    __slots__ = (
+        "tab",
+        "url",
+        "title",
+        "load_state",
+        "opened",
+        "last_activity",
+        "navigations",
+        "_title_dirty",
+        "_title_task",
+    )
+
+    def __init__(self, tab: str, url: str) -> None:
+        self.tab = tab
+        self.url = url
+        self.title = ""
+        self.load_state = "load"
+        self.opened = self.last_activity = time.time()
+        self.navigations = 0
+        self._title_dirty = False
+        self._title_task: Optional["asyncio.Task[None]"] = None
+
+    def touch(self) -> None:
+        self.last_activity = time.time()
+
+    def navigated(self, url: str) -> None:
+        self.url = url
+        self.navigations += 1
+        self.touch()
+
+    def refresh_title(self, page: Any) -> None:
+        """Re-read the title in the background; requests arriving mid-read collapse into one more read."""
+        self._title_dirty = True
+        if self._title_task is None or self._title_task.done():
+            self._title_task = asyncio.ensure_future(self._read_title(page))
+
+    async def _read_title(self, page: Any) -> None:
+        while self._title_dirty:
+            self._title_dirty = False
+            try:
+                self.title = await page.title()
+            except Exception:
+                # Closed, or navigating away; the next load event reads it again.
+                return
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "tab": self.tab,
+            "url": self.url,
+            "title": self.title,
+            "load_state": self.load_state,
+            "opened": round(self.opened, 3),
+            "last_activity": round(self.last_activity, 3),
+            "idle_s": round(now - self.last_activity, 1),
+            "navigations": self.navigations,
+        }
+
+
+class HibernatedTab:
+    """A tab whose page was closed to save memory, with what is needed to reopen it under the same id."""
+
+    __slots__ = ("info", "url", "scroll", "lock", "next_ref", "since")
+
+    def __init__(self, info: TabInfo, url: str, scroll: List[float], lock: asyncio.Lock, next_ref: int = 1) -> None:
+        self.info = info
+        self.url = url
+        self.scroll = scroll
+        self.lock = lock
+        # Element ref numbering carries on after the tab is reopened.
+        self.next_ref = next_ref
+        self.since = time.time()
+
+
+def filter_tabs(
+    rows: List[Dict[str, Any]],
+    url_pattern: Optional[str] = None,
+    title_contains: Optional[str] = None,
+    load_state: Optional[str] = None,
+    min_idle_s: Optional[float] = None,
+    sort: str = "index",
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Filter and order `browser_list_tabs` rows.
+    :param url_pattern: fnmatch-style glob over the full URL, e.g. "*://*.example.com/*".
+    :param title_contains: Case-insensitive substring of the title.
+    :param sort: One of SORT_FIELDS.
+    """
+    field = SORT_FIELDS.get(sort)
+    if field is None:
+        raise ValueError(f"Invalid sort: {sort}. Allowed: {sorted(SORT_FIELDS)}")
+    url_re = re.compile(fnmatch.translate(url_pattern)) if url_pattern else None
+    needle = title_contains.lower() if title_contains else None
+    if url_re is not None:
+        rows = [r for r in rows if url_re.match(r["url"])]
+    if needle is not None:
+        rows = [r for r in rows if needle in r["title"].lower()]
+    if load_state is not None:
+        rows = [r for r in rows if r["load_state"] == load_state]
+    if min_idle_s is not None:
+        rows = [r for r in rows if r["idle_s"] >= min_idle_s]
+    if field != "index" or descending:
+        # Hibernated tabs have no index; rows without a value go last in either direction.
+        rows = sorted((r for r in rows if r[field] is not None), key=lambda r: r[field], reverse=descending) + [
+            r for r in rows if r[field] is None
+        ]
+    if limit is not None:
+        rows = rows[: max(0, limit)]
+    return rows
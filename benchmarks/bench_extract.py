@@ -0,0 +1,107 @@
+# benchmarks/bench_extract.py
+"""
+Compare the single-pass extractor with the previous three-round-trip extraction.
+
+    python -m benchmarks.bench_extract --sections 200 2000 --iterations 10 --channel chromium
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from StealthKit import StealthBrowser  # noqa: E402
+from benchmarks.fixtures import FixtureServer, large_document  # noqa: E402
+import mcp_server  # noqa: E402
+
+
+_LEGACY_LINKS_JS = """(sel) => {
+    const root = sel ? document.querySelector(sel) : document;
+    if (!root) return [];
+    const as = Array.from(root.querySelectorAll('a[href]'));
+    return as.map(a => ({
+        text: (a.textContent || '').trim().slice(0, 200),
+        href: a.href
+    })).filter(x => x.href);
+}"""
+
+
+def _legacy_normalize(s: str) -> str:
+    s = s.replace("\u00a0", " ")
+    s = re.sub(r"[ \t]+\n", "\n", s)
+    s = re.sub(r"\n{3,}", "\n\n", s)
+    return s.strip()
+
+
+async def legacy_extract(page: Any) -> Dict[str, Any]:
+    raw = _legacy_normalize(await page.evaluate("() => document.body ? document.body.innerText : ''"))
+    return {
+        "content": raw,
+        "url": page.url,
+        "title": await page.title(),
+        "links": await page.evaluate(_LEGACY_LINKS_JS, None),
+    }
+
+
+async def _measure(fn, iterations: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    payload = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        payload = len(json.dumps(result, ensure_ascii=False))
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "payload_bytes": payload,
+    }
+
+
+async def run(sections: List[int], iterations: int, channel: str, headless: bool) -> List[Dict[str, Any]]:
+    pages = {
+        f"/doc-{n}.html": ("text/html; charset=utf-8", large_document(n).encode("utf-8")) for n in sections
+    }
+    results = []
+    with FixtureServer(pages) as server:
+        async with StealthBrowser(headless=headless, channel=channel) as sb:
+            page = await sb.get_page()
+            for n in sections:
+                await page.goto(f"{server.base_url}/doc-{n}.html")
+                row: Dict[str, Any] = {"sections": n, "html_bytes": len(pages[f"/doc-{n}.html"][1])}
+                row["legacy_text"] = await _measure(lambda: legacy_extract(page), iterations)
+                for mode in ("text", "markdown"):
+                    row[mode] = await _measure(
+                        lambda: mcp_server._extract_content(page, mode=mode, max_chars=10**9), iterations
+                    )
+                results.append(row)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--channel", default="chromium")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sections, args.iterations, args.channel, headless=not args.headed))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_startup.py
+"""
+Measure server startup: `import mcp_server` in a fresh interpreter, and time from spawning
+`mcp_server.py` over stdio to the first `list_tools` response. Exits 1 if the p50 exceeds the
+budget or if importing the server pulls in Playwright.
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 2500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import mcp_server
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({"import_ms": elapsed, "playwright_loaded": "playwright" in sys.modules}))
+"""
+
+
+def measure_import() -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+async def measure_list_tools() -> Tuple[float, int]:
+    """Milliseconds from spawning the server to the first list_tools result, and the tool count."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[str(ROOT / "mcp_server.py")], cwd=str(ROOT))
+    started = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = await session.list_tools()
+            elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, len(tools.tools)
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(statistics.median(values), 1),
+        "min_ms": round(min(values), 1),
+        "max_ms": round(max(values), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2500.0, help="Budget for p50 time-to-first-list_tools.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    list_tools = [asyncio.run(measure_list_tools()) for _ in range(args.runs)]
+
+    result = {
+        "runs": args.runs,
+        "import": _stats([r["import_ms"] for r in imports]),
+        "playwright_loaded_at_import": any(r["playwright_loaded"] for r in imports),
+        "time_to_list_tools": _stats([ms for ms, _ in list_tools]),
+        "tools": list_tools[-1][1],
+        "budget_ms": args.budget_ms,
+    }
+    failures = []
+    if result["playwright_loaded_at_import"]:
+        failures.append("importing mcp_server loaded Playwright")
+    if result["time_to_list_tools"]["p50_ms"] > args.budget_ms:
+        failures.append(f"time to list_tools p50 {result['time_to_list_tools']['p50_ms']} ms > {args.budget_ms} ms")
+    result["failures"] = failures
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# benchmarks/bench_tools.py
+"""
+Drive the MCP tools in-process against local fixture sites, single-client and with N
+concurrent clients (one session each), and report latency, throughput, payload and RSS.
+
+    python -m benchmarks.bench_tools --clients 1 4 --iterations 5 --channel chromium --output run.json
+    python -m benchmarks.bench_tools --compare baseline.json run.json --threshold 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fixtures import (  # noqa: E402
+    FixtureServer,
+    infinite_scroll_api,
+    infinite_scroll_page,
+    large_document,
+    links_page,
+    spa_api,
+    spa_page,
+)
+import mcp_server  # noqa: E402
+
+# (label, tool, arguments); labels keep repeated tools with different arguments apart.
+Step = Tuple[str, str, Dict[str, Any]]
+
+
+def fixture_pages() -> Dict[str, Tuple[str, bytes]]:
+    html = "text/html; charset=utf-8"
+    pages = {
+        "/doc.html": (html, large_document(500).encode("utf-8")),
+        "/spa.html": (html, spa_page(60).encode("utf-8")),
+        "/links.html": (html, links_page(10000).encode("utf-8")),
+        "/feed.html": (html, infinite_scroll_page(20, 20).encode("utf-8")),
+    }
+    pages.update(spa_api(60))
+    pages.update(infinite_scroll_api(20, 20))
+    return pages
+
+
+def scenarios(base_url: str) -> Dict[str, List[Step]]:
+    scroll: List[Step] = []
+    for k in range(5):
+        scroll.append((f"browser_scroll_by[{k}]", "browser_scroll_by", {"delta_y": 3000}))
+        scroll.append(
+            (f"browser_wait_for_selector[{k}]", "browser_wait_for_selector",
+             {"selector": f"#item-{(k + 2) * 20 - 1}", "state": "attached"})
+        )
+    return {
+        "static_doc": [
+            ("browser_navigate", "browser_navigate", {"url": f"{base_url}/doc.html"}),
+            ("browser_get_page_content[text]", "browser_get_page_content", {"mode": "text"}),
+            ("browser_get_page_content[markdown]", "browser_get_page_content", {"mode": "markdown"}),
+            ("browser_snapshot", "browser_snapshot", {}),
+            ("browser_take_screenshot_base64", "browser_take_screenshot_base64", {"full_page": False, "force": True}),
+        ],
+        "spa_xhr": [
+            ("browser_navigate", "browser_navigate", {"url": f"{base_url}/spa.html"}),
+            ("browser_wait_for_selector", "browser_wait_for_selector", {"selector": "#done", "state": "attached"}),
+            ("browser_get_page_content", "browser_get_page_content", {"mode": "text"}),
+            ("browser_network_requests", "browser_network_requests", {"limit": 500}),
+        ],
+        "links_10k": [
+            ("browser_navigate", "browser_navigate", {"url": f"{base_url}/links.html"}),
+            ("browser_get_page_content[links]", "browser_get_page_content", {"mode": "text", "include_links": True}),
+            ("browser_snapshot", "browser_snapshot", {}),
+        ],
+        "infinite_scroll": [
+            ("browser_navigate", "browser_navigate", {"url": f"{base_url}/feed.html"}),
+            *scroll,
+            ("browser_get_page_content", "browser_get_page_content", {"mode": "text"}),
+        ],
+    }
+
+
+async def call_tool(name: str, args: Dict[str, Any]) -> Any:
+    return await mcp_server.mcp._tool_manager.get_tool(name).run(args)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def _read_proc(pid: int) -> Optional[Tuple[int, int]]:
+    """(ppid, rss bytes) of a process from /proc, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    ppid = int(stat[stat.rindex(b")") + 2 :].split()[1])
+    return ppid, resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def process_rss() -> Dict[str, Optional[float]]:
+    """RSS in MiB of this process and of all its descendants (the Playwright driver and browser)."""
+    if not os.path.isdir("/proc"):
+        return {"server_mb": None, "browser_mb": None}
+    me = os.getpid()
+    info: Dict[int, Tuple[int, int]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            data = _read_proc(int(entry))
+            if data is not None:
+                info[int(entry)] = data
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _) in info.items():
+        children.setdefault(ppid, []).append(pid)
+    total, stack = 0, list(children.get(me, ()))
+    while stack:
+        pid = stack.pop()
+        total += info[pid][1]
+        stack.extend(children.get(pid, ()))
+    mib = 1024 * 1024
+    return {
+        "server_mb": round(info[me][1] / mib, 1) if me in info else None,
+        "browser_mb": round(total / mib, 1),
+    }
+
+
+class _RssSampler:
+    """Track peak RSS in the background while a scenario runs."""
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self.peak: Dict[str, Optional[float]] = {"server_mb": None, "browser_mb": None}
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self) -> None:
+        for key, value in process_rss().items():
+            if value is not None and (self.peak[key] is None or value > self.peak[key]):
+                self.peak[key] = value
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self._sample)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "_RssSampler":
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._sample()
+
+
+async def run_scenario(
+    steps: List[Step], clients: int, iterations: int, warmup: int, headless: bool, channel: str
+) -> Dict[str, Any]:
+    samples: Dict[str, List[Tuple[float, int]]] = {label: [] for label, _, _ in steps}
+    errors: Dict[str, int] = {}
+    session_ids = [f"bench-{i}" for i in range(clients)]
+
+    for sid in session_ids:
+        await call_tool("browser_start", {"headless": headless, "channel": channel, "session_id": sid})
+
+    async def client(sid: str, rounds: int, record: bool) -> int:
+        calls = 0
+        for _ in range(rounds):
+            for label, tool, args in steps:
+                started = time.perf_counter()
+                try:
+                    out = await call_tool(tool, {**args, "session_id": sid})
+                except Exception:
+                    errors[label] = errors.get(label, 0) + 1
+                    continue
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                calls += 1
+                if record:
+                    samples[label].append((elapsed_ms, len(str(out).encode("utf-8"))))
+        return calls
+
+    try:
+        if warmup:
+            await asyncio.gather(*(client(sid, warmup, record=False) for sid in session_ids))
+        with _RssSampler() as sampler:
+            started = time.perf_counter()
+            calls = sum(await asyncio.gather(*(client(sid, iterations, record=True) for sid in session_ids)))
+            wall = time.perf_counter() - started
+    finally:
+        for sid in session_ids:
+            await call_tool("browser_close", {"session_id": sid})
+
+    step_stats: Dict[str, Any] = {}
+    for label, rows in samples.items():
+        if not rows:
+            step_stats[label] = {"calls": 0, "errors": errors.get(label, 0)}
+            continue
+        latencies = [ms for ms, _ in rows]
+        step_stats[label] = {
+            "calls": len(rows),
+            "errors": errors.get(label, 0),
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "payload_bytes": round(sum(b for _, b in rows) / len(rows)),
+        }
+    return {
+        "clients": clients,
+        "wall_s": round(wall, 3),
+        "calls": calls,
+        "throughput_calls_per_s": round(calls / wall, 2) if wall > 0 else None,
+        "iterations_per_s": round(clients * iterations / wall, 3) if wall > 0 else None,
+        "peak_rss": sampler.peak,
+        "steps": step_stats,
+    }
+
+
+def _meta(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent.parent,
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    try:
+        from importlib.metadata import version
+
+        playwright_version = version("playwright")
+    except Exception:
+        playwright_version = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "playwright": playwright_version,
+        "channel": args.channel,
+        "headless": not args.headed,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with FixtureServer(fixture_pages()) as server:
+        all_scenarios = scenarios(server.base_url)
+        names = args.scenarios or list(all_scenarios)
+        try:
+            for name in names:
+                results[name] = []
+                for clients in args.clients:
+                    row = await run_scenario(
+                        all_scenarios[name], clients, args.iterations, args.warmup,
+                        headless=not args.headed, channel=args.channel,
+                    )
+                    results[name].append(row)
+                    print(f"{name} x{clients}: {row['throughput_calls_per_s']} calls/s", file=sys.stderr)
+        finally:
+            await mcp_server.sessions.shutdown()
+    return {"meta": _meta(args), "results": results}
+
+
+def compare(baseline_path: str, current_path: str, threshold_pct: float) -> int:
+    """Print per-step p50/p95 and throughput changes; return 1 if anything regressed beyond the threshold."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    current = json.loads(Path(current_path).read_text(encoding="utf-8"))["results"]
+    regressions = 0
+
+    def delta(old: Optional[float], new: Optional[float]) -> Optional[float]:
+        if not old or new is None:
+            return None
+        return (new - old) / old * 100
+
+    print(f"{'scenario':<18}{'clients':>8}  {'step':<40}{'metric':<12}{'base':>10}{'new':>10}{'change':>9}")
+    for name, rows in current.items():
+        base_rows = {r["clients"]: r for r in baseline.get(name, [])}
+        for row in rows:
+            base = base_rows.get(row["clients"])
+            if base is None:
+                continue
+            checks = [("-", "calls/s", base["throughput_calls_per_s"], row["throughput_calls_per_s"], True)]
+            for step, stats in row["steps"].items():
+                old = base["steps"].get(step, {})
+                for metric in ("p50_ms", "p95_ms"):
+                    checks.append((step, metric, old.get(metric), stats.get(metric), False))
+            for step, metric, old, new, higher_is_better in checks:
+                change = delta(old, new)
+                if change is None:
+                    continue
+                worse = -change if higher_is_better else change
+                flag = ""
+                if worse > threshold_pct:
+                    flag = "  REGRESSION"
+                    regressions += 1
+                print(f"{name:<18}{row['clients']:>8}  {step:<40}{metric:<12}{old:>10}{new:>10}{change:>+8.1f}%{flag}")
+    print(f"\n{regressions} regression(s) over {threshold_pct}%")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", choices=["static_doc", "spa_xhr", "links_10k", "infinite_scroll"])
+    parser.add_argument("--channel", default="chromium")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files.")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Regression threshold in percent.")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.threshold))
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
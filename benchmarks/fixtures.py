@@ -0,0 +1,150 @@
+# benchmarks/fixtures.py
+from __future__ import annotations
+
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+def large_document(sections: int, seed: int = 0) -> str:
+    """A deterministic article page with headings, paragraphs, lists, tables, code and links."""
+    rng = random.Random(seed)
+    words = (
+        "browser context stealth network render layout script cache token agent page "
+        "latency payload extract markdown session request response cookie storage"
+    ).split()
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    parts = ["<!doctype html><html><head><title>Large document</title>",
+             "<style>.hidden{display:none}</style></head><body><main>"]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i}</h2>")
+        for _ in range(3):
+            parts.append(f"<p>{sentence(40)} <a href='/doc/{i}/{rng.randint(0, 999)}'>{sentence(3)}</a> {sentence(20)}</p>")
+        parts.append("<ul>" + "".join(f"<li>{sentence(8)}</li>" for _ in range(5)) + "</ul>")
+        if i % 5 == 0:
+            rows = "".join(f"<tr><td>{r}</td><td>{sentence(4)}</td><td>{rng.random():.4f}</td></tr>" for r in range(8))
+            parts.append(f"<table><tr><th>#</th><th>Name</th><th>Value</th></tr>{rows}</table>")
+        if i % 7 == 0:
+            parts.append("<pre><code class='language-python'>def f(x):\n    return x * 2\n</code></pre>")
+        parts.append(f"<div class='hidden'>{sentence(30)}</div>")
+    parts.append("</main></body></html>")
+    return "".join(parts)
+
+
+def spa_page(requests: int = 60) -> str:
+    """A client-rendered page that builds its list from `requests` parallel JSON XHRs, then marks #done."""
+    return f"""<!doctype html><html><head><title>SPA</title></head><body>
+<div id="app">Loading...</div>
+<script>
+(async () => {{
+    const ids = Array.from({{length: {requests}}}, (_, i) => i);
+    const items = await Promise.all(ids.map(i => fetch('/api/item/' + i).then(r => r.json())));
+    const app = document.getElementById('app');
+    app.innerHTML = '<h1>Items</h1><ul>' + items.map(it =>
+        `<li><b>${{it.name}}</b> - ${{it.description}} (<a href="/item/${{it.id}}">open</a>)</li>`).join('') + '</ul>';
+    const done = document.createElement('div');
+    done.id = 'done';
+    done.textContent = 'done';
+    document.body.appendChild(done);
+}})();
+</script></body></html>"""
+
+
+def spa_api(requests: int = 60, seed: int = 0) -> Dict[str, Tuple[str, bytes]]:
+    """The JSON endpoints behind `spa_page`."""
+    rng = random.Random(seed)
+    out = {}
+    for i in range(requests):
+        item = {"id": i, "name": f"Item {i}", "description": " ".join(str(rng.random()) for _ in range(20))}
+        out[f"/api/item/{i}"] = ("application/json", json.dumps(item).encode("utf-8"))
+    return out
+
+
+def links_page(count: int = 10000) -> str:
+    """A flat page of `count` links, the worst case for link extraction."""
+    links = "".join(f"<li><a href='/l/{i}'>Link number {i}</a></li>" for i in range(count))
+    return f"<!doctype html><html><head><title>{count} links</title></head><body><ul>{links}</ul></body></html>"
+
+
+def infinite_scroll_page(batch: int = 20, pages: int = 20) -> str:
+    """A feed that fetches the next JSON batch whenever the sentinel scrolls into view; items are #item-N."""
+    return f"""<!doctype html><html><head><title>Feed</title>
+<style>.card{{height:120px;margin:8px;border:1px solid #ccc}}</style></head><body>
+<div id="feed"></div><div id="sentinel">Loading more...</div>
+<script>
+let next = 0, loading = false;
+async function load() {{
+    if (loading || next >= {pages}) return;
+    loading = true;
+    const items = await fetch('/api/feed/' + next).then(r => r.json());
+    const feed = document.getElementById('feed');
+    for (const it of items) {{
+        const el = document.createElement('div');
+        el.className = 'card';
+        el.id = 'item-' + it.id;
+        el.textContent = it.text;
+        feed.appendChild(el);
+    }}
+    next += 1;
+    loading = false;
+}}
+new IntersectionObserver(es => {{ if (es.some(e => e.isIntersecting)) load(); }})
+    .observe(document.getElementById('sentinel'));
+</script></body></html>"""
+
+
+def infinite_scroll_api(batch: int = 20, pages: int = 20) -> Dict[str, Tuple[str, bytes]]:
+    """The JSON endpoints behind `infinite_scroll_page`."""
+    out = {}
+    for p in range(pages):
+        items = [{"id": p * batch + k, "text": f"Feed entry {p * batch + k}"} for k in range(batch)]
+        out[f"/api/feed/{p}"] = ("application/json", json.dumps(items).encode("utf-8"))
+    return out
+
+
+class FixtureServer:
+    def __init__(self, pages: Dict[str, Tuple[str, bytes]]):
+        """
+        Serve in-memory fixture pages on 127.0.0.1 from a background thread.
+        :param pages: Map of path to (content_type, body).
+        """
+        self.pages = pages
+        pages_ref = pages
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                entry = pages_ref.get(self.path.split("?", 1)[0])
+                if entry is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                content_type, body = entry
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
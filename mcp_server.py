@@ -1,65 +1,510 @@
 ﻿from __future__ import annotations
 
+import asyncio
 import base64
+import functools
+import heapq
+import inspect
 import json
-import re
-from typing import Any, Dict, List, Optional
-
+import logging
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import anyio
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from StealthKit.admission import Admission
+from StealthKit.buffers import ConsoleRecord, NetworkRecord, RingBuffer
+from StealthKit.capture import JsonCapture
+from StealthKit.diff import ContentTracker
+from StealthKit.extraction import ExtractionCache
+from StealthKit.governor import Governor
+from StealthKit.har import write_har
+from StealthKit.isolated import IsolatedWorld
+from StealthKit.js import EXTRACT_JS
+from StealthKit.metrics import Metrics, instrument_playwright, serve_prometheus
+from StealthKit.config import get_config
+from StealthKit.pool import ContextPool
+from StealthKit.refs import ElementRefs
+from StealthKit.routing import BlockPolicy
+from StealthKit.screenshot import PageCapturer
+from StealthKit.snapshots import SnapshotStore, StorageSnapshot
+from StealthKit.stability import NetworkActivity, wait_for_stable
+from StealthKit.tabs import HibernatedTab, TabInfo, filter_tabs
+
+if TYPE_CHECKING:
+    from StealthKit import StealthBrowser
+
+DEFAULT_SESSION_ID = "default"
+
+logger = logging.getLogger(__name__)
+
+# The page a tab-scoped tool call resolved and locked, so nested lookups inside that
+# call keep using it even if another call selects a different tab meanwhile.
+_active_page: ContextVar[Any] = ContextVar("stealthkit_active_page", default=None)
 
-from StealthKit import StealthBrowser
-from StealthKit.config import load_config
+# Client connection ("c1", "c2", ...) a call arrived on under a networked transport; None on stdio.
+# Set once per connection by the lifespan and inherited by every request handled on it.
+_client: ContextVar[Optional[str]] = ContextVar("stealthkit_client", default=None)
 
 
-mcp = FastMCP("stealthkit-browser")
-APP_CONFIG = load_config()
+def _session_key(session_id: str, client: Optional[str]) -> str:
+    """Registry key of a session: its id, scoped to the client connection that opened it."""
+    return f"{client}/{session_id}" if client else session_id
 
 
 def _to_json(data: Any) -> str:
+    started = time.perf_counter()
     try:
         return json.dumps(data, ensure_ascii=False)
     except TypeError:
         return str(data)
+    finally:
+        Metrics.add_serialization(time.perf_counter() - started)
+
+
+_background_tasks: Set["asyncio.Task[Any]"] = set()
+
+
+def _spawn(coro: Any) -> None:
+    """Run `coro` in the background, keeping a reference until it finishes."""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _fill_sizes(records: Iterable[NetworkRecord]) -> None:
+    """Fetch the transfer sizes of finished requests that are being read, once each and concurrently."""
+
+    async def fill(rec: NetworkRecord) -> None:
+        req, rec.request = rec.request, None
+        try:
+            rec.sizes = await req.sizes()
+        except Exception:
+            # Gone with its page; `transfer_size` falls back to content-length.
+            pass
+
+    pending = [rec for rec in records if rec.request is not None]
+    if pending:
+        await asyncio.gather(*(fill(rec) for rec in pending))
+
+
+async def _on_target(session: "_Session", page: Any, selector: Optional[str], ref: Optional[str], action: Any) -> Any:
+    """Run `action(target)` on a selector or ref, turning failures on a detached ref into a clear error."""
+    target = session.target(page, selector, ref)
+    try:
+        return await action(target)
+    except Exception as exc:
+        if ref is not None and await session.element_refs[id(page)].is_stale(ref):
+            raise RuntimeError(
+                f"Ref {ref} no longer points at an element on the page; take a new browser_element_snapshot."
+            ) from exc
+        raise
+
+
+async def _close_quietly(target: Any) -> None:
+    try:
+        await target.close()
+    except Exception:
+        pass
+
+
+async def _add_storage_cookies(context: Any, storage_state: Any) -> None:
+    """Merge the cookies of a storage_state file or dict into an existing context."""
+    state = storage_state
+    if not isinstance(state, dict):
+        state = await asyncio.to_thread(lambda: json.loads(Path(storage_state).read_text(encoding="utf-8")))
+    cookies = state.get("cookies") or []
+    if cookies:
+        await context.add_cookies(cookies)
+
+
+def _block_policy(
+    resource_types: Optional[List[str]] = None,
+    url_patterns: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+) -> BlockPolicy:
+    """Build a BlockPolicy from config, replacing each list that is given."""
+    block_cfg = get_config().browser.block
+    return BlockPolicy(
+        resource_types=block_cfg.resource_types if resource_types is None else resource_types,
+        url_patterns=block_cfg.url_patterns if url_patterns is None else url_patterns,
+        domains=block_cfg.domains if domains is None else domains,
+    )
 
 
 class _Session:
-    def __init__(self) -> None:
-        self.sb: Optional[StealthBrowser] = None
+    def __init__(self, registry: "_SessionRegistry", session_id: str, client: Optional[str] = None) -> None:
+        self.registry = registry
+        self.session_id = session_id
+        self.client = client
+        self.key = _session_key(session_id, client)
+        self.context: Any = None
         self.pages: List[Any] = []
         self.current_idx: int = -1
-        self.console_logs: Dict[int, List[Dict[str, Any]]] = {}
-        self.network_logs: Dict[int, List[Dict[str, Any]]] = {}
+        self.console_logs: Dict[int, RingBuffer] = {}
+        self.network_logs: Dict[int, RingBuffer] = {}
+        self.navigations: Dict[int, int] = {}
+        self.content_trackers: Dict[int, Dict[Tuple[str, Optional[str]], ContentTracker]] = {}
+        self.capturers: Dict[int, PageCapturer] = {}
+        # page id -> isolated world for page-side trackers invisible to page scripts
+        self.worlds: Dict[int, IsolatedWorld] = {}
+        self.network_activity: Dict[int, NetworkActivity] = {}
+        self.element_refs: Dict[int, ElementRefs] = {}
+        # Stable tab ids ("t1", "t2", ...) that survive other tabs closing; never reused in a session.
+        self.tab_ids: Dict[int, str] = {}
+        self.tabs: Dict[str, Any] = {}
+        self.tab_locks: Dict[int, asyncio.Lock] = {}
+        self.tab_info: Dict[int, TabInfo] = {}
+        # page id -> (event, handler) registered by _attach_page, removed again on detach
+        self.page_handlers: Dict[int, List[Tuple[str, Any]]] = {}
+        # tab id -> tab closed by the memory governor, reopened on next use
+        self.hibernated: Dict[str, HibernatedTab] = {}
+        self._tab_counter = 0
+        # capture id -> (capture, follows every tab including new ones)
+        self.captures: Dict[str, Tuple[JsonCapture, bool]] = {}
         self.last_start_args: Dict[str, Any] = {}
-        self.pending_storage_state: Optional[str] = None
+        self.block_policy: Optional[BlockPolicy] = None
+        # Holding the attached browser's default context, which outlives this server.
+        self.adopted = False
+        # Selected tab while parked for a browser restart.
+        self.parked_tab: Optional[str] = None
+        # Holding a slot of the registry's admission control.
+        self.admitted = False
+        # Inside `start`, possibly before it has a context; the shared browser stays up meanwhile.
+        self.starting = False
 
     def is_running(self) -> bool:
-        return self.sb is not None and len(self.pages) > 0 and 0 <= self.current_idx < len(self.pages)
+        return self.context is not None and len(self.pages) > 0 and 0 <= self.current_idx < len(self.pages)
 
-    def _attach_page(self, page: Any) -> None:
+    def _attach_page(self, page: Any, restore: Optional[HibernatedTab] = None) -> None:
         pid = id(page)
-        self.console_logs[pid] = []
-        self.network_logs[pid] = []
+        self._remove_handlers(page)
+        console_log = self.console_logs[pid] = RingBuffer(get_config().logs.console_capacity)
+        network_log = self.network_logs[pid] = RingBuffer(get_config().logs.network_capacity)
+        self.navigations[pid] = 0
+        self.content_trackers[pid] = {}
+        refs = self.element_refs[pid] = ElementRefs(next_id=restore.next_ref if restore is not None else 1)
+        if restore is None:
+            self._tab_counter += 1
+            tab_id = f"t{self._tab_counter}"
+            info = TabInfo(tab_id, page.url)
+            lock = asyncio.Lock()
+            if page.url != "about:blank":
+                # Adopted tab: its title predates our listeners.
+                info.refresh_title(page)
+        else:
+            info, lock = restore.info, restore.lock
+            tab_id = info.tab
+            info.load_state = "loading"
+        self.tab_ids[pid] = tab_id
+        self.tabs[tab_id] = page
+        self.tab_locks[pid] = lock
+        self.tab_info[pid] = info
 
         def _on_console(msg: Any) -> None:
-            self.console_logs[pid].append(
-                {
-                    "type": msg.type,
-                    "text": msg.text,
-                    "location": msg.location,
-                }
-            )
+            console_log.append(ConsoleRecord(msg.type, msg.text, msg.location))
+
+        inflight: Dict[Any, NetworkRecord] = {}
+        activity = self.network_activity[pid] = NetworkActivity()
+        transfer_sizes = get_config().logs.transfer_sizes
+        # Set by a main-frame document request: the next commit loads a new document rather than
+        # moving within the current one (pushState, hash changes).
+        document_request = [False]
 
         def _on_request(req: Any) -> None:
-            self.network_logs[pid].append(
-                {
-                    "method": req.method,
-                    "url": req.url,
-                    "resource_type": req.resource_type,
-                }
-            )
+            rec = NetworkRecord(req.method, req.url, req.resource_type, time.time(), req.headers)
+            inflight[req] = rec
+            network_log.append(rec)
+            activity.request_started(req)
+            if req.resource_type == "document" and req.is_navigation_request() and req.frame == page.main_frame:
+                info.load_state = "loading"
+                document_request[0] = True
+
+        def _on_response(resp: Any) -> None:
+            rec = inflight.get(resp.request)
+            if rec is not None:
+                rec.status = resp.status
+                rec.status_text = resp.status_text
+                rec.response_headers = resp.headers
+
+        def _on_requestfinished(req: Any) -> None:
+            activity.request_done(req)
+            rec = inflight.pop(req, None)
+            if rec is not None:
+                rec.timing = req.timing
+                if transfer_sizes:
+                    rec.request = req
+
+        def _on_requestfailed(req: Any) -> None:
+            activity.request_done(req)
+            rec = inflight.pop(req, None)
+            if rec is not None:
+                rec.timing = req.timing
+                rec.failure = req.failure
+
+        def _on_framenavigated(frame: Any) -> None:
+            if frame == page.main_frame:
+                info.navigated(frame.url)
+                info.refresh_title(page)
+                world = self.worlds.get(pid)
+                if world is not None:
+                    world.navigated()
+                # Non-HTTP documents (about:blank, data:) load without a request.
+                new_document = document_request[0] or not frame.url.startswith(("http:", "https:"))
+                document_request[0] = False
+                if not new_document:
+                    # Same document: element refs, content trackers and cached extractions stay valid.
+                    return
+                self.navigations[pid] = self.navigations.get(pid, 0) + 1
+                self.content_trackers[pid] = {}
+                refs.invalidate()
+                self.registry.extractions.invalidate((self.key, pid))
+
+        def _on_domcontentloaded(_: Any) -> None:
+            info.load_state = "domcontentloaded"
+            info.refresh_title(page)
+
+        def _on_load(_: Any) -> None:
+            info.load_state = "load"
+            info.refresh_title(page)
+
+        def _on_close(_: Any) -> None:
+            # A hibernated tab's info lives on for its next page.
+            if self.tab_info.get(pid) is info:
+                info.load_state = "closed"
+
+        handlers = self.page_handlers[pid] = [
+            ("console", _on_console),
+            ("request", _on_request),
+            ("response", _on_response),
+            ("requestfinished", _on_requestfinished),
+            ("requestfailed", _on_requestfailed),
+            ("framenavigated", _on_framenavigated),
+            ("domcontentloaded", _on_domcontentloaded),
+            ("load", _on_load),
+            ("close", _on_close),
+        ]
+        for event, handler in handlers:
+            page.on(event, handler)
+        for capture, all_tabs in self.captures.values():
+            if all_tabs:
+                capture.attach(page)
+
+    def _remove_handlers(self, page: Any) -> None:
+        # Adopted pages outlive the session; their old handlers must not feed it, or stack up
+        # under a second set when the context is adopted again.
+        for event, handler in self.page_handlers.pop(id(page), ()):
+            try:
+                page.remove_listener(event, handler)
+            except Exception:
+                pass
 
-        page.on("console", _on_console)
-        page.on("request", _on_request)
+    def _detach_page(self, page: Any) -> None:
+        pid = id(page)
+        self._remove_handlers(page)
+        self.console_logs.pop(pid, None)
+        self.network_logs.pop(pid, None)
+        self.navigations.pop(pid, None)
+        self.content_trackers.pop(pid, None)
+        self.capturers.pop(pid, None)
+        world = self.worlds.pop(pid, None)
+        if world is not None:
+            _spawn(world.close())
+        self.network_activity.pop(pid, None)
+        self.element_refs.pop(pid, None)
+        self.tabs.pop(self.tab_ids.pop(pid, ""), None)
+        self.tab_locks.pop(pid, None)
+        self.tab_info.pop(pid, None)
+        self.registry.governor.forget(page)
+        for capture, _ in self.captures.values():
+            capture.detach(page)
+        self.registry.extractions.invalidate((self.key, pid))
+
+    def content_tracker(self, page: Any, key: Tuple[str, Optional[str]]) -> ContentTracker:
+        """Tracker for `key` on `page`, fresh after every main-frame navigation."""
+        pid = id(page)
+        trackers = self.content_trackers.setdefault(pid, {})
+        tracker = trackers.get(key)
+        if tracker is None:
+            tracker = trackers[key] = ContentTracker(self.navigations.get(pid, 0))
+        return tracker
+
+    def target(self, page: Any, selector: Optional[str], ref: Optional[str]) -> Any:
+        """The first element matching `selector` as a Locator, or the ElementHandle behind `ref`."""
+        if (selector is None) == (ref is None):
+            raise ValueError("Pass exactly one of `selector` or `ref`.")
+        if ref is not None:
+            return self.element_refs[id(page)].get(ref)
+        return page.locator(selector).first
+
+    def tab_id(self, page: Any) -> str:
+        return self.tab_ids[id(page)]
+
+    @asynccontextmanager
+    async def use_tab(self, page: Any) -> AsyncIterator[Any]:
+        """
+        Hold `page`'s tab lock for the duration of a call, so calls on one tab run in order while
+        calls on other tabs proceed. Re-entrant within the call that already holds it.
+        """
+        if _active_page.get() is page:
+            yield page
+            return
+        tab_id = self.tab_id(page)
+        lock = self.tab_locks[id(page)]
+        while True:
+            async with Metrics.locked(lock):
+                if page in self.pages or not self.registry.recycling:
+                    if page not in self.pages:
+                        # Hibernated or restored meanwhile; the tab keeps its id and lock across both.
+                        record = self.hibernated.get(tab_id)
+                        page = await self._restore(record) if record is not None else self.tabs.get(tab_id)
+                        if page is None:
+                            raise ValueError(f"Tab {tab_id} was closed.")
+                    info = self.tab_info[id(page)]
+                    token = _active_page.set(page)
+                    info.touch()
+                    try:
+                        yield page
+                    finally:
+                        info.touch()
+                        _active_page.reset(token)
+                    return
+            # Parked by a browser recycle still under way: reopening it now would land in the old
+            # browser, so let go of the lock until the recycle (which may reopen it itself) is done.
+            await self.registry.wait_ready()
+
+    def can_hibernate(self, page: Any) -> bool:
+        """
+        Not the selected tab, not busy, not followed by a single-tab JSON capture, and not in an
+        adopted context, whose pages belong to the attached browser or its profile.
+        """
+        if not self.is_running() or self.adopted or page is self.pages[self.current_idx]:
+            return False
+        lock = self.tab_locks.get(id(page))
+        if lock is None or lock.locked():
+            return False
+        return not any(not all_tabs and c.follows(page) for c, all_tabs in self.captures.values())
+
+    async def hibernate(self, page: Any, wait: bool = False) -> Optional[HibernatedTab]:
+        """
+        Remember the tab's URL and scroll position and close its page; the tab id stays valid and
+        the next call on it reopens the page. Without `wait`, busy or selected tabs are left alone.
+        """
+        lock = self.tab_locks.get(id(page))
+        if lock is None or (lock.locked() and not wait):
+            return None
+        async with lock:
+            if page not in self.pages:
+                return None
+            try:
+                scroll = await page.evaluate("() => [window.scrollX, window.scrollY]")
+            except Exception:
+                scroll = [0, 0]
+            if not wait and page is self.pages[self.current_idx]:
+                # Selected while the scroll position was read.
+                return None
+            info = self.tab_info[id(page)]
+            refs = self.element_refs.get(id(page))
+            record = self.hibernated[info.tab] = HibernatedTab(
+                info, page.url, scroll, lock, refs.next_id if refs is not None else 1
+            )
+            idx = self.pages.index(page)
+            del self.pages[idx]
+            self._detach_page(page)
+            if idx < self.current_idx or self.current_idx >= len(self.pages):
+                self.current_idx -= 1
+            info.load_state = "hibernated"
+            await _close_quietly(page)
+        return record
+
+    async def _restore(self, record: HibernatedTab) -> Any:
+        """
+        Reopen a hibernated tab under its id. The caller holds the tab's lock and, unless it is
+        the recycle's own `unpark`, made sure no browser recycle is under way.
+        """
+        if self.context is None:
+            raise RuntimeError("Browser is not started. Call `browser_start` first.")
+        page = await self.context.new_page()
+        self.hibernated.pop(record.info.tab, None)
+        self.pages.append(page)
+        self._attach_page(page, restore=record)
+        self.registry.governor.record("restore", session=self.key, tab=record.info.tab, url=record.url)
+        if record.url != "about:blank":
+            try:
+                await page.goto(record.url, wait_until="domcontentloaded", timeout=30000)
+                if record.scroll[0] or record.scroll[1]:
+                    await page.evaluate("([x, y]) => window.scrollTo(x, y)", record.scroll)
+            except Exception as exc:
+                self.registry.governor.record("restore_failed", session=self.key, tab=record.info.tab, error=str(exc))
+        return page
+
+    async def wake(self, tab: str) -> None:
+        """Reopen `tab` if it is hibernated."""
+        while True:
+            record = self.hibernated.get(tab)
+            if record is None:
+                return
+            async with Metrics.locked(record.lock):
+                if not self.registry.recycling:
+                    if self.hibernated.get(tab) is record:
+                        await self._restore(record)
+                    return
+            await self.registry.wait_ready()
+
+    async def park(self) -> Any:
+        """Hibernate every tab ahead of a browser restart; returns the context's storage state."""
+        try:
+            state = await self.context.storage_state()
+        except Exception:
+            state = None
+        selected = self.tab_id(self.pages[self.current_idx]) if self.is_running() else None
+        for page in list(self.pages):
+            await self.hibernate(page, wait=True)
+        self.parked_tab = selected
+        self.context = None
+        return state
+
+    async def unpark(self, storage_state: Any) -> None:
+        """Move a parked session onto a context of the restarted browser and reopen its selected tab."""
+        self.context = await self.registry.new_context(
+            storage_state=storage_state, proxy=self.last_start_args.get("proxy"), block_policy=self.block_policy
+        )
+        # Start from no open pages: anything `park` could not hibernate died with the old browser.
+        for page in self.pages:
+            self._detach_page(page)
+        self.pages = []
+        self.current_idx = 0
+        record = self.hibernated.get(self.parked_tab or "") or next(iter(self.hibernated.values()), None)
+        self.parked_tab = None
+        if record is None:
+            page = await self.context.new_page()
+            self.pages.append(page)
+            self._attach_page(page)
+        else:
+            async with record.lock:
+                await self._restore(record)
+
+    def world(self, page: Any) -> IsolatedWorld:
+        world = self.worlds.get(id(page))
+        if world is None:
+            world = self.worlds[id(page)] = IsolatedWorld(page)
+        return world
+
+    def capturer(self, page: Any) -> PageCapturer:
+        capturer = self.capturers.get(id(page))
+        if capturer is None:
+            capturer = self.capturers[id(page)] = PageCapturer(
+                page, self.world(page), self.network_activity.get(id(page))
+            )
+        return capturer
 
     async def start(
         self,
@@ -67,11 +512,12 @@ class _Session:
         proxy: Optional[str] = None,
         channel: Optional[str] = None,
         storage_state: Optional[str] = None,
+        block_policy: Optional[BlockPolicy] = None,
     ) -> str:
         if self.is_running():
-            return "Browser session already running."
+            return f"Session '{self.session_id}' already running."
 
-        browser_cfg = APP_CONFIG.browser
+        browser_cfg = get_config().browser
         resolved_headless = browser_cfg.headless if headless is None else headless
         resolved_proxy = browser_cfg.proxy if proxy is None else proxy
         resolved_channel = browser_cfg.channel if channel is None else channel
@@ -81,279 +527,1175 @@ class _Session:
             "proxy": resolved_proxy,
             "channel": resolved_channel,
         }
-        # Try to pass storage_state into StealthBrowser if supported.
+        self.block_policy = block_policy
+        if browser_cfg.profile.enabled and resolved_proxy != browser_cfg.proxy:
+            raise ValueError("A persistent profile always uses the configured proxy; omit `proxy`.")
+        self.starting = True
         try:
-            self.sb = StealthBrowser(
-                headless=resolved_headless,
-                proxy=resolved_proxy,
-                channel=resolved_channel,
-                user_agent=browser_cfg.user_agent,
-                viewport={"width": browser_cfg.viewport.width, "height": browser_cfg.viewport.height},
-                locale=browser_cfg.locale,
-                timezone_id=browser_cfg.timezone_id,
-                launch_args=browser_cfg.launch.args,
-                ignore_default_args=browser_cfg.launch.ignore_default_args,
-                storage_state=storage_state,
-            )  # type: ignore
-        except TypeError:
-            self.sb = StealthBrowser(
-                headless=resolved_headless,
-                proxy=resolved_proxy,
-                channel=resolved_channel,
-                user_agent=browser_cfg.user_agent,
-                viewport={"width": browser_cfg.viewport.width, "height": browser_cfg.viewport.height},
-                locale=browser_cfg.locale,
-                timezone_id=browser_cfg.timezone_id,
-                launch_args=browser_cfg.launch.args,
-                ignore_default_args=browser_cfg.launch.ignore_default_args,
-            )
-            # If storage_state is provided but StealthBrowser doesn't support it, we'll attempt to apply it later.
-            self.pending_storage_state = storage_state
+            return await self._start(resolved_headless, resolved_proxy, resolved_channel, storage_state, block_policy)
+        finally:
+            self.starting = False
 
-        await self.sb.__aenter__()
-        page = await self.sb.get_page()
-        # Best-effort: if we couldn't pass storage_state into StealthBrowser, try to recreate context with it.
-        if self.pending_storage_state:
+    async def _start(
+        self,
+        headless: bool,
+        proxy: Optional[str],
+        channel: str,
+        storage_state: Optional[str],
+        block_policy: Optional[BlockPolicy],
+    ) -> str:
+        browser_cfg = get_config().browser
+        try:
+            if not self.admitted:
+                await self.registry.admission.acquire()
+                self.admitted = True
+            sb = await self.registry.ensure_browser(headless=headless, channel=channel)
+        except BaseException:
+            # Give the admission slot back, also when cancelled while queued; no context was made.
+            await self.registry.discard(self)
+            raise
+        try:
+            adopted = None
+            if sb.persistent or (storage_state is None and proxy == browser_cfg.proxy):
+                adopted = await self.registry.adopt_default_context(self, block_policy)
+            if adopted is not None:
+                self.context = adopted
+                self.adopted = True
+                if storage_state is not None:
+                    await _add_storage_cookies(adopted, storage_state)
+                pages = [p for p in adopted.pages if not p.is_closed()] or [await adopted.new_page()]
+            else:
+                self.context = await self.registry.new_context(
+                    storage_state=storage_state,
+                    proxy=proxy,
+                    block_policy=block_policy,
+                )
+                pages = [await self.context.new_page()]
+        except Exception:
+            await self.stop()
+            raise
+
+        self.pages = pages
+        self.current_idx = 0
+        for page in pages:
+            self._attach_page(page)
+        if self.adopted and sb.persistent:
+            return f"Browser started on the persistent profile with {len(pages)} tab(s) (session '{self.session_id}')."
+        if self.adopted:
+            return f"Attached to running browser with {len(pages)} tab(s) (session '{self.session_id}')."
+        return f"Browser started with tab 0 (session '{self.session_id}')."
+
+    def _release_adopted(self) -> None:
+        """Hand the default context back without closing it, so its tabs survive for the next attach."""
+        if self.adopted:
+            self.adopted = False
+            self.registry.default_context_owner = None
+
+    def _reset(self) -> None:
+        for page in self.pages:
+            self._detach_page(page)
+        self.context = None
+        self.pages = []
+        self.current_idx = -1
+        self.console_logs = {}
+        self.network_logs = {}
+        self.navigations = {}
+        self.content_trackers = {}
+        self.capturers = {}
+        self.worlds = {}
+        self.hibernated = {}
+
+    async def close_captures(self) -> None:
+        captures, self.captures = self.captures, {}
+        for capture, _ in captures.values():
+            await capture.close()
+
+    async def stop(self) -> str:
+        await self.close_captures()
+        if self.context is None:
+            self._reset()
+            await self.registry.discard(self)
+            return f"Session '{self.session_id}' not running."
+
+        if self.adopted:
+            self._release_adopted()
+        else:
             try:
-                browser_obj = getattr(self.sb, "browser", None)
-                if browser_obj is not None:
-                    # Close old context if present
-                    try:
-                        if getattr(self.sb, "context", None) is not None:
-                            await self.sb.context.close()  # type: ignore
-                    except Exception:
-                        pass
-                    new_ctx = await browser_obj.new_context(storage_state=self.pending_storage_state)
-                    self.sb.context = new_ctx  # type: ignore
-                    page = await new_ctx.new_page()
+                await self.context.close()
             except Exception:
-                # Ignore and proceed; caller can still manually login.
                 pass
-            finally:
-                self.pending_storage_state = None
+        self._reset()
+        if await self.registry.discard(self):
+            return "Browser closed."
+        return f"Closed session '{self.session_id}'."
+
+    async def replace_context(self, storage_state: Any = None, snapshot: Optional[StorageSnapshot] = None) -> None:
+        """
+        Swap this session onto a fresh context built from `storage_state` or a named snapshot.
+        The new context is ready before the old one is dropped; the old one closes in the background.
+        """
+        if not self.is_running() or self.registry.sb is None:
+            raise RuntimeError("Browser is not started. Call `browser_start` first.")
+        if snapshot is not None:
+            storage_state = snapshot.state
 
+        if self.registry.sb.persistent:
+            # The profile's context is the only one; keep it and its tabs, and merge the cookies in.
+            await _add_storage_cookies(self.context, storage_state)
+            return
+
+        proxy = self.last_start_args.get("proxy")
+        if snapshot is not None:
+            context = await self.registry.snapshot_context(snapshot, proxy=proxy, block_policy=self.block_policy)
+        else:
+            context = await self.registry.new_context(
+                storage_state=storage_state, proxy=proxy, block_policy=self.block_policy
+            )
+        try:
+            page = await context.new_page()
+        except Exception:
+            _spawn(_close_quietly(context))
+            raise
+
+        for p in self.pages:
+            self._detach_page(p)
+        self.hibernated = {}
+        if self.adopted:
+            # Leave the attached browser's default context and tabs as they are.
+            self._release_adopted()
+        else:
+            # Closing the context closes its pages.
+            _spawn(_close_quietly(self.context))
+        self.context = context
         self.pages = [page]
         self.current_idx = 0
         self._attach_page(page)
-        return "Browser started with tab 0."
-
-    async def stop(self) -> str:
-        if self.sb is None:
-            self.pages = []
-            self.current_idx = -1
-            self.console_logs = {}
-            self.network_logs = {}
-            return "Browser session not running."
-
-        await self.sb.__aexit__(None, None, None)
-        self.sb = None
-        self.pages = []
-        self.current_idx = -1
-        self.console_logs = {}
-        self.network_logs = {}
-        return "Browser closed."
 
-    def current_page(self) -> Any:
+    def current_page(self, tab: Optional[str] = None) -> Any:
+        """The page of `tab`, else the page the running tool call locked, else the selected tab."""
         if not self.is_running():
             raise RuntimeError("Browser is not started. Call `browser_start` first.")
+        if tab is not None:
+            page = self.tabs.get(tab)
+            if page is None:
+                if tab in self.hibernated:
+                    raise ValueError(f"Tab {tab} is hibernated; a page tool called on it reopens it.")
+                raise ValueError(f"Unknown tab: {tab}")
+            return page
+        page = _active_page.get()
+        if page is not None and page in self.pages:
+            return page
         return self.pages[self.current_idx]
 
-    async def new_tab(self) -> int:
-        if self.sb is None or self.sb.context is None:
+    def _tab_page(self, index: Optional[int], tab: Optional[str]) -> Any:
+        if index is not None and tab is not None:
+            raise ValueError("Pass either `index` or `tab`, not both.")
+        if index is None:
+            return self.current_page(tab)
+        if not self.is_running():
             raise RuntimeError("Browser is not started. Call `browser_start` first.")
-        page = await self.sb.context.new_page()
+        if index < 0 or index >= len(self.pages):
+            raise ValueError(f"Invalid tab index: {index}")
+        return self.pages[index]
+
+    async def new_tab(self, select: bool = True) -> Any:
+        if self.context is None:
+            raise RuntimeError("Browser is not started. Call `browser_start` first.")
+        page = await self.context.new_page()
         self.pages.append(page)
-        self.current_idx = len(self.pages) - 1
+        if select:
+            self.current_idx = len(self.pages) - 1
         self._attach_page(page)
-        return self.current_idx
+        return page
 
-    async def list_tabs(self) -> List[Dict[str, Any]]:
+    async def close_page(self, page: Any) -> None:
+        """Close a page by identity, keeping the current tab selected."""
+        if page not in self.pages:
+            return
+        idx = self.pages.index(page)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        del self.pages[idx]
+        self._detach_page(page)
+        if idx < self.current_idx or self.current_idx >= len(self.pages):
+            self.current_idx -= 1
+
+    def list_tabs(self) -> List[Dict[str, Any]]:
+        """Every tab from the event-maintained metadata; no page round trips."""
+        now = time.time()
         tabs: List[Dict[str, Any]] = []
         for idx, page in enumerate(self.pages):
-            try:
-                title = await page.title()
-            except Exception:
-                title = ""
+            pid = id(page)
+            info = self.tab_info.get(pid)
+            console_log = self.console_logs.get(pid)
+            network_log = self.network_logs.get(pid)
+            lock = self.tab_locks.get(pid)
             tabs.append(
                 {
+                    **(info.to_dict(now) if info else {"url": page.url, "title": ""}),
                     "index": idx,
                     "current": idx == self.current_idx,
-                    "url": page.url,
-                    "title": title,
+                    "busy": lock is not None and lock.locked(),
+                    "console_logs": len(console_log) if console_log else 0,
+                    "console_dropped": console_log.dropped if console_log else 0,
+                    "network_logs": len(network_log) if network_log else 0,
+                    "network_dropped": network_log.dropped if network_log else 0,
+                    "hibernated": False,
+                }
+            )
+        for record in self.hibernated.values():
+            tabs.append(
+                {
+                    **record.info.to_dict(now),
+                    "url": record.url,
+                    "index": None,
+                    "current": False,
+                    "busy": record.lock.locked(),
+                    "console_logs": 0,
+                    "console_dropped": 0,
+                    "network_logs": 0,
+                    "network_dropped": 0,
+                    "hibernated": True,
                 }
             )
         return tabs
 
-    def select_tab(self, index: int) -> None:
-        if not self.is_running():
+    async def select_tab(self, index: Optional[int] = None, tab: Optional[str] = None) -> str:
+        if index is None and tab is None:
+            raise ValueError("Pass `index` or `tab`.")
+        if tab is not None:
+            await self.wake(tab)
+        page = self._tab_page(index, tab)
+        self.current_idx = self.pages.index(page)
+        return self.tab_id(page)
+
+    async def close_tab(self, index: Optional[int] = None, tab: Optional[str] = None) -> str:
+        record = self.hibernated.get(tab) if tab is not None and index is None else None
+        if record is not None:
+            async with Metrics.locked(record.lock):
+                self.hibernated.pop(tab, None)
+            return f"Closed hibernated tab {tab}."
+        page = self._tab_page(index, tab)
+        tab_id = self.tab_id(page)
+        # Let calls already queued on the tab finish first; the tab may have been hibernated and
+        # reopened as a new page meanwhile.
+        async with self.use_tab(page) as page:
+            idx = self.pages.index(page)
+            await page.close()
+            del self.pages[idx]
+            self._detach_page(page)
+            if idx < self.current_idx or self.current_idx >= len(self.pages):
+                self.current_idx = max(self.current_idx - 1, 0)
+
+        if len(self.pages) == 0:
+            return await self.stop()
+        current = self.pages[self.current_idx]
+        return f"Closed tab {tab_id}. Current tab is {self.tab_id(current)} (index {self.current_idx})."
+
+
+class _SessionRegistry:
+    """Named sessions, each with its own context, sharing one launched browser."""
+
+    def __init__(self) -> None:
+        self.sb: Optional[StealthBrowser] = None
+        self.pool: Optional[ContextPool] = None
+        self._extractions: Optional[ExtractionCache] = None
+        self._snapshots: Optional[SnapshotStore] = None
+        # snapshot name -> contexts kept warm with that snapshot's state
+        self.snapshot_pools: Dict[str, ContextPool] = {}
+        self.sessions: Dict[str, _Session] = {}
+        self.launch_args: Dict[str, Any] = {}
+        self.default_context_owner: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._governor: Optional[Governor] = None
+        self._admission: Optional[Admission] = None
+        # client id -> connected at, for networked transports
+        self.clients: Dict[str, float] = {}
+        self._client_counter = 0
+        # Cleared while the browser is being recycled; session tools wait on it.
+        self._ready = asyncio.Event()
+        self._ready.set()
+
+    @property
+    def extractions(self) -> ExtractionCache:
+        if self._extractions is None:
+            self._extractions = ExtractionCache(get_config().content.cache_max_mb * 1024 * 1024)
+        return self._extractions
+
+    @property
+    def snapshots(self) -> SnapshotStore:
+        if self._snapshots is None:
+            self._snapshots = SnapshotStore(get_config().browser.snapshots.directory or None)
+        return self._snapshots
+
+    @property
+    def governor(self) -> Governor:
+        if self._governor is None:
+            cfg = get_config().browser.governor
+            self._governor = Governor(
+                interval_s=cfg.interval_s,
+                soft_limit_mb=cfg.soft_limit_mb,
+                hard_limit_mb=cfg.hard_limit_mb,
+                tab_idle_s=cfg.tab_idle_s,
+                tab_heap_mb=cfg.tab_heap_mb,
+                hibernate_after_s=cfg.hibernate_after_s,
+                max_hibernate=cfg.max_hibernate,
+                js_heap=cfg.js_heap,
+            )
+        return self._governor
+
+    @property
+    def recycling(self) -> bool:
+        return not self._ready.is_set()
+
+    async def wait_ready(self) -> None:
+        if not self._ready.is_set():
+            await self._ready.wait()
+
+    @property
+    def admission(self) -> Admission:
+        if self._admission is None:
+            mcp_cfg = get_config().mcp
+            self._admission = Admission(mcp_cfg.max_sessions, mcp_cfg.admission_timeout_s)
+        return self._admission
+
+    def get(self, session_id: Optional[str] = None) -> _Session:
+        sid = session_id or DEFAULT_SESSION_ID
+        client = _client.get()
+        # Unknown ids get a detached, not-running session so tools report "not started".
+        return self.sessions.get(_session_key(sid, client)) or _Session(self, sid, client)
+
+    def open(self, session_id: Optional[str] = None) -> _Session:
+        sid = session_id or DEFAULT_SESSION_ID
+        client = _client.get()
+        sess = self.sessions.get(_session_key(sid, client))
+        if sess is None:
+            sess = _Session(self, sid, client)
+            self.sessions[sess.key] = sess
+        return sess
+
+    def connect(self) -> str:
+        """Register a new client connection and return its id."""
+        self._client_counter += 1
+        client = f"c{self._client_counter}"
+        self.clients[client] = time.time()
+        return client
+
+    async def disconnect(self, client: str) -> None:
+        """Stop every session of a client connection that went away."""
+        self.clients.pop(client, None)
+        for sess in [s for s in self.sessions.values() if s.client == client]:
+            try:
+                await sess.stop()
+            except Exception:
+                pass
+
+    async def ensure_browser(self, headless: bool, channel: str) -> StealthBrowser:
+        async with Metrics.locked(self._lock):
+            if self.sb is not None:
+                if self.launch_args != {"headless": headless, "channel": channel}:
+                    raise ValueError(
+                        "Shared browser is already running with "
+                        f"channel={self.launch_args['channel']!r}, headless={self.launch_args['headless']}. "
+                        "Close all sessions before starting with different browser options."
+                    )
+                return self.sb
+
+            # Deferred so that server startup does not import Playwright or sqlite3.
+            from StealthKit.browser import StealthBrowser
+            from StealthKit.cache import DiskCache
+
+            browser_cfg = get_config().browser
+            cache_cfg = browser_cfg.cache
+            attach_cfg = browser_cfg.attach
+            profile_cfg = browser_cfg.profile
+            disk_cache = None
+            if cache_cfg.enabled and profile_cfg.enabled:
+                logger.warning(
+                    "[browser.cache] is ignored with [browser.profile]: routing the profile's requests would "
+                    "turn off Chromium's HTTP cache, which the profile already keeps on disk."
+                )
+            elif cache_cfg.enabled:
+                disk_cache = DiskCache(
+                    cache_cfg.directory,
+                    max_bytes=cache_cfg.max_mb * 1024 * 1024,
+                    resource_types=cache_cfg.resource_types,
+                )
+            profile = None
+            if profile_cfg.enabled:
+                from StealthKit.profile import Profile
+
+                profile = Profile(
+                    profile_cfg.user_data_dir,
+                    template=profile_cfg.template_dir or None,
+                    max_bytes=profile_cfg.max_mb * 1024 * 1024,
+                )
+            sb = StealthBrowser(
+                headless=headless,
+                channel=channel,
+                user_agent=browser_cfg.user_agent,
+                viewport={"width": browser_cfg.viewport.width, "height": browser_cfg.viewport.height},
+                locale=browser_cfg.locale,
+                timezone_id=browser_cfg.timezone_id,
+                launch_args=browser_cfg.launch.args,
+                ignore_default_args=browser_cfg.launch.ignore_default_args,
+                block_policy=_block_policy(),
+                disk_cache=disk_cache,
+                proxy=browser_cfg.proxy if attach_cfg.mode == "detached" or profile is not None else None,
+                cdp_endpoint=attach_cfg.cdp_endpoint if attach_cfg.mode == "connect" else None,
+                detached=attach_cfg.mode == "detached",
+                state_file=attach_cfg.state_file,
+                user_data_dir=attach_cfg.user_data_dir,
+                executable_path=attach_cfg.executable_path or None,
+                profile=profile,
+            )
+            instrument_playwright()
+            try:
+                await sb.launch()
+            except Exception:
+                await sb.__aexit__(None, None, None)
+                raise
+            self.sb = sb
+            self.launch_args = {"headless": headless, "channel": channel}
+            if browser_cfg.pool.size > 0 and not sb.persistent:
+                self.pool = ContextPool(sb, browser_cfg.pool.size, proxy=browser_cfg.proxy)
+                self.pool.start()
+            return sb
+
+    async def new_context(
+        self,
+        storage_state: Any = None,
+        proxy: Optional[str] = None,
+        block_policy: Optional[BlockPolicy] = None,
+    ) -> Any:
+        if self.sb is None:
             raise RuntimeError("Browser is not started. Call `browser_start` first.")
-        if index < 0 or index >= len(self.pages):
-            raise ValueError(f"Invalid tab index: {index}")
-        self.current_idx = index
+        if self.sb.persistent:
+            raise RuntimeError(
+                f"The persistent profile's context is in use by session {self.default_context_owner!r}; "
+                "close that session first."
+            )
+        # Pooled contexts carry the default proxy and block policy only.
+        if self.pool is not None and proxy == self.pool.proxy and block_policy is None:
+            return await self.pool.acquire(storage_state=storage_state)
+        return await self.sb.new_context(storage_state=storage_state, proxy=proxy, block_policy=block_policy)
+
+    def warm_snapshot(self, snapshot: StorageSnapshot) -> None:
+        """
+        Start (or restart, if the snapshot changed) the warm context pool for `snapshot`, and
+        close the pools of snapshots beyond the `warm_snapshots` most recently used.
+        """
+        snapshots_cfg = get_config().browser.snapshots
+        if snapshots_cfg.warm_contexts <= 0 or snapshots_cfg.warm_snapshots <= 0:
+            return
+        if self.sb is None or self.sb.persistent:
+            return
+        # Re-inserted on every use, so the dict runs from least to most recently used.
+        pool = self.snapshot_pools.pop(snapshot.name, None)
+        if pool is not None and pool.storage_state is not snapshot.state:
+            _spawn(pool.close())
+            pool = None
+        if pool is None:
+            pool = ContextPool(
+                self.sb, snapshots_cfg.warm_contexts, proxy=get_config().browser.proxy, storage_state=snapshot.state
+            )
+            pool.start()
+        self.snapshot_pools[snapshot.name] = pool
+        while len(self.snapshot_pools) > snapshots_cfg.warm_snapshots:
+            self.drop_snapshot_pool(next(iter(self.snapshot_pools)))
 
-    async def close_tab(self, index: Optional[int] = None) -> str:
-        if not self.is_running():
+    def drop_snapshot_pool(self, name: str) -> None:
+        pool = self.snapshot_pools.pop(name, None)
+        if pool is not None:
+            _spawn(pool.close())
+
+    async def snapshot_context(
+        self,
+        snapshot: StorageSnapshot,
+        proxy: Optional[str] = None,
+        block_policy: Optional[BlockPolicy] = None,
+    ) -> Any:
+        """A context seeded with `snapshot`, taken from its warm pool when the options match."""
+        if self.sb is None:
             raise RuntimeError("Browser is not started. Call `browser_start` first.")
-        idx = self.current_idx if index is None else index
-        if idx < 0 or idx >= len(self.pages):
-            raise ValueError(f"Invalid tab index: {idx}")
+        self.warm_snapshot(snapshot)
+        pool = self.snapshot_pools.get(snapshot.name)
+        if pool is not None and proxy == pool.proxy and block_policy is None:
+            return await pool.acquire()
+        return await self.new_context(storage_state=snapshot.state, proxy=proxy, block_policy=block_policy)
+
+    async def adopt_default_context(self, sess: _Session, block_policy: Optional[BlockPolicy] = None) -> Any:
+        """
+        Give the persistent profile's context, or the attached browser's default context,
+        with its open tabs, to the first session asking.
+        """
+        if self.sb is None or not (self.sb.attached or self.sb.persistent):
+            return None
+        async with Metrics.locked(self._lock):
+            if self.default_context_owner is not None:
+                return None
+            if self.sb.persistent and (block_policy or self.sb.block_policy):
+                logger.warning(
+                    "Request blocking routes the persistent profile's requests, which turns off Chromium's "
+                    "HTTP cache: the profile's on-disk cache is bypassed while blocking is on."
+                )
+            context = await self.sb.adopt_default_context(block_policy)
+            if context is not None:
+                self.default_context_owner = sess.key
+            return context
+
+    async def sample(self) -> Dict[str, Any]:
+        """Browser process RSS/CPU and every tab's idle time and JS heap, kept as the governor's last sample."""
+        gov = self.governor
+        sb = self.sb
+        processes = None
+        if sb is not None and (sb.pid or not sb.attached):
+            root = sb.pid or os.getpid()
+            processes = await asyncio.to_thread(gov.processes.sample, root, sb.pid is not None)
+        now = time.time()
+        running = [s for s in self.sessions.values() if s.is_running()]
+        pages = [(s, p) for s in running for p in s.pages]
+        heaps: List[Optional[int]] = [None] * len(pages)
+        if gov.js_heap and pages:
+            heaps = await asyncio.gather(*(gov.heap_bytes(p) for _, p in pages))
+        tabs = []
+        for (sess, page), heap in zip(pages, heaps):
+            info = sess.tab_info.get(id(page))
+            if info is None:
+                continue
+            tabs.append(
+                {
+                    "session": sess.key,
+                    "tab": info.tab,
+                    "url": info.url,
+                    "idle_s": round(now - info.last_activity, 1),
+                    "js_heap_bytes": heap,
+                    "js_heap_mb": round(heap / (1024 * 1024), 1) if heap is not None else None,
+                    "eligible": sess.can_hibernate(page),
+                }
+            )
+        gov.last = {
+            "at": round(now, 3),
+            "processes": processes,
+            "tabs": tabs,
+            "hibernated_tabs": sum(len(s.hibernated) for s in self.sessions.values()),
+        }
+        return gov.last
+
+    async def enforce(self) -> None:
+        """One governor check: recycle past the hard limit, else hibernate what the budgets call for."""
+        gov = self.governor
+        gov.counts["checks"] += 1
+        report = await self.sample()
+        rss = report["processes"]["rss_bytes"] if report["processes"] else None
+        if gov.should_recycle(rss):
+            await self.recycle_browser(f"rss {rss // (1024 * 1024)} MB over hard limit")
+            return
+        for tab, reason in gov.plan(rss, report["tabs"]):
+            sess = self.sessions.get(tab["session"])
+            page = sess.tabs.get(tab["tab"]) if sess is not None else None
+            if page is not None and await sess.hibernate(page) is not None:
+                gov.record(
+                    "hibernate",
+                    session=sess.key,
+                    tab=tab["tab"],
+                    url=tab["url"],
+                    reason=reason,
+                    idle_s=tab["idle_s"],
+                    js_heap_mb=tab["js_heap_mb"],
+                )
+
+    async def govern(self) -> None:
+        """Run `enforce` every governor interval until cancelled."""
+        gov = self.governor
+        while True:
+            await asyncio.sleep(gov.interval_s)
+            if self.sb is None:
+                continue
+            try:
+                await self.enforce()
+            except Exception as exc:
+                gov.record("error", error=str(exc))
+
+    async def recycle_browser(self, reason: str) -> None:
+        """
+        Restart the shared browser. Sessions keep their cookies and localStorage and their tabs,
+        hibernated under the same ids; the selected tab of each is reopened straight away.
+        """
+        gov = self.governor
+        gov.last_recycle = time.monotonic()
+        sb = self.sb
+        if sb is None:
+            return
+        if sb.attached or sb.persistent:
+            gov.record("recycle_skipped", reason=reason, detail="browser is attached or runs a persistent profile")
+            return
+        started = time.perf_counter()
+        self._ready.clear()
+        try:
+            running = [s for s in self.sessions.values() if s.is_running()]
+            parked = [(s, await s.park()) for s in running]
+            launch_args = dict(self.launch_args)
+            await self._close_browser()
+            await self.ensure_browser(**launch_args)
+            for sess, storage_state in parked:
+                try:
+                    await sess.unpark(storage_state)
+                except Exception as exc:
+                    # Carry on, so one failing session does not leave the others parked.
+                    gov.record("unpark_failed", session=sess.key, error=str(exc))
+        finally:
+            self._ready.set()
+        gov.record(
+            "recycle",
+            reason=reason,
+            sessions=len(parked),
+            tabs=sum(len(s.pages) + len(s.hibernated) for s, _ in parked),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
 
-        page = self.pages[idx]
-        await page.close()
-        del self.pages[idx]
-        self.console_logs.pop(id(page), None)
-        self.network_logs.pop(id(page), None)
+    async def prewarm(self) -> None:
+        """Launch the shared browser with config defaults so the pool fills before first use."""
+        browser_cfg = get_config().browser
+        try:
+            await self.ensure_browser(headless=browser_cfg.headless, channel=browser_cfg.channel)
+        except Exception:
+            # Best-effort: `browser_start` will surface the launch error.
+            pass
 
-        if len(self.pages) == 0:
-            return await self.stop()
-        if self.current_idx >= len(self.pages):
-            self.current_idx = len(self.pages) - 1
-        return f"Closed tab {idx}. Current tab is {self.current_idx}."
+    async def shutdown(self) -> None:
+        for sess in list(self.sessions.values()):
+            try:
+                await sess.stop()
+            except Exception:
+                pass
+        await self._close_browser()
+
+    async def _close_browser(self) -> None:
+        async with Metrics.locked(self._lock):
+            sb, self.sb = self.sb, None
+            pool, self.pool = self.pool, None
+            snapshot_pools, self.snapshot_pools = self.snapshot_pools, {}
+            self.launch_args = {}
+            self.default_context_owner = None
+        for p in [pool, *snapshot_pools.values()]:
+            if p is not None:
+                await p.close()
+        if sb is not None:
+            await sb.__aexit__(None, None, None)
+
+    async def discard(self, sess: _Session) -> bool:
+        """Forget a stopped session; close the browser once no session uses it or is starting."""
+        async with Metrics.locked(self._lock):
+            if self.sessions.get(sess.key) is sess:
+                del self.sessions[sess.key]
+            if sess.admitted:
+                sess.admitted = False
+                self.admission.release()
+            if self.sb is None or any(s.starting or s.context is not None for s in self.sessions.values()):
+                return False
+            if self.pool is not None:
+                # Keep the warm browser and its pool around for the next session.
+                return False
+            sb, self.sb = self.sb, None
+            snapshot_pools, self.snapshot_pools = self.snapshot_pools, {}
+            self.launch_args = {}
+            self.default_context_owner = None
+        for pool in snapshot_pools.values():
+            await pool.close()
+        await sb.__aexit__(None, None, None)
+        return True
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Sessions of the calling client connection (all of them on stdio)."""
+        client = _client.get()
+        return [
+            {
+                "session_id": sess.session_id,
+                "running": sess.is_running(),
+                "tabs": len(sess.pages),
+                "current_tab": sess.current_idx,
+                "current_tab_id": sess.tab_id(sess.pages[sess.current_idx]) if sess.is_running() else None,
+            }
+            for sess in self.sessions.values()
+            if sess.client == client
+        ]
+
+
+sessions = _SessionRegistry()
+metrics = Metrics()
+
+
+def _gauges() -> Dict[str, float]:
+    all_sessions = list(sessions.sessions.values())
+    pool_ready = sessions.pool.stats()["ready"] if sessions.pool is not None else 0
+    console = [b for s in all_sessions for b in s.console_logs.values()]
+    network = [b for s in all_sessions for b in s.network_logs.values()]
+    return {
+        "browser_up": 1 if sessions.sb is not None else 0,
+        "sessions": len(all_sessions),
+        "contexts": sum(1 for s in all_sessions if s.context is not None) + pool_ready,
+        "pool_ready_contexts": pool_ready,
+        "tabs": sum(len(s.pages) for s in all_sessions),
+        "hibernated_tabs": sum(len(s.hibernated) for s in all_sessions),
+        "clients": len(sessions.clients),
+        "sessions_waiting": sessions.admission.waiting,
+        "sessions_admission_timeouts": sessions.admission.timed_out,
+        "console_log_entries": sum(len(b) for b in console),
+        "console_log_dropped": sum(b.dropped for b in console),
+        "network_log_entries": sum(len(b) for b in network),
+        "network_log_dropped": sum(b.dropped for b in network),
+        "extraction_cache_bytes": sessions.extractions.total_bytes,
+        "json_captures": sum(len(s.captures) for s in all_sessions),
+        "json_capture_queued": sum(c.queue.qsize() for s in all_sessions for c, _ in s.captures.values()),
+    }
+
+
+@asynccontextmanager
+async def _serving() -> AsyncIterator[None]:
+    """Server-wide background work (pool prewarm, governor, metrics endpoint) and final shutdown."""
+    mcp_cfg = get_config().mcp
+    metrics_server = None
+    # Networked transports answer /metrics on their own port (`_metrics_route`).
+    if mcp_cfg.metrics and mcp_cfg.transport == "stdio":
+        try:
+            metrics_server = await serve_prometheus(
+                mcp_cfg.host, mcp_cfg.port, lambda: metrics.render_prometheus(_gauges())
+            )
+        except OSError as exc:
+            # Every stdio client spawns its own server; only the first one gets the port.
+            logger.warning("Metrics endpoint disabled: cannot listen on %s:%s (%s)", mcp_cfg.host, mcp_cfg.port, exc)
+    prewarm: Optional[asyncio.Task] = None
+    if get_config().browser.pool.size > 0:
+        prewarm = asyncio.create_task(sessions.prewarm())
+    governor: Optional[asyncio.Task] = None
+    if get_config().browser.governor.enabled:
+        governor = asyncio.create_task(sessions.govern())
+    try:
+        yield
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        if prewarm is not None and not prewarm.done():
+            prewarm.cancel()
+        if governor is not None:
+            governor.cancel()
+        await sessions.shutdown()
+
+
+@asynccontextmanager
+async def _lifespan(_: FastMCP) -> AsyncIterator[None]:
+    if get_config().mcp.transport == "stdio":
+        async with _serving():
+            yield
+        return
+    # Networked transports enter this once per client connection, inside `_serve_http`'s
+    # `_serving`; the connection's sessions are its own and stop when it goes away.
+    client = sessions.connect()
+    _client.set(client)
+    try:
+        yield
+    finally:
+        await sessions.disconnect(client)
+
+
+mcp = FastMCP("stealthkit-browser", lifespan=_lifespan)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def _metrics_route(_: Request) -> PlainTextResponse:
+    if not get_config().mcp.metrics:
+        return PlainTextResponse("Not Found\n", status_code=404)
+    return PlainTextResponse(
+        metrics.render_prometheus(_gauges()), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _session_scoped(fn: Any, tab_lock: bool) -> Any:
+    """
+    Hold session tools while the browser is recycled. With `tab_lock`, run on the tab the call
+    addresses (`tab`, else the selected one) under that tab's lock, reopening it if hibernated.
+    """
+    signature = inspect.signature(fn)
 
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        await sessions.wait_ready()
+        if not tab_lock:
+            return await fn(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs).arguments
+        session = sessions.get(bound.get("session_id"))
+        tab = bound.get("tab")
+        if tab is not None:
+            await session.wake(tab)
+        async with session.use_tab(session.current_page(tab)):
+            return await fn(*args, **kwargs)
 
-session = _Session()
+    return wrapper
 
 
-@mcp.tool()
+def _tool(tab_lock: bool = True, **kwargs: Any):
+    """
+    `@mcp.tool()` that also records latency, errors and Playwright usage per call.
+    Tools taking a `tab` argument hold that tab's lock unless `tab_lock` is False.
+    """
+
+    def decorator(fn):
+        params = inspect.signature(fn).parameters
+        if "session_id" in params:
+            fn = _session_scoped(fn, tab_lock and "tab" in params)
+        return mcp.tool(**kwargs)(metrics.instrument(fn.__name__, fn))
+
+    return decorator
+
+
+@_tool()
 async def browser_start(
     headless: Optional[bool] = None,
     proxy: Optional[str] = None,
     channel: Optional[str] = None,
     storage_state: Optional[str] = None,
+    block_resource_types: Optional[List[str]] = None,
+    block_url_patterns: Optional[List[str]] = None,
+    block_domains: Optional[List[str]] = None,
+    session_id: Optional[str] = None,
 ) -> str:
-    return await session.start(headless=headless, proxy=proxy, channel=channel, storage_state=storage_state)
+    block_policy = None
+    if block_resource_types is not None or block_url_patterns is not None or block_domains is not None:
+        block_policy = _block_policy(block_resource_types, block_url_patterns, block_domains)
+    return await sessions.open(session_id).start(
+        headless=headless,
+        proxy=proxy,
+        channel=channel,
+        storage_state=storage_state,
+        block_policy=block_policy,
+    )
+
+
+@_tool()
+async def browser_close(session_id: Optional[str] = None) -> str:
+    return await sessions.get(session_id).stop()
+
+
+@_tool()
+async def browser_list_sessions() -> str:
+    return _to_json(sessions.list_sessions())
+
+
+@_tool()
+async def browser_pool_stats() -> str:
+    if sessions.pool is None:
+        return _to_json({"enabled": False, "size": get_config().browser.pool.size})
+    return _to_json({"enabled": True, **sessions.pool.stats()})
 
 
-@mcp.tool()
-async def browser_close() -> str:
-    return await session.stop()
+@_tool()
+async def server_metrics(format: str = "json") -> str:
+    """Per-tool latency/error/round-trip metrics and browser gauges; `format` is "json" or "prometheus"."""
+    if format == "prometheus":
+        return metrics.render_prometheus(_gauges())
+    if format != "json":
+        raise ValueError("format must be 'json' or 'prometheus'.")
+    return _to_json(metrics.snapshot(_gauges()))
 
 
-@mcp.tool()
-async def browser_new_tab() -> str:
-    idx = await session.new_tab()
-    return f"Opened tab {idx}."
+@_tool()
+async def browser_blocking_stats(session_id: Optional[str] = None) -> str:
+    session = sessions.get(session_id)
+    if session.context is None or sessions.sb is None:
+        raise RuntimeError("Browser is not started. Call `browser_start` first.")
+    blocker = sessions.sb.blocker_for(session.context)
+    if blocker is None:
+        return _to_json({"enabled": False})
+    return _to_json({"enabled": True, **blocker.stats()})
 
 
-@mcp.tool()
-async def browser_list_tabs() -> str:
-    return _to_json(await session.list_tabs())
+@_tool()
+async def browser_cache_stats(clear: bool = False) -> str:
+    disk_cache = sessions.sb.disk_cache if sessions.sb is not None else None
+    if disk_cache is None:
+        return _to_json({"enabled": False})
+    if clear:
+        await disk_cache.clear()
+    return _to_json({"enabled": True, **disk_cache.stats()})
+
+
+@_tool()
+async def browser_profile_stats() -> str:
+    profile = sessions.sb.profile if sessions.sb is not None else None
+    if profile is None:
+        return _to_json({"enabled": False})
+    return _to_json({"enabled": True, **await asyncio.to_thread(profile.stats)})
+
+
+@_tool()
+async def browser_governor_stats(refresh: bool = False, events: int = 50) -> str:
+    """
+    Memory governor state: budgets, counters, recent hibernate/restore/recycle events and the last
+    sample (browser RSS and CPU by process type, per-tab idle time and JS heap). `refresh` samples now.
+    """
+    gov = sessions.governor
+    if refresh:
+        await sessions.sample()
+    return _to_json({"enabled": get_config().browser.governor.enabled, **gov.stats(limit=events)})
+
+
+@_tool()
+async def browser_new_tab(session_id: Optional[str] = None) -> str:
+    session = sessions.get(session_id)
+    page = await session.new_tab()
+    return f"Opened tab {session.tab_id(page)} (index {session.pages.index(page)})."
+
+
+@_tool()
+async def browser_list_tabs(
+    url_pattern: Optional[str] = None,
+    title_contains: Optional[str] = None,
+    load_state: Optional[str] = None,
+    min_idle_s: Optional[float] = None,
+    sort: str = "index",
+    descending: bool = False,
+    limit: Optional[int] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    List tabs from memory, hibernated ones last. Filter by URL glob, title substring, load_state
+    ("loading", "domcontentloaded", "load", "closed", "hibernated") or idle time; `sort` is "index", "idle" (least
+    recently used first), "opened", "url" or "title".
+    """
+    rows = sessions.get(session_id).list_tabs()
+    return _to_json(
+        filter_tabs(
+            rows,
+            url_pattern=url_pattern,
+            title_contains=title_contains,
+            load_state=load_state,
+            min_idle_s=min_idle_s,
+            sort=sort,
+            descending=descending,
+            limit=limit,
+        )
+    )
 
 
-@mcp.tool()
-async def browser_select_tab(index: int) -> str:
-    session.select_tab(index)
-    return f"Selected tab {index}."
+@_tool(tab_lock=False)
+async def browser_select_tab(
+    index: Optional[int] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """Make a tab the default for tools called without `tab`. Prefer passing `tab` to each tool."""
+    tab_id = await sessions.get(session_id).select_tab(index=index, tab=tab)
+    return f"Selected tab {tab_id}."
 
 
-@mcp.tool()
-async def browser_close_tab(index: Optional[int] = None) -> str:
-    return await session.close_tab(index=index)
+@_tool(tab_lock=False)
+async def browser_close_tab(
+    index: Optional[int] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """Close a tab (the selected one by default) once calls already running on it finish."""
+    return await sessions.get(session_id).close_tab(index=index, tab=tab)
 
 
-@mcp.tool()
-async def browser_navigate(url: str, wait_until: str = "domcontentloaded", timeout_ms: int = 30000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_navigate(
+    url: str,
+    wait_until: str = "domcontentloaded",
+    timeout_ms: int = 30000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     resp = await page.goto(url, wait_until=wait_until, timeout=timeout_ms)
     status = getattr(resp, "status", None) if resp else None
     return _to_json({"url": page.url, "status": status, "title": await page.title()})
 
 
-@mcp.tool()
-async def browser_navigate_back(wait_until: str = "domcontentloaded", timeout_ms: int = 30000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_navigate_back(
+    wait_until: str = "domcontentloaded",
+    timeout_ms: int = 30000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     resp = await page.go_back(wait_until=wait_until, timeout=timeout_ms)
     status = getattr(resp, "status", None) if resp else None
     return _to_json({"url": page.url, "status": status, "title": await page.title()})
 
 
-@mcp.tool()
-async def browser_get_title() -> str:
-    return await session.current_page().title()
+@_tool()
+async def browser_get_title(tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    return await sessions.get(session_id).current_page(tab).title()
 
 
-@mcp.tool()
-async def browser_get_html(max_chars: int = 20000) -> str:
-    html = await session.current_page().content()
+@_tool()
+async def browser_get_html(max_chars: int = 20000, tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    html = await sessions.get(session_id).current_page(tab).content()
     return html[:max_chars]
 
 
-@mcp.tool()
-async def browser_click(selector: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
-    await page.click(selector=selector, timeout=timeout_ms)
-    return f"Clicked: {selector}"
+@_tool()
+async def browser_click(
+    selector: Optional[str] = None,
+    timeout_ms: int = 10000,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    await _on_target(session, page, selector, ref, lambda t: t.click(timeout=timeout_ms))
+    return f"Clicked: {selector or ref}"
 
 
-@mcp.tool()
+@_tool()
 async def browser_type(
-    selector: str,
+    selector: Optional[str] = None,
+    *,
     text: str,
     clear: bool = True,
     submit: bool = False,
     timeout_ms: int = 10000,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
 ) -> str:
-    page = session.current_page()
-    if clear:
-        await page.fill(selector=selector, value="", timeout=timeout_ms)
-    await page.type(selector=selector, text=text, timeout=timeout_ms)
-    if submit:
-        await page.press(selector=selector, key="Enter", timeout=timeout_ms)
-    return f"Typed into {selector}."
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+
+    async def _type(target: Any) -> None:
+        if clear:
+            await target.fill("", timeout=timeout_ms)
+        await target.type(text, timeout=timeout_ms)
+        if submit:
+            await target.press("Enter", timeout=timeout_ms)
 
+    await _on_target(session, page, selector, ref, _type)
+    return f"Typed into {selector or ref}."
 
-@mcp.tool()
-async def browser_press_key(key: str) -> str:
-    page = session.current_page()
+
+@_tool()
+async def browser_press_key(key: str, tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    page = sessions.get(session_id).current_page(tab)
     await page.keyboard.press(key)
     return f"Pressed key: {key}"
 
 
-@mcp.tool()
-async def browser_get_url() -> str:
-    return session.current_page().url
+@_tool()
+async def browser_get_url(tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    return sessions.get(session_id).current_page(tab).url
 
 
-@mcp.tool()
-async def browser_reload(wait_until: str = "domcontentloaded", timeout_ms: int = 30000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_reload(
+    wait_until: str = "domcontentloaded",
+    timeout_ms: int = 30000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     resp = await page.reload(wait_until=wait_until, timeout=timeout_ms)
     status = getattr(resp, "status", None) if resp else None
     return _to_json({"url": page.url, "status": status, "title": await page.title()})
 
 
-@mcp.tool()
-async def browser_sleep(seconds: float) -> str:
-    await session.current_page().wait_for_timeout(int(seconds * 1000))
+@_tool()
+async def browser_sleep(seconds: float, tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    await sessions.get(session_id).current_page(tab).wait_for_timeout(int(seconds * 1000))
     return f"Slept {seconds} second(s)."
 
 
-@mcp.tool()
-async def browser_wait_for_text(text: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_wait_for_stable(
+    quiet_ms: int = 500,
+    timeout_ms: int = 10000,
+    network: bool = True,
+    attributes: bool = True,
+    layout_shifts: bool = True,
+    long_request_ms: int = 5000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Return once DOM mutations, layout shifts and in-flight requests have all been quiet for quiet_ms.
+    Requests open longer than long_request_ms (long polls, streams) are ignored. Does not raise on
+    timeout: the report has stable=false and lists what was still busy.
+    """
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    report = await wait_for_stable(
+        page,
+        session.world(page),
+        session.network_activity.get(id(page)) if network else None,
+        quiet_ms=quiet_ms,
+        timeout_ms=timeout_ms,
+        attributes=attributes,
+        layout_shifts=layout_shifts,
+        long_request_ms=long_request_ms,
+    )
+    return _to_json(report)
+
+
+@_tool()
+async def browser_wait_for_text(
+    text: str,
+    timeout_ms: int = 10000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     await page.get_by_text(text).first.wait_for(state="visible", timeout=timeout_ms)
     return f"Text appeared: {text}"
 
 
-@mcp.tool()
-async def browser_wait_for_text_gone(text: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_wait_for_text_gone(
+    text: str,
+    timeout_ms: int = 10000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     await page.get_by_text(text).first.wait_for(state="hidden", timeout=timeout_ms)
     return f"Text disappeared: {text}"
 
 
-@mcp.tool()
-async def browser_fill(selector: str, text: str, timeout_ms: int = 10000, submit: bool = False) -> str:
-    page = session.current_page()
-    await page.fill(selector=selector, value=text, timeout=timeout_ms)
-    if submit:
-        await page.press(selector=selector, key="Enter", timeout=timeout_ms)
-    return f"Filled: {selector}"
+@_tool()
+async def browser_fill(
+    selector: Optional[str] = None,
+    *,
+    text: str,
+    timeout_ms: int = 10000,
+    submit: bool = False,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+
+    async def _fill(target: Any) -> None:
+        await target.fill(text, timeout=timeout_ms)
+        if submit:
+            await target.press("Enter", timeout=timeout_ms)
+
+    await _on_target(session, page, selector, ref, _fill)
+    return f"Filled: {selector or ref}"
 
 
-@mcp.tool()
-async def browser_scroll_by(delta_y: float, delta_x: float = 0) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_scroll_by(
+    delta_y: float,
+    delta_x: float = 0,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     try:
         await page.mouse.wheel(delta_x, delta_y)
     except Exception:
@@ -362,45 +1704,53 @@ async def browser_scroll_by(delta_y: float, delta_x: float = 0) -> str:
     return f"Scrolled by dx={delta_x}, dy={delta_y}."
 
 
-def _normalize_whitespace(s: str) -> str:
-    s = s.replace("\u00a0", " ")
-    s = re.sub(r"[ \t]+\n", "\n", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    return s.strip()
+def _soft_truncate(s: str, max_chars: int, start: int = 0) -> Dict[str, Any]:
+    total = len(s)
+    limit = start + max_chars
+    if total <= limit:
+        return {"text": s[start:], "truncated": False, "total_chars": total, "end": total}
+    cut = s.rfind("\n\n", start, limit)
+    end = cut if cut >= start + int(max_chars * 0.6) else limit
+    return {"text": s[start:end], "truncated": True, "total_chars": total, "end": end}
 
 
-def _soft_truncate(s: str, max_chars: int) -> Dict[str, Any]:
-    total = len(s)
-    if total <= max_chars:
-        return {"text": s, "truncated": False, "total_chars": total}
-    cut = s.rfind("\n\n", 0, max_chars)
-    end = cut if cut >= int(max_chars * 0.6) else max_chars
-    return {"text": s[:end], "truncated": True, "total_chars": total}
+_CONTENT_MODES = {"text", "html", "markdown"}
+_EXTRACT_PAGE_JS = f"(opts) => ({EXTRACT_JS})(document.body || document.documentElement, opts)"
 
 
-@mcp.tool()
-async def browser_get_page_content(
+async def _extract_content(
+    page: Any,
     mode: str = "text",
     selector: Optional[str] = None,
     max_chars: int = 20000,
     include_links: bool = True,
     include_metadata: bool = True,
-) -> str:
-    allowed = {"text", "html", "markdown"}
-    if mode not in allowed:
-        raise ValueError(f"Invalid mode: {mode}. Allowed: {sorted(allowed)}")
-
-    page = session.current_page()
-
-    if mode == "html":
-        raw = await page.locator(selector).first.inner_html(timeout=5000) if selector else await page.content()
+    tracker: Optional[ContentTracker] = None,
+    since: Optional[str] = None,
+    cache_owner: Optional[Tuple[str, int]] = None,
+) -> Dict[str, Any]:
+    if mode not in _CONTENT_MODES:
+        raise ValueError(f"Invalid mode: {mode}. Allowed: {sorted(_CONTENT_MODES)}")
+    if max_chars < 1:
+        raise ValueError("max_chars must be at least 1.")
+    if tracker is not None and mode == "html":
+        raise ValueError("Incremental content is only available for mode 'text' or 'markdown'.")
+
+    opts = {"mode": mode, "includeLinks": include_links, "fullDocument": selector is None}
+    if selector:
+        # Locator.evaluate keeps Playwright selector syntax and auto-waiting.
+        extracted = await page.locator(selector).first.evaluate(EXTRACT_JS, opts, timeout=5000)
     else:
-        # text / markdown: use innerText to match visible content
-        if selector:
-            raw = await page.locator(selector).first.inner_text(timeout=5000)
-        else:
-            raw = await page.evaluate("() => document.body ? document.body.innerText : ''")
-        raw = _normalize_whitespace(raw)
+        extracted = await page.evaluate(_EXTRACT_PAGE_JS, opts)
+    raw = extracted["content"]
+
+    delta = tracker.update(raw, since) if tracker is not None else None
+    if delta is not None and not delta["full"]:
+        # Diff against the caller's version: blocks only, no links.
+        result = {"mode": mode, **delta}
+        if include_metadata:
+            result["url"] = page.url
+        return result
 
     trunc = _soft_truncate(raw, max_chars)
 
@@ -410,35 +1760,103 @@ async def browser_get_page_content(
         "truncated": trunc["truncated"],
         "total_chars": trunc["total_chars"],
     }
+    if delta is not None:
+        result["version"] = delta["version"]
+        result["full"] = True
+    if trunc["truncated"] and cache_owner is not None:
+        # Keep the full document so later chunks need no re-extraction.
+        entry_id = sessions.extractions.put(cache_owner, raw, {"mode": mode, "selector": selector})
+        if entry_id is not None:
+            result["cursor"] = f"{entry_id}:{trunc['end']}"
 
     if include_metadata:
         result["url"] = page.url
-        try:
-            result["title"] = await page.title()
-        except Exception:
-            result["title"] = ""
+        result["title"] = extracted["title"]
 
     if include_links:
-        links = await page.evaluate(
-            """(sel) => {
-                const root = sel ? document.querySelector(sel) : document;
-                if (!root) return [];
-                const as = Array.from(root.querySelectorAll('a[href]'));
-                return as.map(a => ({
-                    text: (a.textContent || '').trim().slice(0, 200),
-                    href: a.href
-                })).filter(x => x.href);
-            }""",
-            selector,
+        result["links"] = extracted["links"] or []
+
+    return result
+
+
+@_tool()
+async def browser_get_page_content(
+    mode: str = "text",
+    selector: Optional[str] = None,
+    max_chars: int = 20000,
+    include_links: bool = True,
+    include_metadata: bool = True,
+    incremental: bool = False,
+    since: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Extract page content. With `incremental=True` (or `since` set) the result carries a
+    `version`; passing it back as `since` returns only added/removed/changed text blocks
+    for the same tab and navigation, or full content if the version no longer applies.
+    """
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    tracker = None
+    if incremental or since is not None:
+        tracker = session.content_tracker(page, (mode, selector))
+    return _to_json(
+        await _extract_content(
+            page,
+            mode=mode,
+            selector=selector,
+            max_chars=max_chars,
+            include_links=include_links,
+            include_metadata=include_metadata,
+            tracker=tracker,
+            since=since,
+            cache_owner=(session.key, id(page)),
         )
-        result["links"] = links
+    )
 
+
+@_tool()
+async def browser_get_page_content_next(
+    cursor: str,
+    max_chars: int = 20000,
+    session_id: Optional[str] = None,
+) -> str:
+    """Return the next chunk of a truncated `browser_get_page_content` result without re-extracting."""
+    if max_chars < 1:
+        # An empty chunk would hand back a cursor at the same offset forever.
+        raise ValueError("max_chars must be at least 1.")
+    session = sessions.get(session_id)
+    entry_id, _, offset_s = cursor.partition(":")
+    entry = sessions.extractions.get(entry_id)
+    if entry is None or entry.owner[0] != session.key or not offset_s.isdigit():
+        raise ValueError("Cursor expired (tab navigated, closed or evicted). Call `browser_get_page_content` again.")
+    content = entry.content
+    offset = int(offset_s)
+    while offset < len(content) and content[offset] == "\n":
+        offset += 1
+    trunc = _soft_truncate(content, max_chars, start=offset)
+    result: Dict[str, Any] = {
+        "mode": entry.meta["mode"],
+        "content": trunc["text"],
+        "offset": offset,
+        "truncated": trunc["truncated"],
+        "total_chars": trunc["total_chars"],
+    }
+    if trunc["truncated"]:
+        result["cursor"] = f"{entry_id}:{trunc['end']}"
     return _to_json(result)
 
 
-@mcp.tool()
-async def browser_wait_for_selector(selector: str, state: str = "visible", timeout_ms: int = 10000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_wait_for_selector(
+    selector: str,
+    state: str = "visible",
+    timeout_ms: int = 10000,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    page = sessions.get(session_id).current_page(tab)
     allowed = {"attached", "visible", "hidden", "detached"}
     if state not in allowed:
         raise ValueError(f"Invalid state: {state}. Allowed: {sorted(allowed)}")
@@ -447,112 +1865,222 @@ async def browser_wait_for_selector(selector: str, state: str = "visible", timeo
     return f"Selector ready: {selector} (state={state})"
 
 
-@mcp.tool()
-async def browser_get_text(selector: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
-    locator = page.locator(selector).first
-    await locator.wait_for(state="visible", timeout=timeout_ms)
-    return await locator.inner_text()
+@_tool()
+async def browser_get_text(
+    selector: Optional[str] = None,
+    timeout_ms: int = 10000,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
 
+    async def _text(target: Any) -> str:
+        if ref is None:
+            await target.wait_for(state="visible", timeout=timeout_ms)
+        else:
+            await target.wait_for_element_state("visible", timeout=timeout_ms)
+        return await target.inner_text()
 
-@mcp.tool()
-async def browser_get_attribute(selector: str, attribute: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
-    locator = page.locator(selector).first
-    await locator.wait_for(state="attached", timeout=timeout_ms)
-    val = await locator.get_attribute(attribute)
-    return _to_json(val)
+    return await _on_target(session, page, selector, ref, _text)
 
 
-@mcp.tool()
-async def browser_scroll_into_view(selector: str, timeout_ms: int = 10000) -> str:
-    page = session.current_page()
-    locator = page.locator(selector).first
-    await locator.wait_for(state="attached", timeout=timeout_ms)
-    await locator.scroll_into_view_if_needed(timeout=timeout_ms)
-    return f"Scrolled into view: {selector}"
+@_tool()
+async def browser_get_attribute(
+    selector: Optional[str] = None,
+    *,
+    attribute: str,
+    timeout_ms: int = 10000,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
 
+    async def _attribute(target: Any) -> Optional[str]:
+        if ref is None:
+            await target.wait_for(state="attached", timeout=timeout_ms)
+        return await target.get_attribute(attribute)
 
-@mcp.tool()
-async def browser_save_storage(path: str = "storage_state.json") -> str:
-    if session.sb is None or getattr(session.sb, "context", None) is None:
-        raise RuntimeError("Browser is not started. Call `browser_start` first.")
-    await session.sb.context.storage_state(path=path)  # type: ignore
-    return f"Saved storage_state to {path}"
+    val = await _on_target(session, page, selector, ref, _attribute)
+    return _to_json(val)
 
 
-@mcp.tool()
-async def browser_load_storage(path: str) -> str:
-    if not session.is_running() or session.sb is None:
-        raise RuntimeError("Browser is not started. Call `browser_start` first.")
+@_tool()
+async def browser_scroll_into_view(
+    selector: Optional[str] = None,
+    timeout_ms: int = 10000,
+    ref: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
 
-    browser_obj = getattr(session.sb, "browser", None)
-    if browser_obj is None:
-        raise RuntimeError("Underlying browser object not exposed; cannot load storage_state in-place.")
+    async def _scroll(target: Any) -> None:
+        if ref is None:
+            await target.wait_for(state="attached", timeout=timeout_ms)
+        await target.scroll_into_view_if_needed(timeout=timeout_ms)
 
-    # Close existing pages
-    for p in list(session.pages):
-        try:
-            await p.close()
-        except Exception:
-            pass
-    session.pages = []
-    session.current_idx = -1
+    await _on_target(session, page, selector, ref, _scroll)
+    return f"Scrolled into view: {selector or ref}"
 
-    # Close old context if present
-    try:
-        if getattr(session.sb, "context", None) is not None:
-            await session.sb.context.close()  # type: ignore
-    except Exception:
-        pass
 
-    new_ctx = await browser_obj.new_context(storage_state=path)
-    session.sb.context = new_ctx  # type: ignore
-    page = await new_ctx.new_page()
-    session.pages = [page]
-    session.current_idx = 0
-    session._attach_page(page)
+@_tool()
+async def browser_save_storage(path: str = "storage_state.json", session_id: Optional[str] = None) -> str:
+    session = sessions.get(session_id)
+    if session.context is None:
+        raise RuntimeError("Browser is not started. Call `browser_start` first.")
+    await session.context.storage_state(path=path)
+    return f"Saved storage_state to {path}"
+
+
+@_tool()
+async def browser_storage_snapshot_save(name: str, persist: Optional[bool] = None, session_id: Optional[str] = None) -> str:
+    """
+    Save the session's cookies and localStorage in memory under `name`.
+    persist writes it through to browser.snapshots.directory as well (default: on when that is set).
+    """
+    session = sessions.get(session_id)
+    if session.context is None:
+        raise RuntimeError("Browser is not started. Call `browser_start` first.")
+    store = sessions.snapshots
+    state = await session.context.storage_state()
+    snapshot = await store.save(name, state, persist=store.directory is not None if persist is None else persist)
+    sessions.warm_snapshot(snapshot)
+    return _to_json(snapshot.summary())
+
+
+@_tool()
+async def browser_storage_snapshot_list() -> str:
+    items = sessions.snapshots.summaries()
+    for item in items:
+        pool = sessions.snapshot_pools.get(item["name"])
+        if pool is not None:
+            item["warm"] = pool.stats()
+    return _to_json(items)
+
+
+@_tool()
+async def browser_storage_snapshot_load(name: str, session_id: Optional[str] = None) -> str:
+    """Swap the session onto a context with snapshot `name`, from its warm pool when one is ready."""
+    snapshot = await sessions.snapshots.get(name)
+    await sessions.get(session_id).replace_context(snapshot=snapshot)
+    if sessions.sb is not None and sessions.sb.persistent:
+        return f"Added cookies from snapshot '{name}' to the persistent profile."
+    return f"Loaded snapshot '{name}' into a new context (tab 0)."
+
+
+@_tool()
+async def browser_storage_snapshot_delete(name: str, delete_file: bool = False) -> str:
+    sessions.drop_snapshot_pool(name)
+    if not await sessions.snapshots.delete(name, delete_file=delete_file):
+        raise ValueError(f"Unknown snapshot: {name}")
+    return f"Deleted snapshot '{name}'."
+
+
+@_tool()
+async def browser_load_storage(path: str, session_id: Optional[str] = None) -> str:
+    await sessions.get(session_id).replace_context(storage_state=path)
+    if sessions.sb is not None and sessions.sb.persistent:
+        return f"Added cookies from {path} to the persistent profile."
     return f"Loaded storage_state from {path} into a new context (tab 0)."
 
 
-@mcp.tool()
-async def browser_evaluate(js_expression: str) -> str:
-    result = await session.current_page().evaluate(js_expression)
+@_tool()
+async def browser_evaluate(js_expression: str, tab: Optional[str] = None, session_id: Optional[str] = None) -> str:
+    result = await sessions.get(session_id).current_page(tab).evaluate(js_expression)
     return _to_json(result)
 
 
-@mcp.tool()
-async def browser_take_screenshot(path: str = "mcp_screenshot.png", full_page: bool = True) -> str:
-    await session.current_page().screenshot(path=path, full_page=full_page)
+@_tool()
+async def browser_take_screenshot(
+    path: str = "mcp_screenshot.png",
+    full_page: bool = True,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    await sessions.get(session_id).current_page(tab).screenshot(path=path, full_page=full_page)
     return f"Saved screenshot to {path}"
 
 
-@mcp.tool()
+@_tool()
 async def browser_take_screenshot_base64(
     full_page: bool = True,
     image_type: str = "png",
     path: Optional[str] = None,
+    selector: Optional[str] = None,
+    clip: Optional[Dict[str, float]] = None,
+    quality: Optional[int] = None,
+    scale: float = 1.0,
+    max_dimension: Optional[int] = None,
+    if_changed: bool = False,
+    force: bool = False,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
 ) -> str:
+    """
+    Capture the page, an element (`selector`) or a region (`clip` = {x, y, width, height}).
+    `quality` (1-100) applies to jpeg/webp; `scale` and `max_dimension` downsample the output.
+    With `if_changed`, a capture with the same options as the last one returns only
+    `unchanged: true` when the DOM, scroll position, viewport and network activity are unchanged
+    since; hover/focus styles, CSS animations, canvas and video are not tracked. `force` recaptures.
+    """
     img_type = image_type.lower()
-    if img_type not in {"png", "jpeg"}:
-        raise ValueError("image_type must be 'png' or 'jpeg'.")
-
-    page = session.current_page()
-    image_bytes = await page.screenshot(path=path, full_page=full_page, type=img_type)
-    encoded = base64.b64encode(image_bytes).decode("ascii")
-    return _to_json(
-        {
-            "mime_type": f"image/{img_type}",
-            "data": encoded,
-            "path": path,
-        }
+    if img_type == "jpg":
+        img_type = "jpeg"
+    if quality is not None and not 1 <= quality <= 100:
+        raise ValueError("quality must be between 1 and 100.")
+    if scale <= 0:
+        raise ValueError("scale must be positive.")
+
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    frame = await session.capturer(page).capture(
+        image_type=img_type,
+        quality=quality,
+        full_page=full_page,
+        selector=selector,
+        clip=clip,
+        scale=scale,
+        max_dimension=max_dimension,
+        reuse=if_changed and not force,
     )
+    if path:
+        data = base64.b64decode(frame["data"])
+        await asyncio.to_thread(Path(path).write_bytes, data)
+    result = {**frame, "path": path}
+    if if_changed and frame["unchanged"]:
+        del result["data"]
+    return _to_json(result)
 
 
-@mcp.tool()
-async def browser_snapshot(max_chars: int = 30000) -> str:
-    page = session.current_page()
+@_tool()
+async def browser_snapshot(
+    max_chars: int = 30000,
+    incremental: bool = False,
+    since: Optional[str] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
     text = await page.inner_text("body")
+    if incremental or since is not None:
+        delta = session.content_tracker(page, ("snapshot", None)).update(text, since)
+        if not delta["full"]:
+            return _to_json({"url": page.url, **delta})
+        return _to_json(
+            {
+                "url": page.url,
+                "title": await page.title(),
+                "text": text[:max_chars],
+                "version": delta["version"],
+                "full": True,
+            }
+        )
     snapshot = {
         "url": page.url,
         "title": await page.title(),
@@ -561,24 +2089,355 @@ async def browser_snapshot(max_chars: int = 30000) -> str:
     return _to_json(snapshot)
 
 
-@mcp.tool()
-async def browser_console_messages(only_errors: bool = False, limit: int = 200) -> str:
-    page = session.current_page()
-    logs = session.console_logs.get(id(page), [])
+@_tool()
+async def browser_element_snapshot(
+    max_elements: int = 200,
+    viewport_only: bool = False,
+    name_chars: int = 80,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    List visible interactive elements as 'ref role "name" extras' lines. Pass a ref as `ref=` to
+    browser_click / browser_fill / browser_type / browser_get_text / browser_get_attribute /
+    browser_scroll_into_view instead of a selector. An element keeps its ref until the tab navigates.
+    """
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    result = await session.element_refs[id(page)].snapshot(
+        page, session.world(page), max_elements=max_elements, viewport_only=viewport_only, name_chars=name_chars
+    )
+    return _to_json({"url": page.url, "title": await page.title(), **result})
+
+
+@_tool(tab_lock=False)
+async def browser_console_messages(
+    only_errors: bool = False,
+    limit: int = 200,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    logs = session.console_logs.get(id(page))
+    if logs is None:
+        return _to_json([])
     if only_errors:
-        logs = [x for x in logs if x.get("type") == "error"]
-    return _to_json(logs[-limit:])
+        # Walk newest-first so only the last `limit` errors are materialized.
+        errors: List[Dict[str, Any]] = []
+        for rec in reversed(logs):
+            if len(errors) >= limit:
+                break
+            if rec.type == "error":
+                errors.append(rec.to_dict())
+        errors.reverse()
+        return _to_json(errors)
+    return _to_json([rec.to_dict() for rec in logs.tail(limit)])
+
+
+@_tool(tab_lock=False)
+async def browser_network_requests(
+    limit: int = 200,
+    include_timing: bool = False,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    logs = session.network_logs.get(id(page))
+    if logs is None:
+        return _to_json([])
+    records = list(logs.tail(limit))
+    await _fill_sizes(records)
+    return _to_json([rec.to_dict(include_timing=include_timing) for rec in records])
+
+
+@_tool(tab_lock=False)
+async def browser_capture_start(
+    url_patterns: Optional[List[str]] = None,
+    methods: Optional[List[str]] = None,
+    content_types: Optional[List[str]] = None,
+    max_body_bytes: int = 1_000_000,
+    max_queue: int = 500,
+    all_tabs: bool = False,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Start capturing JSON responses of the current tab (or every tab) into a bounded queue.
+    Filters are checked before bodies are read; `content_types` defaults to ["json"].
+    Read results with `browser_capture_drain`.
+    """
+    session = sessions.get(session_id)
+    page = session.current_page(tab)
+    capture = JsonCapture(
+        url_patterns=url_patterns or (),
+        methods=methods or (),
+        content_types=("json",) if content_types is None else content_types,
+        max_body_bytes=max_body_bytes,
+        max_queue=max_queue,
+    )
+    for p in session.pages if all_tabs else [page]:
+        capture.attach(p)
+    capture_id = secrets.token_hex(4)
+    session.captures[capture_id] = (capture, all_tabs)
+    return _to_json({"capture_id": capture_id, "tabs": len(session.pages) if all_tabs else 1})
+
+
+def _get_capture(session: _Session, capture_id: str) -> JsonCapture:
+    entry = session.captures.get(capture_id)
+    if entry is None:
+        raise ValueError(f"Unknown capture: {capture_id}")
+    return entry[0]
+
+
+@_tool()
+async def browser_capture_drain(
+    capture_id: str,
+    max_items: int = 20,
+    wait_ms: int = 0,
+    session_id: Optional[str] = None,
+) -> str:
+    """Take up to `max_items` captured responses, waiting up to `wait_ms` for the first one."""
+    capture = _get_capture(sessions.get(session_id), capture_id)
+    if wait_ms > 0:
+        await capture.wait(wait_ms / 1000)
+    items = capture.drain(max(1, max_items))
+    return _to_json(
+        {
+            "items": [item.to_dict() for item in items],
+            "remaining": capture.queue.qsize(),
+            "stats": capture.stats(),
+        }
+    )
+
+
+@_tool()
+async def browser_capture_stop(capture_id: str, session_id: Optional[str] = None) -> str:
+    """Stop a capture and discard anything still queued."""
+    session = sessions.get(session_id)
+    capture = _get_capture(session, capture_id)
+    del session.captures[capture_id]
+    await capture.close()
+    return _to_json({"capture_id": capture_id, "discarded": capture.queue.qsize(), **capture.stats()})
 
 
-@mcp.tool()
-async def browser_network_requests(limit: int = 200) -> str:
-    page = session.current_page()
-    logs = session.network_logs.get(id(page), [])
-    return _to_json(logs[-limit:])
+@_tool(tab_lock=False)
+async def browser_export_har(
+    path: str = "network.har",
+    all_tabs: bool = False,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """Write the recorded network log of the current tab (or every tab) to `path` as HAR 1.2."""
+    session = sessions.get(session_id)
+    current = session.current_page(tab)
+    tabs = list(session.pages) if all_tabs else [current]
+
+    pages = []
+    per_tab = []
+    for page in tabs:
+        records = list(session.network_logs.get(id(page)) or ())
+        pageref = session.tab_id(page)
+        pages.append((pageref, page.url, records[0].started if records else time.time()))
+        per_tab.append([(pageref, rec) for rec in records])
+    await _fill_sizes(rec for records in per_tab for _, rec in records)
+    # Records are snapshotted above; the file is written off the event loop.
+    merged = heapq.merge(*per_tab, key=lambda item: item[1].started or 0)
+    result = await asyncio.to_thread(write_har, path, pages, merged)
+    return _to_json({"path": path, "tabs": len(pages), **result})
+
+
+@_tool()
+async def browser_fetch_many(
+    urls: List[str],
+    concurrency: int = 4,
+    mode: str = "text",
+    max_chars: int = 20000,
+    include_links: bool = False,
+    wait_until: str = "domcontentloaded",
+    timeout_ms: int = 30000,
+    output_path: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Navigate and extract many URLs concurrently on up to `concurrency` worker tabs.
+    Results are returned in input order, or streamed to `output_path` as JSONL when given.
+    """
+    if mode not in _CONTENT_MODES:
+        raise ValueError(f"Invalid mode: {mode}. Allowed: {sorted(_CONTENT_MODES)}")
+    session = sessions.get(session_id)
+    session.current_page()  # raises if not started
+    if not urls:
+        return _to_json({"count": 0, "ok": 0, "elapsed_ms": 0.0, "results": []})
+
+    workers = max(1, min(concurrency, len(urls)))
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(len(urls)):
+        queue.put_nowait(i)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+    ok_count = [0]
+    out = await asyncio.to_thread(open, output_path, "w", encoding="utf-8") if output_path else None
+    out_lock = asyncio.Lock()
+
+    def _write_line(line: str) -> None:
+        out.write(line)
+        out.flush()
+
+    async def _fetch(page: Any, url: str) -> Dict[str, Any]:
+        resp = await page.goto(url, wait_until=wait_until, timeout=timeout_ms)
+        content = await _extract_content(page, mode=mode, max_chars=max_chars, include_links=include_links)
+        content["status"] = getattr(resp, "status", None) if resp else None
+        return content
+
+    async def _worker() -> None:
+        page = await session.new_tab(select=False)
+        try:
+            async with session.use_tab(page):
+                while True:
+                    try:
+                        i = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    started = time.perf_counter()
+                    entry: Dict[str, Any] = {"index": i, "url": urls[i]}
+                    try:
+                        # Bound the whole navigate + extract, not just the navigation.
+                        entry.update(await asyncio.wait_for(_fetch(page, urls[i]), timeout_ms / 1000))
+                        entry["ok"] = True
+                        ok_count[0] += 1
+                    except asyncio.TimeoutError:
+                        entry["ok"] = False
+                        entry["error"] = f"Timed out after {timeout_ms} ms"
+                    except Exception as e:
+                        entry["ok"] = False
+                        entry["error"] = str(e)
+                    entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    if out is not None:
+                        async with out_lock:
+                            await asyncio.to_thread(_write_line, _to_json(entry) + "\n")
+                    else:
+                        results[i] = entry
+        finally:
+            await session.close_page(page)
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(_worker()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # gather leaves the other workers running; stop them before the output file closes.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if out is not None:
+            await asyncio.to_thread(out.close)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    summary: Dict[str, Any] = {"count": len(urls), "ok": ok_count[0], "elapsed_ms": elapsed_ms}
+    if out is not None:
+        summary["output_path"] = output_path
+    else:
+        summary["results"] = results
+    return _to_json(summary)
+
+
+def _decode_result(result: Any) -> Any:
+    if isinstance(result, str) and result[:1] in ("{", "[", '"'):
+        try:
+            return json.loads(result)
+        except ValueError:
+            pass
+    return result
+
+
+@_tool(tab_lock=False)
+async def browser_batch(
+    steps: List[Dict[str, Any]],
+    stop_on_error: bool = True,
+    step_timeout_ms: Optional[int] = None,
+    tab: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """
+    Run several tools server-side in one call.
+    Each step is {"tool": "browser_click", "args": {...}, "timeout_ms": 5000, "stop_on_error": true};
+    `timeout_ms` and `stop_on_error` are optional per-step overrides. `tab` is the default tab of
+    steps that take one; each step holds its tab's lock only while it runs.
+    """
+    results: List[Dict[str, Any]] = []
+    stopped = False
+    for i, step in enumerate(steps):
+        name = step.get("tool") if isinstance(step, dict) else None
+        entry: Dict[str, Any] = {"index": i, "tool": name}
+        results.append(entry)
+        if stopped:
+            entry["skipped"] = True
+            continue
+
+        started = time.perf_counter()
+        try:
+            tool = mcp._tool_manager.get_tool(name) if isinstance(name, str) else None
+            if tool is None or name == "browser_batch":
+                raise ValueError(f"Unknown or disallowed tool: {name!r}")
+            args = dict(step.get("args") or {})
+            properties = tool.parameters.get("properties", {})
+            if session_id is not None and "session_id" in properties:
+                args.setdefault("session_id", session_id)
+            if tab is not None and "tab" in properties and "index" not in args:
+                args.setdefault("tab", tab)
+            timeout_ms = step.get("timeout_ms", step_timeout_ms)
+            call = tool.run(args)
+            result = await (asyncio.wait_for(call, timeout_ms / 1000) if timeout_ms else call)
+            entry["ok"] = True
+            entry["result"] = _decode_result(result)
+        except asyncio.TimeoutError:
+            entry["ok"] = False
+            entry["error"] = f"Timed out after {timeout_ms} ms"
+        except Exception as e:
+            entry["ok"] = False
+            entry["error"] = str(e.__cause__ or e)
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if not entry["ok"] and step.get("stop_on_error", stop_on_error):
+            stopped = True
+
+    return _to_json(
+        {
+            "ok": all(r.get("ok") for r in results),
+            "completed": sum(1 for r in results if "ok" in r),
+            "steps": results,
+        }
+    )
+
+
+async def _serve_http(transport: str) -> None:
+    import uvicorn
+
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=mcp.settings.host, port=mcp.settings.port, log_level=mcp.settings.log_level.lower())
+    )
+    async with _serving():
+        await server.serve()
 
 
 def main() -> None:
-    mcp.run()
+    mcp_cfg = get_config().mcp
+    if mcp_cfg.transport == "stdio":
+        mcp.run()
+        return
+    mcp.settings.host = mcp_cfg.host
+    mcp.settings.port = mcp_cfg.port
+    mcp.settings.log_level = mcp_cfg.log_level.upper()
+    mcp.settings.session_idle_timeout = mcp_cfg.client_idle_s or None
+    if mcp_cfg.max_clients > 0:
+        mcp.settings.max_sessions = mcp_cfg.max_clients
+    if mcp_cfg.host not in ("127.0.0.1", "localhost", "::1"):
+        # FastMCP restricts Host/Origin headers to localhost by default; clients come from elsewhere here.
+        mcp.settings.transport_security = None
+    anyio.run(_serve_http, mcp_cfg.transport)
 
 
 if __name__ == "__main__":
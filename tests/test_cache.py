@@ -0,0 +1,247 @@
+# tests/test_cache.py
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from StealthKit.cache import CacheRouter, DiskCache, freshness_lifetime
+
+NOW = 1_700_000_000.0
+
+
+def _date(offset: float = 0.0) -> str:
+    return email.utils.formatdate(NOW + offset, usegmt=True)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"cache-control": "max-age=60"}, 60),
+        ({"cache-control": "public, max-age=60", "age": "15"}, 45),
+        ({"cache-control": "max-age=10", "age": "30"}, 0),
+        ({"cache-control": "max-age=60, s-maxage=600"}, 600),
+        ({"cache-control": "max-age=60", "expires": _date(3600)}, 60),
+        ({"date": _date(), "expires": _date(3600)}, 3600),
+        ({"date": _date(), "expires": _date(-60)}, 0),
+        ({"date": _date(), "last-modified": _date(-3600)}, 360),
+        ({"date": _date(), "last-modified": _date(-30 * 86400)}, 86400),
+        ({"cache-control": "max-age=60", "vary": "Accept-Encoding"}, 60),
+        ({"cache-control": "max-age=60", "access-control-allow-origin": "*"}, 60),
+    ],
+)
+def test_freshness_lifetime(headers, expected):
+    assert freshness_lifetime(headers, NOW) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        {"cache-control": "no-store, max-age=60"},
+        {"cache-control": "no-cache, max-age=60"},
+        {"cache-control": "private, max-age=60"},
+        {"cache-control": "max-age=60", "set-cookie": "a=1"},
+        {"cache-control": "max-age=60", "vary": "Origin"},
+        {"cache-control": "max-age=60", "vary": "Accept-Encoding, Cookie"},
+        {"cache-control": "max-age=60", "access-control-allow-origin": "https://a.test"},
+        {"cache-control": "max-age=soon"},
+        {"date": _date(), "expires": "0"},
+    ],
+)
+def test_freshness_lifetime_not_storable(headers):
+    assert freshness_lifetime(headers, NOW) is None
+
+
+FRESH = {"cache-control": "max-age=600", "content-type": "text/javascript"}
+
+
+def test_store_lookup_and_reopen(tmp_path):
+    async def run():
+        cache = DiskCache(tmp_path, max_bytes=1024)
+        assert await cache.store("https://a.test/app.js", 200, {**FRESH, "set-cookie": "a=1"}, b"x") is False
+        assert await cache.store("https://a.test/app.js", 404, FRESH, b"x") is False
+        assert await cache.store("https://a.test/big.js", 200, FRESH, b"x" * 2048) is False
+        assert await cache.store("https://a.test/app.js", 200, {**FRESH, "content-length": "4"}, b"code") is True
+        status, headers, digest, _ = cache.lookup("https://a.test/app.js")
+        assert status == 200 and "content-length" not in headers
+        assert await cache.read(digest) == b"code"
+        assert cache.is_fresh("https://a.test/app.js")
+        cache.close()
+
+    asyncio.run(run())
+    reopened = DiskCache(tmp_path, max_bytes=1024)
+    assert reopened.lookup("https://a.test/app.js") is not None
+    assert reopened.stats()["bytes"] == 4
+    reopened.close()
+
+
+def test_lru_eviction(tmp_path):
+    async def run():
+        cache = DiskCache(tmp_path, max_bytes=10)
+        await cache.store("https://a.test/a", 200, FRESH, b"aaaa")
+        await cache.store("https://a.test/b", 200, FRESH, b"bbbb")
+        cache.touch("https://a.test/a")
+        await cache.store("https://a.test/c", 200, FRESH, b"cccc")
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.lookup("https://a.test/b") is None
+    assert cache.lookup("https://a.test/a") is not None and cache.lookup("https://a.test/c") is not None
+    assert cache.stats()["evictions"] == 1 and cache.total_bytes == 8
+    assert sorted(p.name for p in cache.blob_dir.rglob("*") if p.is_file()) == sorted(
+        [cache.lookup("https://a.test/a")[2], cache.lookup("https://a.test/c")[2]]
+    )
+    cache.close()
+
+
+def test_shared_blob_survives_eviction_of_one_url(tmp_path):
+    async def run():
+        cache = DiskCache(tmp_path, max_bytes=8)
+        await cache.store("https://a.test/1", 200, FRESH, b"same")
+        await cache.store("https://b.test/1", 200, FRESH, b"same")
+        await cache.store("https://c.test/1", 200, FRESH, b"othr")
+        digest = cache.lookup("https://b.test/1")[2]
+        assert cache.lookup("https://a.test/1") is None
+        assert await cache.read(digest) == b"same"
+        cache.close()
+
+    asyncio.run(run())
+
+
+class _OriginServer:
+    """Serves /lib.js with an ETag, answering matching conditional requests with 304."""
+
+    def __init__(self) -> None:
+        self.etag = '"v1"'
+        self.body = b"v1"
+        self.requests = []
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server.requests.append(self.headers.get("If-None-Match"))
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("Cache-Control", "max-age=60")
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/javascript")
+                self.send_header("Cache-Control", "max-age=0")
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/lib.js"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def origin():
+    server = _OriginServer()
+    yield server
+    server.close()
+
+
+class _Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self._body = body
+
+    async def all_headers(self):
+        return self.headers
+
+    async def body(self):
+        return self._body
+
+
+class _Request:
+    method = "GET"
+    resource_type = "script"
+    headers = {"accept": "*/*"}
+
+    def __init__(self, url):
+        self.url = url
+
+
+class _Route:
+    """The parts of a Playwright Route the router uses; `fetch` goes to the real server."""
+
+    def __init__(self, url):
+        self.request = _Request(url)
+        self.fulfilled = None
+        self.fell_back = False
+
+    async def fetch(self, headers=None, max_redirects=None):
+        def get():
+            req = urllib.request.Request(self.request.url, headers=headers or {})
+            try:
+                with urllib.request.urlopen(req) as resp:
+                    return _Response(resp.status, dict(resp.headers), resp.read())
+            except urllib.error.HTTPError as exc:
+                return _Response(exc.code, dict(exc.headers), b"")
+
+        return await asyncio.to_thread(get)
+
+    async def fulfill(self, response=None, status=None, headers=None, body=None):
+        self.fulfilled = {"status": status or response.status, "body": body}
+
+    async def fallback(self):
+        self.fell_back = True
+
+
+def test_conditional_revalidation(tmp_path, origin):
+    async def run():
+        cache = DiskCache(tmp_path, max_bytes=1024)
+        router = CacheRouter(cache)
+        # Stored stale (max-age=0) with a validator.
+        assert await cache.store(origin.url, 200, {"cache-control": "max-age=0", "etag": '"v1"'}, b"v1")
+
+        route = _Route(origin.url)
+        await router._handle(route)
+        assert route.fulfilled == {"status": 200, "body": b"v1"}
+        assert origin.requests == ['"v1"'] and cache.revalidated == 1
+        # The 304's max-age made it fresh again: served without asking the server.
+        route = _Route(origin.url)
+        await router._handle(route)
+        assert route.fulfilled == {"status": 200, "body": b"v1"} and len(origin.requests) == 1
+        assert cache.hits == 1
+
+        # Changed on the server: the 200 is served and replaces the stored body.
+        origin.etag, origin.body = '"v2"', b"v2"
+        cache._entries[origin.url].expires = 0
+        route = _Route(origin.url)
+        await router._handle(route)
+        assert route.fulfilled == {"status": 200, "body": b"v2"} and origin.requests[-1] == '"v1"'
+        assert await cache.read(cache.lookup(origin.url)[2]) == b"v2"
+        cache.close()
+
+    asyncio.run(run())
+
+
+def test_miss_falls_back_to_the_network(tmp_path):
+    async def run():
+        cache = DiskCache(tmp_path, max_bytes=1024)
+        route = _Route("https://a.test/missing.js")
+        await CacheRouter(cache)._handle(route)
+        assert route.fell_back and route.fulfilled is None and cache.misses == 1
+        cache.close()
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+# tests/test_tabs.py
+from __future__ import annotations
+
+import pytest
+
+from StealthKit.tabs import filter_tabs
+
+
+def _row(tab, index, last_activity, url="https://example.com/", title=""):
+    return {
+        "tab": tab,
+        "url": url,
+        "title": title,
+        "load_state": "hibernated" if index is None else "load",
+        "opened": 0.0,
+        "last_activity": last_activity,
+        "idle_s": 0.0,
+        "index": index,
+    }
+
+
+# As `browser_list_tabs` builds them: open tabs in index order, then hibernated ones.
+ROWS = [_row("t1", 0, 30.0), _row("t3", 1, 20.0), _row("t2", None, 10.0), _row("t4", None, 5.0)]
+
+
+def test_index_order_is_kept_by_default():
+    assert [r["tab"] for r in filter_tabs(ROWS)] == ["t1", "t3", "t2", "t4"]
+
+
+def test_hibernated_rows_sort_last_descending():
+    assert [r["tab"] for r in filter_tabs(ROWS, descending=True)] == ["t3", "t1", "t2", "t4"]
+
+
+def test_sort_by_idle():
+    assert [r["tab"] for r in filter_tabs(ROWS, sort="idle")] == ["t4", "t2", "t3", "t1"]
+    assert [r["tab"] for r in filter_tabs(ROWS, sort="idle", descending=True, limit=2)] == ["t1", "t3"]
+
+
+def test_filters():
+    rows = ROWS + [_row("t5", 2, 1.0, url="https://other.org/a", title="Other Page")]
+    assert [r["tab"] for r in filter_tabs(rows, url_pattern="*://other.org/*")] == ["t5"]
+    assert [r["tab"] for r in filter_tabs(rows, title_contains="other")] == ["t5"]
+    assert [r["tab"] for r in filter_tabs(rows, load_state="hibernated")] == ["t2", "t4"]
+
+
+def test_invalid_sort():
+    with pytest.raises(ValueError):
+        filter_tabs(ROWS, sort="size")